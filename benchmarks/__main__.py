@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Runs every IPC microbenchmark and writes machine-readable results.
+
+    python -m benchmarks [--iterations N] [--only SUITE ...] [--json results.json]
+                         [--compare baseline.json] [--tolerance 0.2]
+
+Results are keyed "suite.backend.operation" (e.g. "shared_memory.native.set_light").
+With --compare, operations whose ops/sec dropped by more than the tolerance
+against the baseline file are reported and the exit status is 1.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from multiprocessing import Manager
+from typing import Dict
+
+from benchmarks.bench_ipc import bench_frames, bench_metrics, bench_queues, bench_signals, bench_status
+from benchmarks.bench_shared_memory import bench_backend
+from benchmarks.bench_vehicle import bench_vehicle
+from benchmarks.common import print_table
+
+SUITES = ("shared_memory", "queues", "status", "signals", "frames", "vehicle", "metrics")
+BACKENDS = (("manager", False), ("native", True))
+
+
+def run_suites(suites, iterations: int) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Returns {table title: {operation: measurement}}; titles are "suite" or "suite.backend"."""
+    tables = {}
+    manager = Manager()
+    try:
+        for label, native in BACKENDS:
+            if "shared_memory" in suites:
+                tables[f"shared_memory.{label}"] = bench_backend(manager, native, iterations, 20)
+            if "status" in suites:
+                tables[f"status.{label}"] = bench_status(manager, native, iterations)
+        if "queues" in suites:
+            tables["queues"] = bench_queues(iterations)
+        if "signals" in suites:
+            tables["signals"] = bench_signals(manager, iterations)
+        if "frames" in suites:
+            tables["frames"] = bench_frames(iterations)["timings"]
+        if "vehicle" in suites:
+            tables["vehicle"] = bench_vehicle(iterations)["timings"]
+        if "metrics" in suites:
+            tables["metrics"] = bench_metrics(iterations)
+    finally:
+        manager.shutdown()
+    return tables
+
+
+def flatten(tables: Dict[str, Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, float]]:
+    return {f"{title}.{op}": result for title, rows in tables.items() for op, result in rows.items()}
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float) -> list:
+    """Operations slower than baseline by more than `tolerance` (fraction of ops/sec)."""
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        before, after = baseline[key]["ops_per_sec"], result["ops_per_sec"]
+        if before > 0 and after < before * (1 - tolerance):
+            regressions.append((key, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--only", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON ('-' for stdout)")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON written by a previous --json run")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed ops/sec drop against the baseline (default 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    tables = run_suites(args.only, args.iterations)
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+        },
+        "results": flatten(tables),
+    }
+
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        for title, rows in tables.items():
+            print_table(title, rows)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"\nResults written to {args.json}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(report["results"], baseline, args.tolerance)
+        for key, before, after in regressions:
+            print(f"REGRESSION {key}: {before:.0f} -> {after:.0f} ops/sec", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regression beyond {args.tolerance:.0%} against {args.compare}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Frame time of the pygame display with a full state (20 event lines, moving vehicles).
+Runs off-screen through SDL's dummy video driver.
+
+    python -m benchmarks.bench_display [--frames N]
+"""
+import argparse
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import display  # noqa: E402  (the video driver must be chosen before pygame initializes)
+from benchmarks.common import measure, print_table  # noqa: E402
+
+
+def sample_state(frame: int) -> dict:
+    return {
+        "lights": {"N": "GREEN", "S": "GREEN", "E": "RED", "W": "RED"},
+        "queues": {"N": 3, "S": 1, "E": 7, "W": 0},
+        "current_vehicle": {"id": "3f2a9c1d00000000", "type": "normal", "source": "N",
+                            "destination": "S", "turn": "straight", "priority": False},
+        "vehicles_in_box": [],
+        "event_logs": [{"seq": i, "time": 0.0,
+                        "msg": f"Vehicle {i:08x} (normal) from N to S passed through on GREEN light."}
+                       for i in range(20)],
+        "vehicles": [{"id": f"{i:08x}", "source": "NSEW"[i % 4], "priority": i % 5 == 0,
+                      "pos": [(frame * 3 + i * 40) % display.WIDTH, (i * 53) % display.HEIGHT]}
+                     for i in range(10)],
+    }
+
+
+def bench_display(frames: int) -> dict:
+    states = [sample_state(frame) for frame in range(60)]
+    counter = iter(range(10 ** 9))
+
+    def draw_frame():
+        display.sim_state = states[next(counter) % len(states)]
+        display.draw_simulation()
+
+    results = {"draw_simulation (full state)": measure(draw_frame, frames, warmup=60)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=2000)
+    args = parser.parse_args()
+
+    results = bench_display(args.frames)
+    print_table("Display frame time", results)
+    print(f"\nText cache: {display.render_text.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Queues, display status encoding, priority-signal delivery and metrics recording.
+
+    python -m benchmarks.bench_ipc [--iterations N]
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+from multiprocessing import Event, Manager, Pipe, Process
+
+from benchmarks.common import measure, print_table
+from coordinator import DisplayServer
+from normal_traffic import create_vehicle
+from utils.display_protocol import FrameReader, StateEncoder, encode
+from utils.message_queues import create_queues, drain, enqueue, enqueue_many
+from utils.metrics import NO_METRICS, MetricsRegistry
+from utils.shared_memory import create_shared_memory
+from utils.signals import PreemptionChannel, SignalHandler
+
+for _name in ("message_queues", "signals", "shared_memory"):
+    logging.getLogger(_name).setLevel(logging.WARNING)
+
+
+def bench_queues(iterations: int, batch: int = 64) -> dict:
+    queues = create_queues()
+    vehicle = create_vehicle()
+    vehicle["source"] = "N"
+    vehicles = [vehicle] * batch
+
+    def enqueue_get():
+        enqueue(queues, vehicle, "N")
+        return queues["N"].get()
+
+    def enqueue_many_drain():
+        enqueue_many(queues, vehicles)
+        return drain(queues, "N", batch)
+
+    return {
+        "enqueue+get": measure(enqueue_get, iterations),
+        f"enqueue_many+drain ({batch} vehicles)": measure(enqueue_many_drain, max(1, iterations // batch)),
+    }
+
+
+def bench_status(manager, native: bool, iterations: int) -> dict:
+    """
+    DisplayServer.generate_status() and its JSON encoding, with a full event log,
+    against the delta stream (read_update) when nothing changed.
+    """
+    shared_mem = create_shared_memory(manager, native=native)
+    queues = create_queues()
+    server = DisplayServer(queues, shared_mem, Event())
+    try:
+        shared_mem.update_state("current_vehicle", create_vehicle())
+        for i in range(shared_mem.event_logs.capacity):
+            shared_mem.append_event_log(f"Vehicle {i:08d} (normal) from N to S passed through on GREEN light.")
+        encoder = StateEncoder(shared_mem.event_logs.capacity)
+        server.read_update(encoder)
+        return {
+            "generate_status": measure(server.generate_status, iterations),
+            "generate_status+json.dumps": measure(lambda: json.dumps(server.generate_status()), iterations),
+            "read_update (unchanged)": measure(lambda: server.read_update(encoder), iterations),
+        }
+    finally:
+        shared_mem.close()
+
+
+def bench_frames(iterations: int) -> dict:
+    """Encode/decode cost and bytes per frame of the display stream, JSON vs binary."""
+    encoder = StateEncoder()
+    vehicles = [create_vehicle() for _ in range(4)]
+    events = [{"seq": i, "time": 1.0e9 + i, "msg": f"Vehicle {i:08d} (normal) from N to S passed through on GREEN light."}
+              for i in range(20)]
+    encoder.update({"lights": {"N": "GREEN", "S": "GREEN", "E": "RED", "W": "RED"},
+                    "queues": {"N": 3, "S": 1, "E": 7, "W": 0}, "current_vehicle": vehicles[0],
+                    "vehicles_in_box": vehicles[:2], "vehicles": []}, events)
+    messages = {
+        "snapshot": encoder.snapshot_message(),
+        "delta": encoder.update({"lights": {"N": "RED", "S": "RED", "E": "GREEN", "W": "GREEN"},
+                                 "queues": {"N": 4, "S": 1, "E": 6, "W": 0}, "current_vehicle": vehicles[2],
+                                 "vehicles_in_box": vehicles[2:], "vehicles": []}, events[-1:] + [
+                                    {"seq": 20, "time": 1.0e9 + 20, "msg": "Vehicle 00000020 passed."}]),
+    }
+    sizes, timings = {}, {}
+    for name, message in messages.items():
+        for wire_format in ("json", "binary"):
+            frame = encode(message, wire_format)
+            sizes[f"{name} {wire_format}"] = len(frame)
+            timings[f"{name} {wire_format} encode"] = measure(lambda: encode(message, wire_format), iterations)
+            timings[f"{name} {wire_format} decode"] = measure(lambda: FrameReader().feed(frame), iterations)
+    return {"bytes_per_frame": sizes, "timings": timings}
+
+
+def bench_metrics(iterations: int) -> dict:
+    """Hot-path cost of recording a counter and a histogram sample, enabled and disabled, and of a scrape."""
+    registry = MetricsRegistry()
+    try:
+        return {
+            "inc (registry)": measure(lambda: registry.inc("crossroads_vehicles_processed_total", "N"), iterations),
+            "observe (registry)": measure(lambda: registry.observe("crossroads_queue_wait_seconds", 7.5, "N"),
+                                          iterations),
+            "inc (disabled)": measure(lambda: NO_METRICS.inc("crossroads_vehicles_processed_total", "N"),
+                                      iterations),
+            "render": measure(registry.render, max(1, iterations // 100)),
+        }
+    finally:
+        registry.close()
+
+
+def _signal_echo(conn, ready) -> None:
+    """Stands in for the lights process: answers every SIGUSR1 with one byte."""
+    signal.signal(signal.SIGUSR1, lambda signum, frame: conn.send_bytes(b"!"))
+    signal.signal(signal.SIGTERM, lambda signum, frame: os._exit(0))
+    ready.set()
+    while True:
+        signal.pause()
+
+
+def _preemption_echo(preemption: PreemptionChannel, conn, ready) -> None:
+    """Stands in for the lights process: answers every preemption request with one byte."""
+    ready.set()
+    while True:
+        if preemption.wait() is not None:
+            conn.send_bytes(b"!")
+
+
+def bench_signals(manager, iterations: int) -> dict:
+    """
+    End-to-end priority notification, from the call until the receiver has handled it:
+    SignalHandler.notify_priority() (SIGUSR1) against PreemptionChannel.request() (pipe).
+    """
+    receiver, sender = Pipe(duplex=False)
+    ready = Event()
+    echo = Process(target=_signal_echo, args=(sender, ready), daemon=True)
+    echo.start()
+    ready.wait(5)
+    handler = SignalHandler(echo.pid, manager)
+    vehicle = {"source": "N"}
+
+    def notify_and_wait():
+        handler.notify_priority(vehicle)
+        return receiver.recv_bytes()
+
+    try:
+        results = {"notify_priority delivery": measure(notify_and_wait, iterations, warmup=10)}
+    finally:
+        echo.terminate()
+        echo.join()
+
+    preemption = PreemptionChannel()
+    ready = Event()
+    echo = Process(target=_preemption_echo, args=(preemption, sender, ready), daemon=True)
+    echo.start()
+    ready.wait(5)
+
+    def request_and_wait():
+        preemption.request("N")
+        return receiver.recv_bytes()
+
+    try:
+        results["preemption channel delivery"] = measure(request_and_wait, iterations, warmup=10)
+    finally:
+        echo.terminate()
+        echo.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    manager = Manager()
+    try:
+        print_table("Direction queues", bench_queues(args.iterations))
+        for label, native in (("manager", False), ("native", True)):
+            print_table(f"Display status: {label}", bench_status(manager, native, args.iterations))
+        print_table("Priority signal", bench_signals(manager, args.iterations))
+        frames = bench_frames(args.iterations)
+        print("\nBytes per display frame")
+        for name, size in frames["bytes_per_frame"].items():
+            print(f"  {name:<38} {size:>6}")
+        print_table("Display frames", frames["timings"])
+        print_table("Metrics", bench_metrics(args.iterations))
+    finally:
+        manager.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Compares the manager-based SharedMemory with the native shared-memory backend.
+
+    python -m benchmarks.bench_shared_memory [--iterations N]
+"""
+import argparse
+import logging
+from multiprocessing import Manager
+
+from benchmarks.common import measure, print_table
+from utils.shared_memory import create_shared_memory
+
+logging.getLogger("shared_memory").setLevel(logging.WARNING)
+
+
+def bench_backend(manager, native: bool, iterations: int, capacity: int) -> dict:
+    shared_mem = create_shared_memory(manager, native=native, event_log_capacity=capacity)
+    vehicle = {"id": "veh123", "source": "E", "destination": "W", "priority": False}
+    try:
+        return {
+            "get_light_state": measure(shared_mem.get_light_state, iterations),
+            "in_priority_mode": measure(shared_mem.in_priority_mode, iterations),
+            "set_light": measure(lambda: shared_mem.set_light("N", "GREEN"), iterations),
+            "update_state(current_vehicle)": measure(
+                lambda: shared_mem.update_state("current_vehicle", vehicle), iterations),
+            "append_event_log": measure(lambda: shared_mem.append_event_log("benchmark event"), iterations),
+            "get_event_logs": measure(shared_mem.get_event_logs, iterations),
+        }
+    finally:
+        shared_mem.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--event-log-capacity", type=int, default=20)
+    args = parser.parse_args()
+
+    manager = Manager()
+    try:
+        results = {}
+        for label, native in (("manager", False), ("native", True)):
+            results[label] = bench_backend(manager, native, args.iterations, args.event_log_capacity)
+            print_table(f"SharedMemory backend: {label}", results[label])
+        print("\nSpeed-up (native / manager ops/sec):")
+        for op in results["manager"]:
+            ratio = results["native"][op]["ops_per_sec"] / results["manager"][op]["ops_per_sec"]
+            print(f"  {op:<38} {ratio:>8.1f}x")
+    finally:
+        manager.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Bytes per vehicle and serialization cost: dict vehicles vs compact Vehicle records.
+
+    python -m benchmarks.bench_vehicle [--iterations N]
+"""
+import argparse
+import pickle
+from multiprocessing import Queue
+
+from benchmarks.common import measure, print_table
+from normal_traffic import create_vehicle
+from utils.message_queues import DirectionQueue
+from utils.vehicle import Vehicle
+
+
+def bench_vehicle(iterations: int) -> dict:
+    vehicle_dict = create_vehicle()
+    vehicle = Vehicle.from_dict(vehicle_dict)
+    packed = vehicle.pack()
+    queue, direction_queue = Queue(), DirectionQueue()
+
+    def queue_round_trip(item, q=queue):
+        q.put(item)
+        return q.get()
+
+    sizes = {
+        "dict (pickle)": len(pickle.dumps(vehicle_dict, pickle.HIGHEST_PROTOCOL)),
+        "Vehicle (pickle)": len(pickle.dumps(vehicle, pickle.HIGHEST_PROTOCOL)),
+        "Vehicle.pack()": len(packed),
+    }
+    timings = {
+        "dict pickle.dumps+loads": measure(
+            lambda: pickle.loads(pickle.dumps(vehicle_dict, pickle.HIGHEST_PROTOCOL)), iterations),
+        "Vehicle pickle.dumps+loads": measure(
+            lambda: pickle.loads(pickle.dumps(vehicle, pickle.HIGHEST_PROTOCOL)), iterations),
+        "Vehicle pack+unpack": measure(lambda: Vehicle.unpack(vehicle.pack()), iterations),
+        "dict Queue put+get": measure(lambda: queue_round_trip(vehicle_dict), iterations),
+        "Vehicle Queue put+get": measure(lambda: queue_round_trip(vehicle), iterations),
+        "dict DirectionQueue put+get": measure(lambda: queue_round_trip(vehicle_dict, direction_queue), iterations),
+        "Vehicle DirectionQueue put+get": measure(lambda: queue_round_trip(vehicle, direction_queue), iterations),
+    }
+    return {"bytes_per_vehicle": sizes, "timings": timings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    results = bench_vehicle(args.iterations)
+    print("\nBytes per vehicle")
+    for name, size in results["bytes_per_vehicle"].items():
+        print(f"  {name:<38} {size:>6}")
+    print_table("Serialization cost", results["timings"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import time
+from typing import Callable, Dict, List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(pct / 100.0 * len(samples))) - 1))
+    return samples[index]
+
+
+def measure(fn: Callable[[], object], iterations: int = 10000, warmup: int = 100) -> Dict[str, float]:
+    """
+    Calls fn() repeatedly and returns throughput and latency percentiles.
+    Latencies are reported in microseconds.
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "ops_per_sec": iterations / total if total > 0 else 0.0,
+        "p50_us": percentile(samples, 50) * 1e6,
+        "p99_us": percentile(samples, 99) * 1e6,
+        "max_us": samples[-1] * 1e6,
+    }
+
+
+def print_table(title: str, rows: Dict[str, Dict[str, float]]) -> None:
+    print(f"\n{title}")
+    print(f"{'operation':<40} {'ops/sec':>12} {'p50 us':>10} {'p99 us':>10}")
+    for name, result in rows.items():
+        print(f"{name:<40} {result['ops_per_sec']:>12.0f} {result['p50_us']:>10.1f} {result['p99_us']:>10.1f}")
@@ -1,11 +1,23 @@
 import time
-import json
+import heapq
 import socket
+import selectors
 import threading
+import itertools
 import logging
 from queue import Empty
+from collections import deque
+from typing import Callable, Optional
 from multiprocessing import Manager
 from utils.shared_memory import SharedMemory
+from utils.vehicle import as_dict
+from intersection import AdmissionController
+from utils.message_queues import DRAIN_BATCH, drain, mark_done
+from utils.display_protocol import StateEncoder, choose_format, encode
+from utils.metrics import NO_METRICS
+from utils.profiling import profiled
+from utils.trace import NO_TRACE
+from utils.clock import REAL_TIME, SimClock
 
 logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
 logger = logging.getLogger("coordinator")
@@ -13,21 +25,165 @@ logger = logging.getLogger("coordinator")
 logger = logging.getLogger("coordinator")
 logger.setLevel(logging.DEBUG)
 
+CROSSING_TIME = 4.0  # Seconds a vehicle occupies the intersection
+RED_WAIT = 5  # Seconds between "still waiting" log lines while a vehicle is stopped at a red light
+EMERGENCY_YIELD = 5  # Longest a vehicle holds back for an earlier emergency vehicle on another approach
+DIRECTIONS = ["N", "S", "E", "W"]
+
+# Decisions returned by classify_vehicle().
+EMERGENCY = "emergency"
+PASS = "pass"
+WAIT = "wait"
+
+
+def classify_vehicle(vehicle: dict, light_state: dict, direction: str) -> str:
+    """
+    Decide what the vehicle at the head of a queue does.
+    Emergency vehicles always force passage; others pass only on GREEN.
+    """
+    if vehicle.get("priority", False):
+        return EMERGENCY
+    if light_state.get(direction) == "GREEN":
+        return PASS
+    return WAIT
+
+
+class PendingVehicles:
+    """
+    Vehicles drained from the direction queues and not yet served, shared by the
+    coordinator's threads. Normal vehicles keep their FIFO order per approach.
+    Emergency vehicles go to a FIFO of their approach, served before its normal
+    vehicles, and into one heap across all approaches ordered by arrival, so the
+    oldest pending emergency anywhere is known in O(log n) without scanning or
+    requeueing anything. Served emergencies leave the heap lazily.
+    """
+
+    def __init__(self, clock: SimClock = REAL_TIME):
+        self.clock = clock
+        self._normal = {d: deque() for d in DIRECTIONS}
+        self._emergency = {d: deque() for d in DIRECTIONS}
+        self._heap = []  # (timestamp, seq, direction) of every emergency taken in
+        self._served = set()  # seqs popped from an approach but not yet from the heap
+        self._counter = itertools.count()
+        self._changed = threading.Condition()
+
+    def extend(self, direction: str, vehicles) -> None:
+        """Takes in vehicles drained from a direction queue, in queue order."""
+        if not vehicles:
+            return
+        with self._changed:
+            for vehicle in vehicles:
+                if vehicle.get("priority", False):
+                    seq = next(self._counter)
+                    self._emergency[direction].append((seq, vehicle))
+                    heapq.heappush(self._heap, (vehicle["timestamp"], seq, direction))
+                else:
+                    self._normal[direction].append(vehicle)
+            self._changed.notify_all()
+
+    def pop(self, direction: str, timeout: float):
+        """Next vehicle of an approach (its oldest emergency first), or None after `timeout` seconds."""
+        with self._changed:
+            if not self._emergency[direction] and not self._normal[direction]:
+                self._changed.wait(timeout)
+            if self._emergency[direction]:
+                seq, vehicle = self._emergency[direction].popleft()
+                self._served.add(seq)
+                self._changed.notify_all()
+                return vehicle
+            if self._normal[direction]:
+                return self._normal[direction].popleft()
+            return None
+
+    def _oldest_emergency(self):
+        while self._heap and self._heap[0][1] in self._served:
+            self._served.discard(heapq.heappop(self._heap)[1])
+        return self._heap[0] if self._heap else None
+
+    def oldest_emergency(self):
+        """(timestamp, seq, direction) of the longest-waiting emergency vehicle, or None."""
+        with self._changed:
+            return self._oldest_emergency()
+
+    def _must_yield(self, vehicle: dict, direction: str) -> bool:
+        if vehicle.get("priority", False):
+            oldest = self._oldest_emergency()
+            return oldest is not None and oldest[2] != direction and oldest[0] < vehicle["timestamp"]
+        return any(self._emergency[d] for d in DIRECTIONS if d != direction)
+
+    def must_yield(self, vehicle: dict, direction: str) -> bool:
+        """Whether a vehicle must give way to an emergency vehicle still queued on another approach."""
+        with self._changed:
+            return self._must_yield(vehicle, direction)
+
+    def yield_to_emergencies(self, vehicle: dict, direction: str, shutdown_flag, timeout: float = EMERGENCY_YIELD) -> float:
+        """
+        Holds a vehicle back while an emergency vehicle it must give way to is still
+        queued on another approach: normal vehicles yield to any, emergency vehicles
+        to earlier ones. Returns the simulated seconds spent waiting (at most `timeout`).
+        """
+        start = self.clock.time()
+        with self._changed:
+            while self._must_yield(vehicle, direction) and not shutdown_flag.is_set():
+                remaining = timeout - (self.clock.time() - start)
+                if remaining <= 0:
+                    break
+                self._changed.wait(min(self.clock.wall(remaining), 0.5))
+        return self.clock.time() - start
+
+    def counts(self) -> dict:
+        with self._changed:
+            return {d: (len(self._normal[d]), len(self._emergency[d])) for d in DIRECTIONS}
+
 
 class Coordinator:
-    def __init__(self, queues, shared_memory: SharedMemory, shutdown_flag):
+    def __init__(self, queues, shared_memory: SharedMemory, shutdown_flag,
+                 on_departure: Optional[Callable[[dict], None]] = None, metrics=NO_METRICS,
+                 recorder=NO_TRACE, crossing_time: float = CROSSING_TIME, clock: SimClock = REAL_TIME):
+        """
+        :param on_departure: called with each vehicle once it has crossed (e.g. to
+            forward it to the next intersection of a network).
+        :param metrics: utils.metrics.MetricsRegistry recording waits and crossings.
+        :param recorder: utils.trace.TraceRecorder recording departures.
+        :param crossing_time: simulated seconds a vehicle occupies the intersection.
+        :param clock: utils.clock.SimClock timing crossings and waits, and stamping metrics.
+        """
         self.queues = queues  # Dict: direction -> Queue
         self.shared_memory = shared_memory
         self.shutdown_flag = shutdown_flag
-        self.intersection_lock = shared_memory.lock
+        self.on_departure = on_departure
+        self.metrics = metrics
+        self.recorder = recorder
+        self.crossing_time = crossing_time
+        self.clock = clock
+        # Compatible movements share the intersection; conflicting ones are serialized.
+        self.admission = AdmissionController()
+        # Vehicles taken off the queues, with emergency vehicles indexed across approaches.
+        self.pending = PendingVehicles(clock)
+        self._box_lock = threading.Lock()
+        # Seconds between a light turning GREEN and the first waiting vehicle departing.
+        self.green_start_latencies = {d: [] for d in ["N", "S", "E", "W"]}
 
+    @profiled("coordinator.process_vehicle")
     def process_vehicle(self, vehicle: dict) -> None:
         """
         Process the vehicle synchronously (for debugging).
-        In sim spawn a thread for asynchronous processing.
+        The vehicle first gives way to emergency vehicles still queued on other
+        approaches, then waits for admission: it enters the intersection as soon as
+        its movement is compatible with every vehicle already inside.
         """
-        with self.intersection_lock:
-            self.shared_memory.update_state("current_vehicle", vehicle)
+        yielded = self.pending.yield_to_emergencies(vehicle, vehicle["source"], self.shutdown_flag)
+        if yielded >= 0.01:
+            logger.info(f"Vehicle {vehicle['id'][:8]} gave way to emergency traffic for {yielded:.2f} s")
+        if not self.admission.admit(vehicle, self.shutdown_flag):
+            return
+        entered = self.clock.time()
+        source = vehicle["source"]
+        self.metrics.observe("crossroads_queue_wait_seconds", entered - vehicle["timestamp"], source)
+        if vehicle.get("priority", False):
+            self.metrics.observe("crossroads_emergency_response_seconds", entered - vehicle["timestamp"], source)
+        try:
+            self._publish_box(vehicle)
             if vehicle.get("priority", False):
                 action = "passed through with EMERGENCY clearance"
             else:
@@ -37,44 +193,68 @@ class Coordinator:
                         f"from {vehicle['source']} to {vehicle['destination']} {action}.")
             self.shared_memory.append_event_log(event_msg)
             logger.info(f"✅ Vehicle processed: {event_msg}")
-        # Synchronously wait for 4 seconds (using small intervals).
-        sleep_time = 4.0
-        elapsed = 0.0
-        interval = 0.1
-        while elapsed < sleep_time and not self.shutdown_flag.is_set():
-            time.sleep(interval)
-            elapsed += interval
-        with self.intersection_lock:
-            self.shared_memory.update_state("current_vehicle", None)
+            # Synchronously wait for the crossing time (cut short by shutdown).
+            self.clock.wait(self.shutdown_flag, self.crossing_time)
+        finally:
+            self.admission.release(vehicle)
+            self._publish_box()
+        self.metrics.observe("crossroads_crossing_seconds", self.clock.time() - entered)
+        self.metrics.inc("crossroads_vehicles_processed_total", source)
+        self.recorder.departure(vehicle)
+        # The vehicle has left its approach.
+        mark_done(self.queues, source)
+        if self.on_departure is not None and not self.shutdown_flag.is_set():
+            try:
+                self.on_departure(vehicle)
+            except Exception as e:
+                logger.error(f"Departure hook failed for {vehicle['id'][:8]}: {e}")
+
+    def _publish_box(self, entering: dict = None) -> None:
+        """
+        Publishes the vehicles inside the intersection. current_vehicle keeps
+        showing a single vehicle (the latest to enter) for older display clients.
+        """
+        with self._box_lock:
+            box = [as_dict(v) for v in self.admission.vehicles_in_box()]
+            self.shared_memory.update_state("vehicles_in_box", box)
+            current = as_dict(entering) if entering is not None else (box[-1] if box else None)
+            self.shared_memory.update_state("current_vehicle", current)
+
+    def _intake(self, direction: str) -> None:
+        """
+        Moves vehicles from a direction queue into the pending index as they arrive,
+        with batched drain() calls, so emergency vehicles are indexed as soon as they
+        are queued. Drained vehicles keep counting in the queue depth until they have crossed.
+        """
+        while not self.shutdown_flag.is_set():
+            self.pending.extend(direction, drain(self.queues, direction, DRAIN_BATCH, 0.5, ack=False))
+
+    @profiled("coordinator.queue_get")
+    def _next_vehicle(self, direction: str, timeout: float):
+        """Pops the next vehicle for a direction (emergencies first). Raises Empty if nothing arrives in time."""
+        vehicle = self.pending.pop(direction, timeout)
+        if vehicle is None:
+            raise Empty
+        return vehicle
 
 
     def process_queue_for_direction(self, direction: str) -> None:
         """
         Continuously process vehicles from a given queue.
-        Emergency vehicles are processed in a loop to handle multiple priority vehicles.
+        Emergency vehicles queued behind normal ones are served first (see PendingVehicles).
         """
         while not self.shutdown_flag.is_set():
             try:
-                vehicle = self.queues[direction].get(timeout=0.5)
+                vehicle = self._next_vehicle(direction, timeout=0.5)
                 light_state = self.shared_memory.get_light_state()
                 logger.info(f"Processing vehicle from {direction}: {vehicle}")
+                decision = classify_vehicle(vehicle, light_state, direction)
                 
-                if vehicle.get("priority", False):
-                    # Process consecutive emergency vehicles in a loop.
-                    while True:
-                        logger.warning(f"🚑 EMERGENCY VEHICLE {vehicle['id']} FORCING PASSAGE")
-                        self.process_vehicle(vehicle)
-                        logger.info(f"✅ Emergency vehicle {vehicle['id']} processed.")
-                        try:
-                            next_vehicle = self.queues[direction].get_nowait()
-                            if next_vehicle.get("priority", False):
-                                vehicle = next_vehicle  # Process next emergency vehicle.
-                            else:
-                                self.queues[direction].put(next_vehicle)
-                                break
-                        except Empty:
-                            break
-                elif light_state.get(direction) == "GREEN":
+                if decision == EMERGENCY:
+                    logger.warning(f"🚑 EMERGENCY VEHICLE {vehicle['id']} FORCING PASSAGE")
+                    self.process_vehicle(vehicle)
+                    logger.info(f"✅ Emergency vehicle {vehicle['id']} processed.")
+                elif decision == PASS:
                     logger.info(f"🟢 Vehicle {vehicle['id']} allowed to pass ({vehicle.get('turn','')}).")
                     self.process_vehicle(vehicle)
                 else:
@@ -85,97 +265,283 @@ class Coordinator:
                     # Log that the vehicle is waiting.
                     wait_msg = f"Vehicle {vehicle['id'][:8]} from {vehicle['source']} waiting at {direction} RED light."
                     self.shared_memory.append_event_log(wait_msg)
+                    self.metrics.inc("crossroads_vehicles_stopped_total", direction)
                     logger.info(f"⏸️ {wait_msg}")
                     
-                    # Wait for up to 5 seconds, logging each second.
-                    total_wait = 5
-                    for i in range(total_wait):
+                    # Block on the light-change condition instead of polling; the
+                    # vehicle keeps its place at the head of the queue.
+                    waited = 0
+                    while not self.shared_memory.wait_for_light(direction, "GREEN", timeout=self.clock.wall(RED_WAIT)):
                         if self.shutdown_flag.is_set():
                             logger.info(f"[DEBUG] Shutdown flag set; breaking waiting loop for vehicle {vehicle['id'][:8]}.")
                             break
-                        time.sleep(1)
-                        logger.info(f"Waiting for {direction} light: {i+1} second(s) elapsed for vehicle {vehicle['id'][:8]}.")
+                        waited += RED_WAIT
+                        logger.info(f"Waiting for {direction} light: {waited} second(s) elapsed for vehicle {vehicle['id'][:8]}.")
                     
                     # If shutdown flag is set, do nothing further.
                     if self.shutdown_flag.is_set():
                         continue
                     
-                    # After waiting, re-read the light state.
-                    current_light = self.shared_memory.get_light_state().get(direction, "RED")
-                    if current_light == "GREEN":
-                        logger.info(f"Light for {direction} turned GREEN; processing waiting vehicle {vehicle['id'][:8]}.")
-                        self.process_vehicle(vehicle)
-                    else:
-                        # Only requeue if the vehicle has not been processed.
-                        if not vehicle.get("processed", False):
-                            logger.info(f"Vehicle {vehicle['id'][:8]} still waiting after {total_wait} seconds; requeueing.")
-                            self.queues[direction].put(vehicle)
-                        else:
-                            logger.info(f"Vehicle {vehicle['id'][:8]} already processed; not requeueing.")
+                    self._record_green_start_latency(direction)
+                    logger.info(f"Light for {direction} turned GREEN; processing waiting vehicle {vehicle['id'][:8]}.")
+                    self.process_vehicle(vehicle)
 
 
             except Empty:
                 continue
 
+    def _record_green_start_latency(self, direction: str) -> None:
+        green_since = self.shared_memory.get_green_since(direction)
+        if green_since:
+            latency = time.time() - green_since
+            self.green_start_latencies[direction].append(latency)
+            logger.info(f"Green-start-to-first-departure latency for {direction}: {latency * 1000:.1f} ms")
+
     def run(self) -> None:
         logger.info("Coordinator starting.")
         # Start a dedicated thread for each directional queue.
-        for direction in ["N", "S", "E", "W"]:
+        for direction in DIRECTIONS:
+            threading.Thread(target=self._intake, args=(direction,), daemon=True).start()
             threading.Thread(target=self.process_queue_for_direction, args=(direction,), daemon=True).start()
         # Main loop: wait for shutdown.
         while not self.shutdown_flag.is_set():
             time.sleep(0.1)
+        for direction, samples in self.green_start_latencies.items():
+            if samples:
+                logger.info(f"{direction}: green-start-to-first-departure mean {sum(samples) / len(samples) * 1000:.1f} ms, "
+                            f"max {max(samples) * 1000:.1f} ms over {len(samples)} phases")
         logger.info("Coordinator shutting down.")
 
+class _Viewer:
+    """Outgoing state of one display connection."""
+
+    def __init__(self, conn: socket.socket, addr):
+        self.conn = conn
+        self.addr = addr
+        self.wire_format = None  # Chosen from the client's hello line, or JSON after HELLO_TIMEOUT
+        self.accepted = time.time()
+        self.inbox = bytearray()
+        self.outbox = deque()  # Encoded messages not fully sent yet
+        self.offset = 0  # Bytes of outbox[0] already sent
+        self.backlog = 0  # Bytes waiting in the outbox
+        self.last_progress = time.time()
+
+    def queue(self, data: bytes) -> None:
+        self.outbox.append(data)
+        self.backlog += len(data)
+
+    def discard_pending(self) -> None:
+        """Drops whole messages that have not started going out; a partly sent one is finished first."""
+        while len(self.outbox) > (1 if self.offset else 0):
+            self.backlog -= len(self.outbox.pop())
+
+    def flush(self) -> bool:
+        """Writes as much as the socket accepts without blocking. Returns False if the peer is gone."""
+        while self.outbox:
+            data = self.outbox[0]
+            try:
+                sent = self.conn.send(memoryview(data)[self.offset:])
+            except (BlockingIOError, InterruptedError):
+                return True
+            except OSError:
+                return False
+            self.offset += sent
+            self.backlog -= sent
+            self.last_progress = time.time()
+            if self.offset < len(data):
+                return True
+            self.outbox.popleft()
+            self.offset = 0
+        return True
+
+
 class DisplayServer:
-    def __init__(self, queues, shared_memory: SharedMemory, shutdown_flag, host="127.0.0.1", port=65432):
+    """
+    Broadcasts the display stream to any number of viewers from a single thread.
+    The state is sampled and encoded once per tick and the same bytes are queued
+    for every viewer; sockets are non-blocking and served by a selector. A viewer
+    whose backlog exceeds MAX_BACKLOG skips the queued deltas and gets a fresh
+    snapshot instead; one that makes no progress for STALL_TIMEOUT is dropped.
+    Viewers pick the wire format with a hello line (see utils.display_protocol);
+    those that send none within HELLO_TIMEOUT get JSON lines.
+    """
+
+    TICK_INTERVAL = 0.2  # Simulated seconds between two state samples
+    MAX_BACKLOG = 256 * 1024  # Bytes queued for one viewer before it is resynchronized
+    STALL_TIMEOUT = 5.0  # Seconds without any write progress before a viewer is dropped
+    SEND_BUFFER = 64 * 1024  # Kernel send buffer per viewer, so lag shows up in the backlog quickly
+    HELLO_TIMEOUT = 0.5  # Seconds to wait for a hello line before falling back to JSON
+
+    def __init__(self, queues, shared_memory: SharedMemory, shutdown_flag, host="127.0.0.1", port=65432,
+                 clock: SimClock = REAL_TIME):
+        """
+        :param clock: utils.clock.SimClock; TICK_INTERVAL is in simulated seconds.
+        """
         self.queues = queues
         self.shared_memory = shared_memory
         self.shutdown_flag = shutdown_flag
         self.host = host
         self.port = port
+        self.clock = clock
         self.running = True
+        self.viewers = {}
+        self.resyncs = 0
+        self.dropped = 0
+        self._encoder = None
+        self._snapshot_cache = {}  # wire format -> (version, bytes)
 
+    @profiled("display.generate_status")
     def generate_status(self) -> dict:
-
-        with self.shared_memory.lock:
-            status = {
-                "lights": dict(self.shared_memory.state["lights"]),
-                "queues": {d: self.queues[d].qsize() for d in ["N", "S", "E", "W"]},
-                "current_vehicle": self.shared_memory.state["current_vehicle"],
-                "event_logs": list(self.shared_memory.state["event_logs"]),
-                "vehicles": list(self.shared_memory.state.get("vehicles", []))
-            }
+        snapshot = self.shared_memory.snapshot()
+        status = {
+            "lights": snapshot["lights"],
+            "queues": {d: self.queues[d].qsize() for d in ["N", "S", "E", "W"]},
+            "current_vehicle": snapshot["current_vehicle"],
+            "vehicles_in_box": snapshot["vehicles_in_box"],
+            "event_logs": snapshot["event_logs"],
+            "vehicles": snapshot["vehicles"]
+        }
         return status
 
-    def handle_client(self, conn: socket.socket) -> None:
+    @profiled("display.read_update")
+    def read_update(self, encoder: StateEncoder) -> Optional[dict]:
+        """
+        Reads the current state into the encoder and returns the delta message,
+        or None if nothing changed. Only event log entries newer than the
+        encoder's last sequence number are read.
+        """
+        status = self.shared_memory.snapshot(include_event_logs=False)
+        status["queues"] = {d: self.queues[d].qsize() for d in ["N", "S", "E", "W"]}
+        return encoder.update(status, self.shared_memory.event_logs_since(encoder.last_seq))
+
+    @staticmethod
+    def encode(message: dict, wire_format: str = "json") -> bytes:
+        return encode(message, wire_format)
+
+    def _snapshot_bytes(self, wire_format: str) -> bytes:
+        """Snapshot at the current version, encoded at most once per version and format."""
+        version, data = self._snapshot_cache.get(wire_format, (None, b""))
+        if version != self._encoder.version:
+            data = self.encode(self._encoder.snapshot_message(), wire_format)
+            self._snapshot_cache[wire_format] = (self._encoder.version, data)
+        return data
+
+    def _start_stream(self, viewer: _Viewer, wire_format: str, selector) -> None:
+        viewer.wire_format = wire_format
+        viewer.queue(self._snapshot_bytes(wire_format))
+        logger.debug(f"Display connection {viewer.addr} uses {wire_format}")
+        if not viewer.flush():
+            self._drop(viewer, selector, "write failed")
+            return
+        self._update_interest(viewer, selector)
+
+    def _accept(self, server: socket.socket, selector) -> None:
+        while True:
+            try:
+                conn, addr = server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            conn.setblocking(False)
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.SEND_BUFFER)
+            viewer = _Viewer(conn, addr)
+            self.viewers[conn] = viewer
+            selector.register(conn, selectors.EVENT_READ, viewer)
+            logger.debug(f"New display connection from {addr} ({len(self.viewers)} viewers)")
+
+    def _drop(self, viewer: _Viewer, selector, reason: str) -> None:
+        self.viewers.pop(viewer.conn, None)
         try:
-            while self.running and not self.shutdown_flag.is_set():
-                status = self.generate_status()
-                json_msg = json.dumps(status) + "\n"
-                try:
-                    conn.sendall(json_msg.encode())
-                    time.sleep(0.2)
-                except (BrokenPipeError, ConnectionResetError):
-                    break
-        finally:
-            conn.close()
+            selector.unregister(viewer.conn)
+        except (KeyError, ValueError):
+            pass
+        viewer.conn.close()
+        logger.debug(f"Display connection {viewer.addr} closed ({reason})")
+
+    def _service(self, viewer: _Viewer, events: int, selector) -> None:
+        if events & selectors.EVENT_READ:
+            try:
+                data = viewer.conn.recv(4096)
+            except (BlockingIOError, InterruptedError):
+                data = None
+            except OSError:
+                data = b""
+            if data == b"":
+                self._drop(viewer, selector, "disconnected")
+                return
+            if data and viewer.wire_format is None:
+                viewer.inbox += data
+                if b"\n" in viewer.inbox:
+                    hello = bytes(viewer.inbox.split(b"\n", 1)[0])
+                    self._start_stream(viewer, choose_format(hello), selector)
+                    return
+        if events & selectors.EVENT_WRITE:
+            if not viewer.flush():
+                self._drop(viewer, selector, "write failed")
+                return
+        self._update_interest(viewer, selector)
+
+    def _update_interest(self, viewer: _Viewer, selector) -> None:
+        mask = selectors.EVENT_READ | (selectors.EVENT_WRITE if viewer.outbox else 0)
+        selector.modify(viewer.conn, mask, viewer)
+
+    def _broadcast(self, selector) -> None:
+        """One tick: sample and encode once, then queue the same bytes for every viewer."""
+        delta = self.read_update(self._encoder)
+        encoded = {}
+        now = time.time()
+        for viewer in list(self.viewers.values()):
+            if viewer.wire_format is None:
+                if now - viewer.accepted > self.HELLO_TIMEOUT:
+                    self._start_stream(viewer, "json", selector)
+                continue
+            if viewer.outbox and now - viewer.last_progress > self.STALL_TIMEOUT:
+                self.dropped += 1
+                self._drop(viewer, selector, "stalled")
+                continue
+            if delta is None:
+                continue
+            data = encoded.get(viewer.wire_format)
+            if data is None:
+                data = encoded[viewer.wire_format] = self.encode(delta, viewer.wire_format)
+            if viewer.backlog + len(data) > self.MAX_BACKLOG:
+                # Too far behind: skip the queued deltas and resynchronize with a snapshot.
+                self.resyncs += 1
+                viewer.discard_pending()
+                viewer.queue(self._snapshot_bytes(viewer.wire_format))
+            else:
+                viewer.queue(data)
+            if not viewer.flush():
+                self._drop(viewer, selector, "write failed")
+                continue
+            self._update_interest(viewer, selector)
 
     def run(self) -> None:
-        import socket
+        self._encoder = StateEncoder(self.shared_memory.event_logs.capacity)
+        self.read_update(self._encoder)
+        selector = selectors.DefaultSelector()
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             s.bind((self.host, self.port))
-            s.settimeout(1)
-            s.listen()
+            s.listen(1024)
+            s.setblocking(False)
+            selector.register(s, selectors.EVENT_READ, None)
             logger.info(f"Display server ready on {self.host}:{self.port}")
-            while self.running and not self.shutdown_flag.is_set():
-                try:
-                    conn, addr = s.accept()
-                    logger.info(f"New display connection from {addr}")
-                    threading.Thread(target=self.handle_client, args=(conn,), daemon=True).start()
-                except socket.timeout:
-                    continue
+            tick = self.clock.poll_interval(self.TICK_INTERVAL)
+            next_tick = time.time() + tick
+            try:
+                while self.running and not self.shutdown_flag.is_set():
+                    for key, events in selector.select(max(0.0, next_tick - time.time())):
+                        if key.data is None:
+                            self._accept(s, selector)
+                        else:
+                            self._service(key.data, events, selector)
+                    if time.time() >= next_tick:
+                        self._broadcast(selector)
+                        next_tick = max(next_tick + tick, time.time())
+            finally:
+                for viewer in list(self.viewers.values()):
+                    self._drop(viewer, selector, "server shutting down")
+                selector.close()
             logger.info("Display server shutting down.")
 
 if __name__ == "__main__":
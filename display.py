@@ -1,17 +1,23 @@
 #!/usr/bin/env python3
 import pygame
 import socket
-import json
 import threading
 import time
 import sys
 import logging
+import selectors
+from collections import deque
+from functools import lru_cache
+from utils.display_protocol import FrameReader, ProtocolError, StateDecoder, hello_line
 
 # -------------------------------
 # Configuration & Global Variables
 # -------------------------------
 
 HOST = '127.0.0.1'
+WIRE_FORMATS = ("binary", "json")  # Announced to the server in order of preference
+RECV_SIZE = 65536  # Bytes read per wake-up
+LATENCY_REPORT_INTERVAL = 10  # Seconds between receive-to-render latency reports
 PORT = 65432
 
 # Global simulation state (will be updated by the socket listener thread)
@@ -19,9 +25,13 @@ sim_state = {
     "lights": {"N": "GREEN", "S": "GREEN", "E": "RED", "W": "RED"},
     "queues": {"N": 0, "S": 0, "E": 0, "W": 0},
     "current_vehicle": None,
+    "vehicles_in_box": [],
     "event_logs": []
 }
 state_lock = threading.Lock()
+state_version = 0  # Incremented by the listener for every batch of updates applied
+state_received_at = 0.0  # perf_counter() when the latest applied batch arrived
+listener_stop = threading.Event()
 
 # Configure logging.
 logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
@@ -52,45 +62,112 @@ ROAD_WIDTH = 120
 CENTER_X = WIDTH // 2
 CENTER_Y = HEIGHT // 2
 
+TEXT_CACHE_SIZE = 512  # Rendered text surfaces kept (event lines, labels, vehicle IDs)
+
+# -------------------------------
+# Render Caches
+# -------------------------------
+
+_fonts = {}
+_background = None
+
+def get_font(size: int) -> pygame.font.Font:
+    """Fonts are looked up and loaded once per size."""
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.SysFont("Arial", size)
+    return font
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def render_text(text: str, size: int, color: tuple) -> pygame.Surface:
+    """Rendered text surfaces, memoized by (string, size, color) with an LRU bound."""
+    return get_font(size).render(text, True, color)
+
+def get_background() -> pygame.Surface:
+    """The static part of the intersection (roads, lane lines, labels), drawn once."""
+    global _background
+    if _background is None:
+        background = pygame.Surface((WIDTH, HEIGHT)).convert()
+        background.fill(DARK_GRAY)
+
+        # Draw roads.
+        pygame.draw.rect(background, GRAY, (0, CENTER_Y - ROAD_WIDTH // 2, WIDTH, ROAD_WIDTH))
+        pygame.draw.rect(background, GRAY, (CENTER_X - ROAD_WIDTH // 2, 0, ROAD_WIDTH, HEIGHT))
+
+        # Draw intersection lines.
+        pygame.draw.line(background, WHITE, (0, CENTER_Y - ROAD_WIDTH // 2), (WIDTH, CENTER_Y - ROAD_WIDTH // 2), 2)
+        pygame.draw.line(background, WHITE, (0, CENTER_Y + ROAD_WIDTH // 2), (WIDTH, CENTER_Y + ROAD_WIDTH // 2), 2)
+        pygame.draw.line(background, WHITE, (CENTER_X - ROAD_WIDTH // 2, 0), (CENTER_X - ROAD_WIDTH // 2, HEIGHT), 2)
+        pygame.draw.line(background, WHITE, (CENTER_X + ROAD_WIDTH // 2, 0), (CENTER_X + ROAD_WIDTH // 2, HEIGHT), 2)
+
+        # Draw cardinal direction labels.
+        background.blit(render_text("N", 28, WHITE), (CENTER_X - 10, 10))
+        background.blit(render_text("S", 28, WHITE), (CENTER_X - 10, HEIGHT - 40))
+        background.blit(render_text("E", 28, WHITE), (WIDTH - 40, CENTER_Y - 10))
+        background.blit(render_text("W", 28, WHITE), (10, CENTER_Y - 10))
+        _background = background
+    return _background
+
 # -------------------------------
 # Socket Listener Thread
 # -------------------------------
 
 def socket_listener():
-    global sim_state
+    """
+    Wakes up as soon as data arrives (selector, no polling sleep), parses every
+    complete frame and applies the whole batch at once, so the renderer always
+    sees the latest complete state.
+    """
+    global sim_state, state_version, state_received_at
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try:
         sock.connect((HOST, PORT))
-        sock.settimeout(1)
+        sock.sendall(hello_line(WIRE_FORMATS))
+        sock.setblocking(False)
         logger.info(f"Connected to display server at {HOST}:{PORT}")
     except Exception as e:
         logger.error(f"Error connecting to display server: {e}")
         return
 
-    buffer = b""
-    while True:
-        try:
-            data = sock.recv(4096)
-            if data:
-                buffer += data
-        except socket.timeout:
-            pass
-        except Exception as e:
-            logger.error(f"Socket error: {e}")
-            break
-
-        while b'\n' in buffer:
-            msg, buffer = buffer.split(b'\n', 1)
-            if not msg.strip():
+    decoder = StateDecoder()
+    reader = FrameReader()  # JSON lines or binary frames, whichever the server sends
+    selector = selectors.DefaultSelector()
+    selector.register(sock, selectors.EVENT_READ)
+    try:
+        while not listener_stop.is_set():
+            if not selector.select(timeout=1.0):
+                continue
+            received_at = time.perf_counter()
+            try:
+                data = sock.recv(RECV_SIZE)
+            except (BlockingIOError, InterruptedError):
                 continue
+            except Exception as e:
+                logger.error(f"Socket error: {e}")
+                break
+            if not data:
+                logger.info("Display server closed the connection.")
+                break
+
             try:
-                new_state = json.loads(msg.decode())
-                with state_lock:
-                    sim_state = new_state
+                messages = reader.feed(data)
             except Exception as e:
-                logger.error(f"Error decoding JSON: {e}")
-        time.sleep(0.1)
-    sock.close()
+                logger.error(f"Error decoding display stream: {e}")
+                reader.buffer.clear()
+                continue
+            if not messages:
+                continue
+            with state_lock:
+                for message in messages:
+                    try:
+                        sim_state = decoder.apply(message)
+                    except ProtocolError as e:
+                        logger.error(f"Display stream out of sync: {e}")
+                state_version += 1
+                state_received_at = received_at
+    finally:
+        selector.close()
+        sock.close()
 
 def start_socket_listener():
     listener_thread = threading.Thread(target=socket_listener, daemon=True)
@@ -101,25 +178,8 @@ def start_socket_listener():
 # -------------------------------
 
 def draw_intersection():
-    # Clear background.
-    screen.fill(DARK_GRAY)
-    
-    # Draw roads.
-    pygame.draw.rect(screen, GRAY, (0, CENTER_Y - ROAD_WIDTH // 2, WIDTH, ROAD_WIDTH))
-    pygame.draw.rect(screen, GRAY, (CENTER_X - ROAD_WIDTH // 2, 0, ROAD_WIDTH, HEIGHT))
-    
-    # Draw intersection lines.
-    pygame.draw.line(screen, WHITE, (0, CENTER_Y - ROAD_WIDTH // 2), (WIDTH, CENTER_Y - ROAD_WIDTH // 2), 2)
-    pygame.draw.line(screen, WHITE, (0, CENTER_Y + ROAD_WIDTH // 2), (WIDTH, CENTER_Y + ROAD_WIDTH // 2), 2)
-    pygame.draw.line(screen, WHITE, (CENTER_X - ROAD_WIDTH // 2, 0), (CENTER_X - ROAD_WIDTH // 2, HEIGHT), 2)
-    pygame.draw.line(screen, WHITE, (CENTER_X + ROAD_WIDTH // 2, 0), (CENTER_X + ROAD_WIDTH // 2, HEIGHT), 2)
-    
-    # Draw cardinal direction labels.
-    font = pygame.font.SysFont("Arial", 28)
-    screen.blit(font.render("N", True, WHITE), (CENTER_X - 10, 10))
-    screen.blit(font.render("S", True, WHITE), (CENTER_X - 10, HEIGHT - 40))
-    screen.blit(font.render("E", True, WHITE), (WIDTH - 40, CENTER_Y - 10))
-    screen.blit(font.render("W", True, WHITE), (10, CENTER_Y - 10))
+    # Static layer (also clears the previous frame).
+    screen.blit(get_background(), (0, 0))
     
     # Draw traffic lights.
     with state_lock:
@@ -140,9 +200,9 @@ def draw_info():
         lights = sim_state.get("lights", {})
         queues = sim_state.get("queues", {})
         current_vehicle = sim_state.get("current_vehicle")
+        vehicles_in_box = sim_state.get("vehicles_in_box") or []
         event_logs = sim_state.get("event_logs", [])
     
-    font = pygame.font.SysFont("Arial", 18)
     info_lines = [
         f"Lights: N={lights.get('N','?')} S={lights.get('S','?')} E={lights.get('E','?')} W={lights.get('W','?')}",
         f"Queues: N={queues.get('N',0)} S={queues.get('S',0)} E={queues.get('E',0)} W={queues.get('W',0)}"
@@ -155,6 +215,8 @@ def draw_info():
         info_lines.append(f" Turn: {current_vehicle.get('turn','')}, Priority: {current_vehicle.get('priority',False)}")
     else:
         info_lines.append("No current vehicle.")
+    if len(vehicles_in_box) > 1:
+        info_lines.append(f"In intersection: {len(vehicles_in_box)} vehicles")
     info_lines.append("Recent Events:")
     if event_logs:
         for ev in event_logs:
@@ -165,8 +227,7 @@ def draw_info():
     # Draw the text in the top-left corner.
     y = 10
     for line in info_lines:
-        text_surf = font.render(line, True, WHITE)
-        screen.blit(text_surf, (10, y))
+        screen.blit(render_text(line, 18, WHITE), (10, y))
         y += 20
 
 def draw_simulation():
@@ -184,17 +245,56 @@ def draw_simulation():
         else:
             rect = pygame.Rect(veh["pos"][0], veh["pos"][1], 40, 20)
         pygame.draw.rect(screen, color, rect)
-        font = pygame.font.SysFont("Arial", 12)
-        text = font.render(veh["id"][:4], True, BLACK)
-        screen.blit(text, (veh["pos"][0], veh["pos"][1]))
+        screen.blit(render_text(veh["id"][:4], 12, BLACK), (veh["pos"][0], veh["pos"][1]))
 
 # -------------------------------
 # Main Loop
 # -------------------------------
 
+class LatencyTracker:
+    """Receive-to-render latency of state updates, logged every LATENCY_REPORT_INTERVAL seconds."""
+
+    def __init__(self, report_interval: float = LATENCY_REPORT_INTERVAL, window: int = 1000):
+        self.samples = deque(maxlen=window)
+        self.report_interval = report_interval
+        self.last_report = time.perf_counter()
+        self.rendered_version = 0
+
+    def frame_rendered(self) -> None:
+        """Call after a frame is on screen; records a sample if it showed a new state."""
+        with state_lock:
+            version, received_at = state_version, state_received_at
+        if version == self.rendered_version:
+            return
+        self.rendered_version = version
+        now = time.perf_counter()
+        self.samples.append(now - received_at)
+        if now - self.last_report >= self.report_interval:
+            self.report()
+            self.last_report = now
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+        if not samples:
+            return {"updates": 0}
+        return {
+            "updates": len(samples),
+            "p50_ms": samples[len(samples) // 2] * 1000,
+            "p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+            "max_ms": samples[-1] * 1000,
+        }
+
+    def report(self) -> None:
+        summary = self.summary()
+        if summary["updates"]:
+            logger.info(f"⏱️ Receive-to-render latency: p50={summary['p50_ms']:.1f} ms "
+                        f"p99={summary['p99_ms']:.1f} ms max={summary['max_ms']:.1f} ms "
+                        f"({summary['updates']} updates)")
+
 def main():
     # Start the socket listener thread.
     start_socket_listener()
+    latency = LatencyTracker()
     
     running = True
     while running:
@@ -206,14 +306,15 @@ def main():
             if event.type == pygame.KEYDOWN and event.key == pygame.K_q:
                 running = False
         
-        # Clear the screen.
-        screen.fill(BLACK)
-        # Draw the simulation state.
+        # Draw the simulation state (the background blit clears the screen).
         draw_simulation()
         
         pygame.display.flip()
+        latency.frame_rendered()
         clock.tick(60)
     
+    listener_stop.set()
+    latency.report()
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,150 @@
+import bisect
+import itertools
+import threading
+from typing import Dict, FrozenSet, Hashable, List, Tuple
+
+from normal_traffic import DIRECTIONS, DIRECTION_MAP
+
+Movement = Tuple[str, str]  # (source, turn)
+
+OPPOSITE = {"N": "S", "S": "N", "E": "W", "W": "E"}
+TURNS = ["straight", "left", "right"]
+EMERGENCY_TURN = "emergency"
+
+# (source, turn) -> destination, derived from the same table the generators use.
+DESTINATION = {(source, "straight"): OPPOSITE[source] for source in DIRECTIONS}
+DESTINATION.update({(source, turn): destination for (source, destination), turn in DIRECTION_MAP.items()})
+
+
+def movement_of(vehicle) -> Movement:
+    """(source, turn) of a vehicle; emergency vehicles get an exclusive movement."""
+    source = vehicle["source"]
+    if vehicle.get("priority", False):
+        return source, EMERGENCY_TURN
+    turn = vehicle.get("turn")
+    if turn not in TURNS:
+        destination = vehicle["destination"]
+        turn = "straight" if destination == OPPOSITE[source] else DIRECTION_MAP.get((source, destination), "straight")
+    return source, turn
+
+
+def movements_conflict(a: Movement, b: Movement) -> bool:
+    """
+    True if the two movements cannot share the intersection.
+    Emergency movements conflict with everything; movements from the same
+    approach never meet (they are served in order by one queue); movements
+    ending on the same arm merge; right turns conflict only by merging;
+    opposing through movements pass each other, as do opposing left turns;
+    every other straight/left combination crosses.
+    """
+    (source_a, turn_a), (source_b, turn_b) = a, b
+    if EMERGENCY_TURN in (turn_a, turn_b):
+        return True
+    if source_a == source_b:
+        return False
+    if DESTINATION[a] == DESTINATION[b]:
+        return True
+    if "right" in (turn_a, turn_b):
+        return False
+    if OPPOSITE[source_a] == source_b:
+        return turn_a != turn_b
+    return True
+
+
+ALL_MOVEMENTS = [(s, t) for s in DIRECTIONS for t in TURNS + [EMERGENCY_TURN]]
+CONFLICTS: Dict[Movement, FrozenSet[Movement]] = {
+    a: frozenset(b for b in ALL_MOVEMENTS if movements_conflict(a, b)) for a in ALL_MOVEMENTS
+}
+
+
+class Ticket:
+    __slots__ = ("key", "movement", "order", "vehicle", "admitted")
+
+    def __init__(self, key: Hashable, movement: Movement, order: Tuple[int, int], vehicle=None):
+        self.key = key
+        self.movement = movement
+        self.order = order
+        self.vehicle = vehicle
+        self.admitted = False
+
+    def __lt__(self, other: "Ticket") -> bool:
+        return self.order < other.order
+
+
+class Occupancy:
+    """
+    Who is in the intersection and who is waiting, without any blocking.
+    Waiting requests are served in order (emergencies first, then arrival order);
+    a request is admitted when it conflicts neither with a vehicle in the box nor
+    with an earlier request that is still waiting, so nobody is overtaken by a
+    conflicting movement.
+    """
+
+    def __init__(self):
+        self.occupants: Dict[Hashable, Ticket] = {}
+        self.waiting: List[Ticket] = []
+        self._counter = itertools.count()
+
+    def request(self, key: Hashable, movement: Movement, vehicle=None) -> Ticket:
+        rank = 0 if movement[1] == EMERGENCY_TURN else 1
+        ticket = Ticket(key, movement, (rank, next(self._counter)), vehicle)
+        bisect.insort(self.waiting, ticket)
+        return ticket
+
+    def admit_ready(self) -> List[Ticket]:
+        admitted, still_waiting = [], []
+        for ticket in self.waiting:
+            conflicts = CONFLICTS[ticket.movement]
+            blocked = any(other.movement in conflicts for other in self.occupants.values()) or \
+                any(other.movement in conflicts for other in still_waiting)
+            if blocked:
+                still_waiting.append(ticket)
+            else:
+                ticket.admitted = True
+                self.occupants[ticket.key] = ticket
+                admitted.append(ticket)
+        self.waiting = still_waiting
+        return admitted
+
+    def release(self, key: Hashable) -> None:
+        self.occupants.pop(key, None)
+
+    def cancel(self, ticket: Ticket) -> None:
+        if ticket in self.waiting:
+            self.waiting.remove(ticket)
+
+
+class AdmissionController:
+    """Thread-safe admission of vehicles into the intersection based on the conflict matrix."""
+
+    def __init__(self):
+        self._occupancy = Occupancy()
+        self._changed = threading.Condition()
+
+    def admit(self, vehicle, shutdown_flag=None, poll: float = 0.5) -> bool:
+        """
+        Blocks until the vehicle's movement is compatible with everything in the box.
+        Returns False if the shutdown flag was set while waiting.
+        """
+        with self._changed:
+            ticket = self._occupancy.request(vehicle["id"], movement_of(vehicle), vehicle)
+            if any(other is not ticket for other in self._occupancy.admit_ready()):
+                self._changed.notify_all()
+            while not ticket.admitted:
+                if shutdown_flag is not None and shutdown_flag.is_set():
+                    self._occupancy.cancel(ticket)
+                    self._occupancy.admit_ready()
+                    self._changed.notify_all()
+                    return False
+                self._changed.wait(poll)
+            return True
+
+    def release(self, vehicle) -> None:
+        with self._changed:
+            self._occupancy.release(vehicle["id"])
+            if self._occupancy.admit_ready():
+                self._changed.notify_all()
+
+    def vehicles_in_box(self) -> List:
+        with self._changed:
+            return [ticket.vehicle for ticket in self._occupancy.occupants.values()]
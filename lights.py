@@ -1,48 +1,158 @@
-import os
 import time
 import signal
 import logging
 import threading
 import multiprocessing
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from utils.shared_memory import SharedMemory
+from utils.metrics import NO_METRICS
+from utils.trace import NO_TRACE
+from utils.signals import PreemptionChannel
+from utils.clock import REAL_TIME, SimClock
 
 
 logging.basicConfig(level=logging.INFO, format="%(name)s - %(process)d - %(message)s")
 logger = logging.getLogger("lights")
 
+PRIORITY_POLL = 0.1  # Seconds between two priority-mode checks while an emergency holds the lights
 PHASE_DURATION = 30  # Seconds for each traffic light phase
 EMERGENCY_DURATION = 5  # Seconds for emergency priority mode
+MAX_EMERGENCY_GREEN = 20  # Seconds an emergency green may be extended to while other approaches wait
+
+# Actuated mode: phases adapt to the queue depths of the approaches.
+MIN_GREEN = 10  # Seconds a phase stays green before it can be cut
+MAX_GREEN = 60  # Seconds after which a phase ends if the other axis has vehicles waiting
+GAP_OUT = 3  # Seconds without vehicles on the green approaches before the phase is cut
+ACTUATED_STEP = 0.5  # Seconds between two queue checks
+SIGNAL_MODES = ("fixed", "actuated")
+
+
+def phase_lights(phase: str) -> dict:
+    """Light colors for a normal phase (NS or WE)."""
+    return {d: "GREEN" if d in phase else "RED" for d in ["N", "S", "E", "W"]}
+
+
+def emergency_lights(direction: str) -> dict:
+    """Light colors while a single direction has emergency priority."""
+    return {d: "GREEN" if d == direction else "RED" for d in ["N", "S", "E", "W"]}
+
+
+def next_phase(phase: str) -> str:
+    return "WE" if phase == "NS" else "NS"
+
+
+def actuated_should_switch(phase: str, elapsed: float, gap: float, queue_lengths: Dict[str, int],
+                           min_green: float = MIN_GREEN, max_green: float = MAX_GREEN,
+                           gap_out: float = GAP_OUT) -> bool:
+    """
+    Actuated timing rule: whether the current phase should end now.
+    :param elapsed: seconds since the phase turned green.
+    :param gap: seconds since a vehicle was last queued on the green approaches.
+    :param queue_lengths: vehicles per direction, as reported by DirectionQueue.qsize().
+    The phase holds for min_green, then rests in green while the red axis is empty;
+    otherwise it ends when the green approaches gap out or at max_green.
+    """
+    if elapsed < min_green:
+        return False
+    if not any(queue_lengths.get(d, 0) for d in next_phase(phase)):
+        return False
+    return elapsed >= max_green or gap >= gap_out
+
+class EmergencyQueue:
+    """
+    Arbitration of emergency preemption requests, shared by TrafficLights and the
+    discrete-event simulation (callers provide the clock and any locking).
+
+    An emergency green is given to one approach at a time (emergency_lights), so
+    requests for different approaches conflict and are served in the order of
+    their oldest request. Requests for an approach that is already waiting are
+    coalesced into its entry; a request for the approach that is green extends
+    the green to EMERGENCY_DURATION from now, up to MAX_EMERGENCY_GREEN when
+    other approaches are waiting.
+    """
+
+    def __init__(self, duration: float = EMERGENCY_DURATION, max_green: float = MAX_EMERGENCY_GREEN):
+        self.duration = duration
+        self.max_green = max_green
+        # Approach -> generation times of its waiting requests; dict order is the service order.
+        self.pending: Dict[str, List[float]] = {}
+        self.active: Optional[str] = None
+        self.green_since = 0.0
+        self.green_until = 0.0
+        self.coalesced = 0
+
+    def request(self, direction: str, generated_at: float, now: float) -> bool:
+        """
+        Adds a request. Returns True if it was served at once by extending the
+        active green; otherwise it waits for grant().
+        """
+        if direction == self.active and (not self.pending or now + self.duration <= self.green_since + self.max_green):
+            self.green_until = max(self.green_until, now + self.duration)
+            self.coalesced += 1
+            return True
+        if direction in self.pending:
+            self.coalesced += 1
+        self.pending.setdefault(direction, []).append(generated_at)
+        return False
+
+    def grant(self, now: float) -> Tuple[str, List[float]]:
+        """Gives the green to the longest-waiting approach; returns it with the generation times it clears."""
+        direction = next(iter(self.pending))
+        requests = self.pending.pop(direction)
+        self.active = direction
+        self.green_since = now
+        self.green_until = now + self.duration
+        return direction, requests
+
+    def release(self) -> None:
+        """Ends the active emergency green (once green_until has passed)."""
+        self.active = None
+
 
 class TrafficLights:
-    def __init__(self, shared_memory: SharedMemory, shutdown_flag):
+    def __init__(self, shared_memory: SharedMemory, shutdown_flag, queues=None, mode: str = "fixed",
+                 min_green: float = MIN_GREEN, max_green: float = MAX_GREEN, gap_out: float = GAP_OUT,
+                 preemption: Optional[PreemptionChannel] = None, metrics=NO_METRICS, recorder=NO_TRACE,
+                 clock: SimClock = REAL_TIME):
+        """
+        :param queues: per-direction queues, read in actuated mode.
+        :param mode: "fixed" (PHASE_DURATION per phase) or "actuated" (see actuated_should_switch).
+        :param preemption: channel the priority traffic generator sends emergency requests on
+            (one per intersection when several run side by side).
+        :param metrics: utils.metrics.MetricsRegistry counting emergency preemptions.
+        :param recorder: utils.trace.TraceRecorder recording light changes and emergency signals.
+        :param clock: utils.clock.SimClock timing phases and emergency greens (all durations are simulated seconds).
+        """
+        if mode not in SIGNAL_MODES:
+            raise ValueError(f"Invalid signal mode '{mode}' (must be one of {', '.join(SIGNAL_MODES)})")
+        if mode == "actuated" and queues is None:
+            raise ValueError("Actuated signal mode needs the direction queues")
         self.shared_memory = shared_memory
         self.shutdown_flag = shutdown_flag
+        self.queues = queues
+        self.mode = mode
+        self.min_green = min_green
+        self.max_green = max_green
+        self.gap_out = gap_out
+        self.preemption = preemption
+        self.metrics = metrics
+        self.recorder = recorder
+        self.clock = clock
         self._shutdown_called = False
-        
-        # Write PID file with error handling
-        try:
-            with open("lights.pid", "w") as f:
-                f.write(str(os.getpid()))
-            logger.info("PID file created successfully")
-        except IOError as e:
-            logger.error(f"Failed to create PID file: {e}")
-            raise RuntimeError("Could not initialize traffic lights") from e
-
-        # Initialize signal handling
-        signal.signal(signal.SIGUSR1, self.handle_priority_signal)
-        signal.signal(signal.SIGINT, self.signal_handler)
-        
+        # Emergency requests wait here for the arbiter thread.
+        self.emergencies = EmergencyQueue()
+        self._emergency_cond = threading.Condition()
+        # Seconds from an emergency vehicle's generation to its approach turning GREEN (clearance latency).
+        self.preemption_latencies = {d: [] for d in ["N", "S", "E", "W"]}
+
         # Set initial light states
         self._initialize_lights()
 
     def _initialize_lights(self) -> None:
         """Set initial light states for NS/WEW traffic flow"""
         try:
-            self.shared_memory.set_light("N", "GREEN")
-            self.shared_memory.set_light("S", "GREEN")
-            self.shared_memory.set_light("E", "RED")
-            self.shared_memory.set_light("W", "RED")
+            self.shared_memory.set_lights(phase_lights("NS"))
+            self.recorder.lights(phase_lights("NS"))
             logger.info("Initial light states set: NS-GREEN, EW-RED")
         except Exception as e:
             logger.error(f"Failed to initialize lights: {e}")
@@ -54,52 +164,83 @@ class TrafficLights:
             logger.info("Received shutdown signal")
             self.handle_shutdown()
 
-    def handle_priority_signal(self, signum: int, frame: Optional[object]) -> None:
-        """Handle SIGUSR1 signal in a thread-safe manner"""
-        thread = threading.Thread(
-            target=self._handle_emergency_mode, 
-            daemon=True,
-            name="EmergencyHandler"
-        )
-        thread.start()
-
-    def _handle_emergency_mode(self) -> None:
-        """Process emergency vehicle priority request."""
-        try:
-            direction = self.shared_memory.get_state("priority_direction")
-            if direction is None:
-                # For testing, default to a valid direction (e.g., "N")
-                direction = "N"
-                logger.warning("No emergency direction set; defaulting to N.")
-            if direction in ("N", "S", "E", "W"):
-                logger.warning(f"🚑 Activating emergency mode for {direction}")
-                self._set_single_green(direction)
-            else:
-                logger.error(f"Invalid emergency direction: {direction}")
-        except Exception as e:
-            logger.error(f"Emergency mode error: {e}")
+    def listen_for_preemption(self) -> None:
+        """Blocks on the preemption channel and hands each request to the arbiter as it arrives."""
+        while not self.shutdown_flag.is_set():
+            request = self.preemption.wait(timeout=0.5)
+            if request is not None:
+                self.request_emergency(*request)
+
+    def request_emergency(self, direction: str, generated_at: Optional[float] = None) -> None:
+        """
+        Queues a preemption request for the emergency arbiter. A request for the
+        approach that is already green extends its green instead.
+        """
+        if direction not in ("N", "S", "E", "W"):
+            logger.error(f"Invalid emergency direction: {direction}")
+            return
+        now = self.clock.time()
+        generated_at = generated_at or now
+        with self._emergency_cond:
+            extended = self.emergencies.request(direction, generated_at, now)
+            self._emergency_cond.notify()
+        if extended:
+            logger.info(f"🚑 Emergency green for {direction} extended by a new request")
+            self._record_clearance(direction, [generated_at], now)
+        else:
+            logger.warning(f"🚑 Emergency request for {direction} queued")
+
+    def arbitrate_emergencies(self) -> None:
+        """The single emergency scheduler: grants queued requests one approach at a time."""
+        while not self.shutdown_flag.is_set():
+            with self._emergency_cond:
+                if not self.emergencies.pending:
+                    self._emergency_cond.wait(0.5)
+                    continue
+                direction, requests = self.emergencies.grant(self.clock.time())
+            try:
+                self._set_single_green(direction, requests)
+                self._hold_emergency_green(direction)
+            except Exception as e:
+                logger.error(f"Emergency mode failed: {e}")
+                with self._emergency_cond:
+                    self.emergencies.release()
+                self.shared_memory.reset_priority_mode()
 
-    def _set_single_green(self, direction: str) -> None:
+    def _set_single_green(self, direction: str, requests: List[float]) -> None:
         """Set green light for a single direction (emergency mode)"""
-        try:
-            self.shared_memory.set_priority_mode(direction)
-            for d in ["N", "S", "E", "W"]:
-                status = "GREEN" if d == direction else "RED"
-                self.shared_memory.set_light(d, status)
-            
-            logger.info(f"🚑 Emergency priority: {direction}-GREEN")
-            start_time = time.time()
-            
-            # Maintain emergency mode unless interrupted.
-            while (time.time() - start_time < EMERGENCY_DURATION 
-                   and not self.shutdown_flag.is_set()):
-                time.sleep(0.1)
-            
-            logger.info("Returning to normal operation")
-            self.shared_memory.reset_priority_mode()
-        except Exception as e:
-            logger.error(f"Emergency mode failed: {e}")
-            self.shared_memory.reset_priority_mode()
+        self.shared_memory.set_priority_mode(direction)
+        self.recorder.emergency(direction)
+        self.shared_memory.set_lights(emergency_lights(direction))
+        self.recorder.lights(emergency_lights(direction))
+        self.metrics.inc("crossroads_emergency_preemptions_total", direction)
+        logger.info(f"🚑 Emergency priority: {direction}-GREEN ({len(requests)} request(s))")
+        self._record_clearance(direction, requests, self.clock.time())
+
+    def _hold_emergency_green(self, direction: str) -> None:
+        """Keeps the emergency green until it expires (requests for the approach push the end back)."""
+        with self._emergency_cond:
+            while not self.shutdown_flag.is_set():
+                remaining = self.emergencies.green_until - self.clock.time()
+                if remaining <= 0:
+                    break
+                self._emergency_cond.wait(min(self.clock.wall(remaining), 0.5))
+            self.emergencies.release()
+            more = bool(self.emergencies.pending)
+        if more and not self.shutdown_flag.is_set():
+            # Straight to the next emergency green, without a normal phase in between.
+            logger.info(f"Emergency green for {direction} ended; next emergency waiting")
+            return
+        logger.info("Returning to normal operation")
+        self.shared_memory.reset_priority_mode()
+
+    def _record_clearance(self, direction: str, requests: List[float], green_at: float) -> None:
+        """Clearance latency of each request: from the vehicle's generation to its approach turning GREEN."""
+        for generated_at in requests:
+            latency = green_at - generated_at
+            self.preemption_latencies[direction].append(latency)
+            self.metrics.observe("crossroads_preemption_latency_seconds", latency, direction)
+            logger.info(f"🚑 {direction} emergency cleared {latency * 1000:.1f} ms after generation")
 
     def normal_operation(self) -> None:
         """Main traffic light control loop"""
@@ -109,31 +250,48 @@ class TrafficLights:
         try:
             while not self.shutdown_flag.is_set():
                 if self.shared_memory.in_priority_mode():
-                    time.sleep(0.1)
+                    time.sleep(self.clock.poll_interval(PRIORITY_POLL))
                     continue
                 
                 # Set lights for current phase.
                 self._set_phase_lights(current_phase)
                 logger.info(f"🚦 {current_phase} phase active")
                 
-                # Wait for phase duration with frequent shutdown checks.
-                start_time = time.time()
-                while (time.time() - start_time < PHASE_DURATION 
-                       and not self.shutdown_flag.is_set()):
-                    time.sleep(0.1)
+                if self.mode == "actuated":
+                    self._wait_actuated(current_phase)
+                else:
+                    # Wait for the phase duration, cut short by shutdown.
+                    self.clock.wait(self.shutdown_flag, PHASE_DURATION)
                 
                 # Switch to next phase.
-                current_phase = "WE" if current_phase == "NS" else "NS"
+                current_phase = next_phase(current_phase)
         except Exception as e:
             logger.error(f"Normal operation error: {e}")
             self.handle_shutdown()
 
+    def _queue_lengths(self) -> Dict[str, int]:
+        """Same per-direction depths as DisplayServer.generate_status reports."""
+        return {d: self.queues[d].qsize() for d in ["N", "S", "E", "W"]}
+
+    def _wait_actuated(self, phase: str) -> None:
+        """Keeps the phase green until actuated_should_switch() says otherwise."""
+        start_time = last_demand = self.clock.time()
+        while not self.shutdown_flag.is_set():
+            time.sleep(self.clock.poll_interval(ACTUATED_STEP))
+            now = self.clock.time()
+            queue_lengths = self._queue_lengths()
+            if any(queue_lengths[d] for d in phase):
+                last_demand = now
+            if actuated_should_switch(phase, now - start_time, now - last_demand, queue_lengths,
+                                      self.min_green, self.max_green, self.gap_out):
+                logger.info(f"🚦 {phase} phase ended after {now - start_time:.1f} s (queues: {queue_lengths})")
+                return
+
     def _set_phase_lights(self, phase: str) -> None:
-        """Update lights for a given phase (NS or WE)"""
+        """Update lights for a given phase (NS or WE); waiting vehicles are woken up by set_lights()"""
         try:
-            for direction in ["N", "S", "E", "W"]:
-                status = "GREEN" if direction in phase else "RED"
-                self.shared_memory.set_light(direction, status)
+            self.shared_memory.set_lights(phase_lights(phase))
+            self.recorder.lights(phase_lights(phase))
         except Exception as e:
             logger.error(f"Failed to set {phase} phase: {e}")
             raise
@@ -146,13 +304,12 @@ class TrafficLights:
         self._shutdown_called = True
         logger.info("🛑 Beginning shutdown sequence")
         self.shutdown_flag.set()
-        
-        try:
-            if os.path.exists("lights.pid"):
-                os.remove("lights.pid")
-                logger.info("Removed PID file")
-        except Exception as e:
-            logger.error(f"PID file removal failed: {e}")
+        for direction, samples in self.preemption_latencies.items():
+            if samples:
+                logger.info(f"{direction}: emergency clearance mean {sum(samples) / len(samples) * 1000:.1f} ms, "
+                            f"max {max(samples) * 1000:.1f} ms over {len(samples)} requests")
+        if self.emergencies.coalesced:
+            logger.info(f"{self.emergencies.coalesced} emergency request(s) coalesced into an existing green")
         
         try:
             self.shared_memory.cleanup()
@@ -161,6 +318,11 @@ class TrafficLights:
 
     def run(self) -> None:
         """Main entry point for traffic light controller"""
+        # Installed here, in the lights process, rather than in whichever process built the object.
+        signal.signal(signal.SIGINT, self.signal_handler)
+        threading.Thread(target=self.arbitrate_emergencies, daemon=True, name="EmergencyArbiter").start()
+        if self.preemption is not None:
+            threading.Thread(target=self.listen_for_preemption, daemon=True, name="PreemptionListener").start()
         try:
             self.normal_operation()
         except KeyboardInterrupt:
@@ -175,7 +337,7 @@ if __name__ == "__main__":
     _shutdown_flag = multiprocessing.Event()
     try:
         sm = SharedMemory(manager)
-        lights = TrafficLights(sm, _shutdown_flag)
+        lights = TrafficLights(sm, _shutdown_flag, preemption=PreemptionChannel())
         lights.run()
     except Exception as e:
         logger.error(f"Critical failure: {e}")
@@ -191,7 +353,9 @@ Usage Notes:
 - Configuration
     Modify constants at the top of the file to adjust timing:
         PHASE_DURATION = 30  # Normal phase duration
-        EMERGENCY_DURATION = 5  # How long emergency mode lasts
+        EMERGENCY_DURATION = 5  # How long emergency mode lasts (extended by further requests)
+        MAX_EMERGENCY_GREEN = 20  # Longest extended emergency green while other approaches wait
+        MIN_GREEN / MAX_GREEN / GAP_OUT  # Actuated mode (TrafficLights(..., queues, mode="actuated"))
 - Error Recovery
     The system will attempt to:
     Recover from failed shared memory operations
@@ -1,35 +1,72 @@
 #!/usr/bin/env python3
+import argparse
 import time
 from multiprocessing import Manager, Process
 from multiprocessing.managers import SyncManager
 
 from coordinator import Coordinator, DisplayServer
-from lights import TrafficLights
+from lights import SIGNAL_MODES, TrafficLights
 from normal_traffic import normal_traffic_gen
 from priority_traffic import priority_traffic_gen 
 from utils.message_queues import create_queues
-from utils.shared_memory import SharedMemory
+from utils.shared_memory import create_shared_memory
+from utils.metrics import METRICS_PORT, NO_METRICS, MetricsRegistry, MetricsServer
+from utils.trace import NO_TRACE, TraceRecorder
+from utils.signals import PreemptionChannel, children_ignore_sigint
+from utils.clock import SimClock
 from display import main as run_display_client  
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Crossroads simulation")
+    parser.add_argument("--native-shm", action="store_true",
+                        help="use the multiprocessing.shared_memory backend instead of manager proxies")
+    parser.add_argument("--event-log-capacity", type=int, default=20,
+                        help="number of event log entries kept in shared memory")
+    parser.add_argument("--compact-vehicles", action="store_true",
+                        help="send normal vehicles through the queues as compact binary records")
+    parser.add_argument("--signal-mode", choices=SIGNAL_MODES, default="fixed",
+                        help="fixed-time phases or actuated phases driven by queue lengths")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="serve Prometheus metrics on this local port (0 disables metrics)")
+    parser.add_argument("--record", metavar="PATH",
+                        help="record arrivals, departures, light changes and emergencies to a trace file")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="run seed: the generators produce the same vehicles and IDs on every run")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="run simulated time this many times faster than real time (e.g. 100 for soak tests)")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    if args.speed <= 0:
+        raise SystemExit("--speed must be positive")
     manager: SyncManager = Manager()
     shutdown_flag = manager.Event()
 
     # Create shared resources using the same manager.
     queues = create_queues()  
-    shared_memory = SharedMemory(manager)
+    shared_memory = create_shared_memory(manager, native=args.native_shm,
+                                         event_log_capacity=args.event_log_capacity)
     
+    metrics = MetricsRegistry() if args.metrics_port else NO_METRICS
+    # One simulated clock for every process: durations below are simulated seconds.
+    clock = SimClock(args.speed)
+    recorder = TraceRecorder(args.record, clock=clock.time) if args.record else NO_TRACE
+    preemption = PreemptionChannel()
+
     # Instantiate the simulation components.
-    coordinator_instance = Coordinator(queues, shared_memory, shutdown_flag)
-    display_server_instance = DisplayServer(queues, shared_memory, shutdown_flag)
-    lights_instance = TrafficLights(shared_memory, shutdown_flag)
+    coordinator_instance = Coordinator(queues, shared_memory, shutdown_flag, metrics=metrics, recorder=recorder,
+                                       clock=clock)
+    display_server_instance = DisplayServer(queues, shared_memory, shutdown_flag, clock=clock)
+    lights_instance = TrafficLights(shared_memory, shutdown_flag, queues, mode=args.signal_mode,
+                                    preemption=preemption, metrics=metrics, recorder=recorder, clock=clock)
     
     # Create processes for each simulation component.
     coordinator_process = Process(target=coordinator_instance.run, name="Coordinator")
     display_server_process = Process(target=display_server_instance.run, name="DisplayServer")
     lights_process = Process(target=lights_instance.run, name="TrafficLights")
-    normal_traffic_process = Process(target=normal_traffic_gen, args=(queues, 10, shutdown_flag), name="NormalTraffic")
-    priority_traffic_process = Process(target=priority_traffic_gen, args=(queues, 20, shutdown_flag, manager), name="PriorityTraffic")
+    normal_traffic_process = Process(target=normal_traffic_gen, args=(queues, 10, shutdown_flag, None, args.compact_vehicles, metrics, recorder, args.seed, clock), name="NormalTraffic")
+    priority_traffic_process = Process(target=priority_traffic_gen, args=(queues, 20, shutdown_flag, preemption, metrics, recorder, args.seed, clock), name="PriorityTraffic")
     display_client_process = Process(target=run_display_client, name="DisplayClient")
     
     processes = [
@@ -40,14 +77,19 @@ def main():
         priority_traffic_process,
         display_client_process,
     ]
+    if args.metrics_port:
+        metrics_server = MetricsServer(metrics, queues, shared_memory, shutdown_flag, port=args.metrics_port)
+        processes.insert(-1, Process(target=metrics_server.run, name="MetricsServer"))
     
-    # Start all processes (start display client after a delay).
-    for p in processes[:-1]:
-        p.start()
-    time.sleep(2)
-    processes[-1].start()
+    # Start all processes (start display client after a delay). Ctrl+C is handled
+    # here only: the children are stopped through the shutdown flag.
+    with children_ignore_sigint():
+        for p in processes[:-1]:
+            p.start()
+        time.sleep(2)
+        processes[-1].start()
 
-    print("Simulation started. Press Ctrl+C to shut down.")
+    print(f"Simulation started{f' at {args.speed:g}x speed' if args.speed != 1 else ''}. Press Ctrl+C to shut down.")
     
     try:
         while True:
@@ -57,8 +99,18 @@ def main():
         shutdown_flag.set()
     
     for p in processes:
-        p.join()
+        p.join(timeout=10)
+        if p.is_alive():
+            # The display client is a GUI that only exits when its window is closed.
+            p.terminate()
+            p.join(timeout=5)
+        if p.is_alive():
+            p.kill()
+            p.join()
     
+    shared_memory.close()
+    if args.metrics_port:
+        metrics.close()
     print("All processes have been terminated.")
 
 if __name__ == "__main__":
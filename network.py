@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Road network of several crossroads connected by links.
+
+The topology is a JSON file:
+
+    {
+      "intersections": {"A": {"normal_interval": 8}, "B": {"signal_mode": "actuated"}},
+      "links": [
+        {"from": "A", "exit": "E", "to": "B", "entry": "W", "travel_time": 15},
+        {"from": "B", "exit": "W", "to": "A", "entry": "E", "travel_time": 15}
+      ]
+    }
+
+A vehicle leaving intersection A on its E arm reaches B after travel_time
+and joins B's W queue with a new random destination. Arms without an
+outgoing link leave the network; new vehicles only enter on arms without an
+incoming link. Per-intersection options: normal_interval, priority_interval
+(0 disables), signal_mode, display_port.
+
+    python network.py networks/corridor.json --simulate --hours 2 --seed 1
+    python network.py networks/corridor.json          # live, one process group per intersection
+"""
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from multiprocessing import Manager, Process, Value
+from typing import Dict, List, NamedTuple, Optional
+
+from lights import SIGNAL_MODES
+from normal_traffic import DIRECTIONS, create_vehicle, turn_for
+from priority_traffic import create_emergency_vehicle
+from utils.message_queues import enqueue
+from utils.rng import RandomStreams, derive_seed
+
+logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
+logger = logging.getLogger("network")
+
+DEFAULT_NORMAL_INTERVAL = 10
+DEFAULT_PRIORITY_INTERVAL = 0  # Emergency vehicles are opt-in per intersection
+
+
+class Link(NamedTuple):
+    source: str  # Intersection the vehicles leave
+    exit: str  # Arm of `source` they leave on
+    target: str  # Intersection they reach
+    entry: str  # Arm of `target` they arrive on
+    travel_time: float
+
+
+class NetworkConfig:
+    def __init__(self, intersections: Dict[str, dict], links: List[Link]):
+        self.intersections = intersections
+        self.links = {(link.source, link.exit): link for link in links}
+        self.validate(links)
+
+    @classmethod
+    def load(cls, path: str) -> "NetworkConfig":
+        with open(path) as f:
+            config = json.load(f)
+        intersections = config["intersections"]
+        if isinstance(intersections, list):
+            intersections = {name: {} for name in intersections}
+        links = [Link(link["from"], link["exit"], link["to"], link["entry"], float(link.get("travel_time", 10)))
+                 for link in config.get("links", [])]
+        return cls(intersections, links)
+
+    def validate(self, links: List[Link]) -> None:
+        if len(self.links) != len(links):
+            raise ValueError("Two links leave the same arm of an intersection")
+        entries = [(link.target, link.entry) for link in links]
+        if len(set(entries)) != len(entries):
+            raise ValueError("Two links arrive on the same arm of an intersection")
+        for link in links:
+            for name in (link.source, link.target):
+                if name not in self.intersections:
+                    raise ValueError(f"Link {link} refers to unknown intersection '{name}'")
+            if link.exit not in DIRECTIONS or link.entry not in DIRECTIONS:
+                raise ValueError(f"Link {link} has an invalid arm (must be N, S, E, or W)")
+            if link.travel_time < 0:
+                raise ValueError(f"Link {link} has a negative travel time")
+        for name, options in self.intersections.items():
+            if options.get("signal_mode", "fixed") not in SIGNAL_MODES:
+                raise ValueError(f"Intersection '{name}' has an invalid signal_mode")
+
+    def option(self, name: str, key: str, default):
+        return self.intersections[name].get(key, default)
+
+    def boundary_arms(self, name: str) -> List[str]:
+        """Arms of an intersection where new vehicles enter the network."""
+        linked = {link.entry for link in self.links.values() if link.target == name}
+        return [d for d in DIRECTIONS if d not in linked]
+
+
+def forward(vehicle: dict, link: Link, now: float, rng=random) -> dict:
+    """
+    The vehicle as it arrives at the next intersection: same identity, new approach and destination.
+    :param rng: source of the new destination (the global random module by default).
+    """
+    destination = rng.choice([d for d in DIRECTIONS if d != link.entry])
+    forwarded = dict(vehicle)
+    forwarded.update({
+        "source": link.entry,
+        "destination": destination,
+        "turn": "emergency" if vehicle.get("priority", False) else turn_for(link.entry, destination),
+        "timestamp": now,
+        "hops": vehicle.get("hops", 0) + 1,
+    })
+    forwarded.setdefault("entered_network", vehicle.get("timestamp", now))
+    return forwarded
+
+
+# --- Live network (one Coordinator + TrafficLights per intersection) ---
+
+class LinkForwarder:
+    """
+    Coordinator.on_departure hook: puts a departing vehicle on the outgoing link
+    of its destination arm and enqueues it at the neighbor once the travel time
+    has elapsed. Vehicles in transit are kept on a heap served by one thread,
+    started in the coordinator's process on first use.
+    """
+
+    def __init__(self, name: str, config: NetworkConfig, queues_by_intersection: Dict[str, dict], exits=None):
+        """
+        :param exits: multiprocessing.Value counting vehicles that leave the network,
+                      shared by the forwarders of all intersections (a private one by default).
+        """
+        self.name = name
+        self.links = {exit_arm: link for (source, exit_arm), link in config.links.items() if source == name}
+        self.queues_by_intersection = queues_by_intersection
+        self.exits = exits if exits is not None else Value("L", 0)
+        self._reset()
+
+    def _reset(self) -> None:
+        self._in_transit = []
+        self._counter = itertools.count()
+        self._changed = threading.Condition()
+        self._thread = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for key in ("_in_transit", "_counter", "_changed", "_thread"):
+            state.pop(key)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset()
+
+    def __call__(self, vehicle) -> None:
+        link = self.links.get(vehicle["destination"])
+        if link is None:
+            # Called from every direction thread of the coordinator.
+            with self.exits.get_lock():
+                self.exits.value += 1
+            return
+        if not isinstance(vehicle, dict):  # Compact Vehicle record
+            vehicle = vehicle.to_dict()
+        vehicle = forward(vehicle, link, time.time() + link.travel_time)
+        with self._changed:
+            heapq.heappush(self._in_transit, (vehicle["timestamp"], next(self._counter), link.target, vehicle))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._deliver, daemon=True, name=f"Links-{self.name}")
+                self._thread.start()
+            self._changed.notify()
+
+    def _deliver(self) -> None:
+        while True:
+            with self._changed:
+                while not self._in_transit or self._in_transit[0][0] > time.time():
+                    timeout = self._in_transit[0][0] - time.time() if self._in_transit else None
+                    self._changed.wait(timeout)
+                _, _, target, vehicle = heapq.heappop(self._in_transit)
+            enqueue(self.queues_by_intersection[target], vehicle, vehicle["source"])
+            logger.info(f"🛣️ Vehicle {vehicle['id'][:8]} {self.name} -> {target} (arm {vehicle['source']})")
+
+
+def boundary_traffic_gen(queues, arms: List[str], interval: float, shutdown_flag) -> None:
+    """normal_traffic_gen restricted to the arms where vehicles enter the network."""
+    while not shutdown_flag.is_set():
+        vehicle = create_vehicle(sources=arms)
+        enqueue(queues, vehicle, vehicle["source"])
+        shutdown_flag.wait(interval)
+
+
+def run_network(config: NetworkConfig, native_shm: bool = False) -> None:
+    """Starts every intersection as its own Coordinator/TrafficLights pair and runs until Ctrl+C."""
+    from coordinator import Coordinator, DisplayServer
+    from lights import TrafficLights
+    from priority_traffic import priority_traffic_gen
+    from utils.message_queues import create_queues
+    from utils.shared_memory import create_shared_memory
+    from utils.signals import PreemptionChannel, children_ignore_sigint
+
+    manager = Manager()
+    shutdown_flag = manager.Event()
+    queues_by_intersection = {name: create_queues() for name in config.intersections}
+    exits = Value("L", 0)
+    shared_memories = []
+    processes = []
+    for name in config.intersections:
+        queues = queues_by_intersection[name]
+        shared_memory = create_shared_memory(manager, native=native_shm)
+        shared_memories.append(shared_memory)
+        preemption = PreemptionChannel()
+        lights = TrafficLights(shared_memory, shutdown_flag, queues,
+                               mode=config.option(name, "signal_mode", "fixed"), preemption=preemption)
+        coordinator = Coordinator(queues, shared_memory, shutdown_flag,
+                                  on_departure=LinkForwarder(name, config, queues_by_intersection, exits))
+        processes.append(Process(target=lights.run, name=f"TrafficLights-{name}"))
+        processes.append(Process(target=coordinator.run, name=f"Coordinator-{name}"))
+        arms = config.boundary_arms(name)
+        normal_interval = config.option(name, "normal_interval", DEFAULT_NORMAL_INTERVAL)
+        if arms and normal_interval:
+            processes.append(Process(target=boundary_traffic_gen, args=(queues, arms, normal_interval, shutdown_flag),
+                                     name=f"NormalTraffic-{name}"))
+        priority_interval = config.option(name, "priority_interval", DEFAULT_PRIORITY_INTERVAL)
+        if arms and priority_interval:
+            # Emergency vehicles enter the network on the same arms as normal traffic.
+            processes.append(Process(target=priority_traffic_gen,
+                                     args=(queues, priority_interval, shutdown_flag, preemption),
+                                     kwargs={"sources": arms}, name=f"PriorityTraffic-{name}"))
+        display_port = config.option(name, "display_port", None)
+        if display_port:
+            server = DisplayServer(queues, shared_memory, shutdown_flag, port=display_port)
+            processes.append(Process(target=server.run, name=f"DisplayServer-{name}"))
+
+    with children_ignore_sigint():
+        for p in processes:
+            p.start()
+    logger.info(f"Network of {len(config.intersections)} intersections and {len(config.links)} links started.")
+    try:
+        while not shutdown_flag.is_set():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.info("Shutdown signal received. Terminating all processes...")
+        shutdown_flag.set()
+    for p in processes:
+        p.join()
+    logger.info(f"Network: {exits.value} vehicles exited")
+    for shared_memory in shared_memories:
+        shared_memory.close()
+
+
+# --- Headless network (discrete-event simulation) ---
+
+class NetworkStats:
+    def __init__(self):
+        self.exited = 0
+        self.total_travel_time = 0.0
+        self.max_travel_time = 0.0
+        self.total_hops = 0
+
+    def record_exit(self, vehicle: dict, now: float) -> None:
+        travel_time = now - vehicle.get("entered_network", vehicle["timestamp"])
+        self.exited += 1
+        self.total_travel_time += travel_time
+        self.max_travel_time = max(self.max_travel_time, travel_time)
+        self.total_hops += vehicle.get("hops", 0)
+
+    def merge(self, other: "NetworkStats") -> None:
+        self.exited += other.exited
+        self.total_travel_time += other.total_travel_time
+        self.max_travel_time = max(self.max_travel_time, other.max_travel_time)
+        self.total_hops += other.total_hops
+
+    def summary(self) -> dict:
+        return {
+            "exited": self.exited,
+            "average_travel_time": self.total_travel_time / self.exited if self.exited else 0.0,
+            "max_travel_time": self.max_travel_time,
+            "average_hops": self.total_hops / self.exited if self.exited else 0.0,
+        }
+
+
+class SimulatedNetwork:
+    """
+    Some or all intersections of a network on one virtual clock. Vehicles
+    forwarded to an intersection outside `names` are collected in `outbox` as
+    (arrival_time, target, vehicle, order) for the caller to hand to the shard
+    that owns the target (see sharded_network.py).
+
+    Each intersection draws from its own RNG streams, derived from the run seed
+    and its name, and schedules through its own LocalScheduler, so its traffic
+    and the order of simultaneous events do not depend on which other
+    intersections share the process.
+    """
+
+    def __init__(self, config: NetworkConfig, scheduler, names: Optional[List[str]] = None,
+                 seed: Optional[int] = None):
+        """
+        :param seed: run seed; None draws from the global random module.
+        """
+        from simulation import LocalScheduler, SimulatedIntersection
+
+        self.config = config
+        self.scheduler = scheduler
+        self.stats = NetworkStats()
+        self.outbox = []
+        self.nodes = {}
+        self.streams = {}
+        self.schedulers = {}
+        ranks = {name: rank for rank, name in enumerate(config.intersections)}
+        for name in names if names is not None else list(config.intersections):
+            self.streams[name] = RandomStreams(None if seed is None else derive_seed(seed, name))
+            self.schedulers[name] = LocalScheduler(scheduler, ranks[name])
+            self.nodes[name] = SimulatedIntersection(
+                self.schedulers[name], signal_mode=config.option(name, "signal_mode", "fixed"),
+                on_departure=lambda vehicle, name=name: self._departed(name, vehicle))
+
+    def start(self) -> None:
+        for name, node in self.nodes.items():
+            node.start()
+            arms = self.config.boundary_arms(name)
+            normal_interval = self.config.option(name, "normal_interval", DEFAULT_NORMAL_INTERVAL)
+            priority_interval = self.config.option(name, "priority_interval", DEFAULT_PRIORITY_INTERVAL)
+            if arms and normal_interval:
+                self.schedulers[name].schedule(0, self._normal_arrival, name, arms, normal_interval)
+            if arms and priority_interval:
+                self.schedulers[name].schedule(0, self._priority_arrival, name, arms, priority_interval)
+
+    def deliver(self, batch) -> None:
+        """Schedules vehicles forwarded from other shards, in the order their origin gave them."""
+        for arrival_time, target, vehicle, order in batch:
+            self.scheduler.schedule_ordered(max(arrival_time, self.scheduler.now), order, self.arrive, target, vehicle)
+
+    def arrive(self, name: str, vehicle: dict) -> None:
+        vehicle["timestamp"] = self.scheduler.now
+        self.nodes[name].arrive(vehicle)
+        if vehicle.get("priority", False):
+            self.nodes[name].trigger_emergency(vehicle["source"])
+
+    def _departed(self, name: str, vehicle: dict) -> None:
+        link = self.config.links.get((name, vehicle["destination"]))
+        if link is None:
+            self.stats.record_exit(vehicle, self.scheduler.now)
+            return
+        forwarded = forward(vehicle, link, self.scheduler.now, self.streams[name].stream("forward"))
+        local = self.schedulers[name]
+        if link.target in self.nodes:
+            local.schedule(link.travel_time, self.arrive, link.target, forwarded)
+        else:
+            self.outbox.append((self.scheduler.now + link.travel_time, link.target, forwarded, local.next_order()))
+
+    def _normal_arrival(self, name: str, arms: List[str], interval: float) -> None:
+        self.arrive(name, create_vehicle(sources=arms, streams=self.streams[name]))
+        self.schedulers[name].schedule(interval, self._normal_arrival, name, arms, interval)
+
+    def _priority_arrival(self, name: str, arms: List[str], interval: float) -> None:
+        streams = self.streams[name]
+        vehicle = create_emergency_vehicle(streams)
+        rng = streams.stream("priority/arms")
+        vehicle["source"] = rng.choice(arms)
+        vehicle["destination"] = rng.choice([d for d in DIRECTIONS if d != vehicle["source"]])
+        self.arrive(name, vehicle)
+        self.schedulers[name].schedule(interval, self._priority_arrival, name, arms, interval)
+
+    def summary(self, duration: float) -> dict:
+        return {name: node.stats.summary(duration) for name, node in self.nodes.items()}
+
+
+def simulate_network(config: NetworkConfig, duration: float, seed: Optional[int] = None) -> dict:
+    """Simulates the whole network on one virtual clock; returns per-intersection and network statistics."""
+    from simulation import EventScheduler
+
+    scheduler = EventScheduler()
+    network = SimulatedNetwork(config, scheduler, seed=seed)
+    network.start()
+    scheduler.run_until(duration)
+    return {
+        "intersections": network.summary(duration),
+        "network": network.stats.summary(),
+        "events_processed": scheduler.events_processed,
+    }
+
+
+def grid_config(rows: int, cols: int, travel_time: float = 15, **options) -> NetworkConfig:
+    """
+    A rows x cols grid named "r<row>c<col>" with two-way links between neighbors.
+    :param options: per-intersection options applied to every intersection.
+    """
+    name = lambda r, c: f"r{r}c{c}"  # noqa: E731
+    links = []
+    for r in range(rows):
+        for c in range(cols):
+            if c + 1 < cols:
+                links.append(Link(name(r, c), "E", name(r, c + 1), "W", travel_time))
+                links.append(Link(name(r, c + 1), "W", name(r, c), "E", travel_time))
+            if r + 1 < rows:
+                links.append(Link(name(r, c), "S", name(r + 1, c), "N", travel_time))
+                links.append(Link(name(r + 1, c), "N", name(r, c), "S", travel_time))
+    intersections = {name(r, c): dict(options) for r in range(rows) for c in range(cols)}
+    return NetworkConfig(intersections, links)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("config", help="network topology (JSON)")
+    parser.add_argument("--simulate", action="store_true", help="run headless on a virtual clock")
+    parser.add_argument("--hours", type=float, default=1, help="simulated duration with --simulate")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--native-shm", action="store_true",
+                        help="use the multiprocessing.shared_memory backend (live mode)")
+    args = parser.parse_args()
+
+    config = NetworkConfig.load(args.config)
+    if not args.simulate:
+        run_network(config, native_shm=args.native_shm)
+        return
+    start = time.perf_counter()
+    result = simulate_network(config, args.hours * 3600, args.seed)
+    elapsed = time.perf_counter() - start
+    for name, summary in result["intersections"].items():
+        logger.info(f"{name}: arrived={summary['arrived']} departed={summary['departed']} "
+                    f"average_wait={summary['average_wait']:.1f} s max_queue={summary['max_queue']}")
+    network = result["network"]
+    logger.info(f"Network: {network['exited']} vehicles exited, average travel time "
+                f"{network['average_travel_time']:.1f} s (max {network['max_travel_time']:.1f} s), "
+                f"{network['average_hops']:.2f} links per vehicle")
+    logger.info(f"Simulated {args.hours} h in {elapsed:.2f} s of wall time.")
+
+
+if __name__ == "__main__":
+    main()
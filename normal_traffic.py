@@ -1,10 +1,12 @@
-import time
-import random
-import uuid
 import logging
 from multiprocessing import Process
 from multiprocessing.managers import SyncManager
 from utils.message_queues import enqueue, create_queues
+from utils.vehicle import Vehicle
+from utils.metrics import NO_METRICS
+from utils.trace import NO_TRACE
+from utils.rng import UNSEEDED, RandomStreams
+from utils.clock import REAL_TIME, SimClock
 
 logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
 logger = logging.getLogger("normal_traffic")
@@ -21,26 +23,41 @@ DIRECTION_MAP = {
     ("W", "S"): "left"
 }
 
-def create_vehicle() -> dict:
-    source = random.choice(DIRECTIONS)
-    possible_destinations = [d for d in DIRECTIONS if d != source]
-    destination = random.choice(possible_destinations)
+def turn_for(source: str, destination: str) -> str:
     if (source, destination) in [("N", "S"), ("S", "N"), ("E", "W"), ("W", "E")]:
-        turn = "straight"
-    else:
-        turn = DIRECTION_MAP.get((source, destination), "unknown")
+        return "straight"
+    return DIRECTION_MAP.get((source, destination), "unknown")
+
+def create_vehicle(sources=DIRECTIONS, streams: RandomStreams = UNSEEDED, clock: SimClock = REAL_TIME) -> dict:
+    """
+    Random normal vehicle.
+    :param sources: arms the vehicle may arrive from (all four by default).
+    :param streams: seeded RNG streams; the arm is drawn from "normal", the destination
+                    from the arm's own stream ("normal/N", ...).
+    :param clock: SimClock stamping the arrival.
+    """
+    source = streams.stream("normal").choice(sources)
+    possible_destinations = [d for d in DIRECTIONS if d != source]
+    destination = streams.stream(f"normal/{source}").choice(possible_destinations)
+    turn = turn_for(source, destination)
     return {
-        "id": str(uuid.uuid4()),
+        "id": streams.vehicle_id("normal"),
         "type": "normal",
         "source": source,
         "destination": destination,
-        "timestamp": time.time(),
+        "timestamp": clock.time(),
         "priority": False,
         "turn": turn
     }
 
-def normal_traffic_gen(queues, interval: float, shutdown_flag, max_vehicles: int = None) -> None:
-    logger.info("🚗 normal_traffic_gen started.")
+def normal_traffic_gen(queues, interval: float, shutdown_flag, max_vehicles: int = None,
+                       compact: bool = False, metrics=NO_METRICS, recorder=NO_TRACE,
+                       seed: int = None, clock: SimClock = REAL_TIME) -> None:
+    """
+    Generates a normal vehicle every `interval` simulated seconds on `clock`.
+    """
+    logger.info(f"🚗 normal_traffic_gen started{f' (seed {seed})' if seed is not None else ''}.")
+    streams = RandomStreams(seed)
     count = 0
     while not shutdown_flag.is_set():
         if max_vehicles and count >= max_vehicles:
@@ -48,20 +65,19 @@ def normal_traffic_gen(queues, interval: float, shutdown_flag, max_vehicles: int
             break
 
         # Use the create_vehicle() function to generate a vehicle.
-        vehicle = create_vehicle()
+        vehicle = create_vehicle(streams=streams, clock=clock)
+        if compact:
+            # Ship a fixed-size record instead of the dict.
+            vehicle = Vehicle.from_dict(vehicle)
         # Enqueue the vehicle based on its source.
         enqueue(queues, vehicle, vehicle["source"])
+        metrics.inc("crossroads_vehicles_generated_total", vehicle["source"], "normal")
+        recorder.arrival(vehicle)
         logger.info(f"Generated normal vehicle {vehicle['id'][:8]} from {vehicle['source']} to {vehicle['destination']} (turn: {vehicle['turn']})")
         
         count += 1
-        # Sleep for the main interval.
-        sleep_time = interval
-        # Instead of a single sleep, we check shutdown_flag in small increments.
-        increments = int(sleep_time * 10)
-        for _ in range(increments):
-            if shutdown_flag.is_set():
-                break
-            time.sleep(sleep_time / increments)
+        # Sleep for the main interval, waking up early on shutdown.
+        clock.wait(shutdown_flag, interval)
 
 if __name__ == "__main__":
     from multiprocessing import Manager
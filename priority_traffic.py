@@ -1,13 +1,13 @@
 import time
-import random
-import uuid
 import logging
-import os
-import signal
+from typing import Optional
 from multiprocessing import Process
-from multiprocessing.managers import SyncManager
 from utils.message_queues import enqueue, create_queues
-from utils.signals import SignalHandler
+from utils.signals import PreemptionChannel
+from utils.metrics import NO_METRICS
+from utils.trace import NO_TRACE
+from utils.rng import UNSEEDED, RandomStreams
+from utils.clock import REAL_TIME, SimClock
 
 logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
 logger = logging.getLogger("priority_traffic")
@@ -15,55 +15,54 @@ logger = logging.getLogger("priority_traffic")
 DIRECTIONS = ["N", "S", "E", "W"]
 EMERGENCY_TYPES = ["ambulance", "fire_truck", "police"]
 
-def create_emergency_vehicle() -> dict:
-    source = random.choice(DIRECTIONS)
+def create_emergency_vehicle(streams: RandomStreams = UNSEEDED, clock: SimClock = REAL_TIME,
+                             sources=DIRECTIONS) -> dict:
+    """
+    Random emergency vehicle.
+    :param streams: seeded RNG streams; the arm is drawn from "priority", the
+                    destination and vehicle type from the arm's own stream.
+    :param clock: SimClock stamping the arrival.
+    :param sources: arms the vehicle may arrive from (all four by default).
+    """
+    source = streams.stream("priority").choice(sources)
+    rng = streams.stream(f"priority/{source}")
     possible_destinations = [d for d in DIRECTIONS if d != source]
-    destination = random.choice(possible_destinations)
+    destination = rng.choice(possible_destinations)
     return {
-        "id": str(uuid.uuid4()),
-        "type": random.choice(EMERGENCY_TYPES),
+        "id": streams.vehicle_id("priority"),
+        "type": rng.choice(EMERGENCY_TYPES),
         "source": source,
         "destination": destination,
-        "timestamp": time.time(),
+        "timestamp": clock.time(),
         "priority": True,
         "turn": "emergency"
     }
 
-def get_lights_pid() -> int:
-    timeout = 10  # Maximum time to wait for the PID file
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            with open("lights.pid", "r") as f:
-                return int(f.read().strip())
-        except (FileNotFoundError, ValueError):
-            time.sleep(1)
-    raise RuntimeError("Failed to get lights PID within the timeout period")
-
-def priority_traffic_gen(queues, interval: float, shutdown_flag, manager: SyncManager) -> None:
+def priority_traffic_gen(queues, interval: float, shutdown_flag, preemption: Optional[PreemptionChannel] = None,
+                         metrics=NO_METRICS, recorder=NO_TRACE, seed: int = None,
+                         clock: SimClock = REAL_TIME, sources=DIRECTIONS) -> None:
+    """
+    Generates an emergency vehicle every `interval` simulated seconds on `clock`.
+    :param preemption: channel to the TrafficLights process; each vehicle requests
+                       a green light for its approach (vehicles are only queued if None).
+    :param sources: arms vehicles may arrive from (all four by default).
+    """
+    streams = RandomStreams(seed)
     try:
-        lights_pid = get_lights_pid()
-        # Pass the manager to the SignalHandler
-        signal_handler = SignalHandler(lights_pid, manager)
         while not shutdown_flag.is_set():
-            if not os.path.exists("lights.pid"):
-                logger.error("Lights process not running. Exiting priority traffic generator.")
-                break
-            vehicle = create_emergency_vehicle()
+            vehicle = create_emergency_vehicle(streams, clock, sources)
             # Enqueue the emergency vehicle using the helper function.
             enqueue(queues, vehicle, vehicle["source"])
+            metrics.inc("crossroads_vehicles_generated_total", vehicle["source"], "emergency")
+            recorder.arrival(vehicle)
             logger.info(f"Priority vehicle added: {vehicle}")
-            try:
-                signal_handler.notify_priority(vehicle)
-                logger.warning(f"EMERGENCY {vehicle['type']} {vehicle['id'][:8]} from {vehicle['source']}")
-            except Exception as e:
-                logger.error(f"Failed to notify priority for vehicle {vehicle['id'][:8]}: {e}")
-            sleep_time = interval
-            increments = int(sleep_time * 10)
-            for _ in range(increments):
-                if shutdown_flag.is_set():
-                    break
-                time.sleep(sleep_time / increments)
+            if preemption is not None:
+                try:
+                    preemption.notify_priority(vehicle)
+                    logger.warning(f"EMERGENCY {vehicle['type']} {vehicle['id'][:8]} from {vehicle['source']}")
+                except Exception as e:
+                    logger.error(f"Failed to notify priority for vehicle {vehicle['id'][:8]}: {e}")
+            clock.wait(shutdown_flag, interval)
     except Exception as e:
         logger.error(f"Error in priority traffic generator: {e}")
 
@@ -73,8 +72,8 @@ if __name__ == "__main__":
     manager: SyncManager = Manager()
     shutdown_flag = manager.Event()
     queues = create_queues()
-    # Pass the manager as an extra argument.
-    p = Process(target=priority_traffic_gen, args=(queues, 5, shutdown_flag, manager))
+    # Without a TrafficLights process listening, vehicles are only queued.
+    p = Process(target=priority_traffic_gen, args=(queues, 5, shutdown_flag))
     p.start()
     try:
         while True:
@@ -6,7 +6,7 @@ from multiprocessing import Manager, Process
 from multiprocessing.managers import SyncManager
 from utils.message_queues import create_queues
 from priority_traffic import priority_traffic_gen
-from utils.signals import SignalHandler
+from utils.signals import PreemptionChannel, SignalHandler
 import logging
 
 logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
@@ -72,7 +72,8 @@ def main():
     queues = create_queues()
     
     # Start the priority traffic generator process with an interval of 5 seconds.
-    p = Process(target=priority_traffic_gen, args=(queues, 5, shutdown_flag, manager))
+    preemption = PreemptionChannel()
+    p = Process(target=priority_traffic_gen, args=(queues, 5, shutdown_flag, preemption))
     p.start()
     logger.info("Priority traffic generator process started.")
     
@@ -86,12 +87,23 @@ def main():
         p.terminate()
     
     # Check and log the content of each queue.
+    queued = {}
     for direction, queue in queues.items():
         size = queue.qsize()
         logger.info(f"Queue {direction} size: {size}")
         while not queue.empty():
             vehicle = queue.get()
+            queued[vehicle["source"]] = queued.get(vehicle["source"], 0) + 1
             logger.info(f"Vehicle in queue {direction}: {vehicle}")
+
+    # Every queued vehicle also sent a preemption request for its approach.
+    requested = {}
+    while (request := preemption.wait(timeout=0)) is not None:
+        requested[request[0]] = requested.get(request[0], 0) + 1
+    if queued and requested == queued:
+        logger.info(f"Preemption requests match the queued vehicles: {requested}")
+    else:
+        logger.error(f"Preemption requests {requested} do not match queued vehicles {queued}")
     
     # Test the priority signal separately.
     test_priority_signal(manager)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Replays a trace recorded with `python main.py --record run.trace`.
+
+Arrivals are enqueued and the recorded light changes and emergency signals
+are applied at their recorded offsets, scaled by --speed, into a live
+Coordinator (the lights follow the trace instead of a TrafficLights timer, so
+the signal plan is reproduced exactly). The Coordinator runs on a SimClock at
+--speed, as in `main.py --speed`, so crossing times, waits and timestamps are
+scaled too.
+--fast replays on the virtual clock of the discrete-event simulation instead,
+as fast as possible.
+
+    python replay.py run.trace                 # real time
+    python replay.py run.trace --speed 10 --record replayed.trace
+    python replay.py run.trace --fast
+"""
+import argparse
+import logging
+import time
+from multiprocessing import Manager, Process
+from typing import Optional
+
+from coordinator import Coordinator
+from lights import EMERGENCY_DURATION
+from utils.clock import SimClock
+from utils.message_queues import create_queues, enqueue
+from utils.shared_memory import create_shared_memory
+from utils.trace import ARRIVAL, EMERGENCY, LIGHTS, NO_TRACE, TraceReader, TraceRecorder
+
+logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
+logger = logging.getLogger("replay")
+
+DRAIN_TIMEOUT = 30  # Simulated seconds allowed for queued vehicles to cross once the trace has been fed
+
+
+def replay_live(reader: TraceReader, speed: float = 1.0, native_shm: bool = False,
+                record: Optional[str] = None) -> dict:
+    """
+    Feeds the trace into a Coordinator process at `speed` times real time
+    (every process of the replay shares one SimClock).
+    Returns counts of the replayed records; with `record`, the replay itself is
+    recorded (departures included) for comparison with the original.
+    """
+    if speed <= 0:
+        raise ValueError("Replay speed must be positive")
+    manager = Manager()
+    shutdown_flag = manager.Event()
+    queues = create_queues()
+    shared_memory = create_shared_memory(manager, native=native_shm)
+    # One simulated clock for the replay: the offsets below are simulated seconds.
+    clock = SimClock(speed)
+    recorder = TraceRecorder(record, clock=clock.time) if record else NO_TRACE
+    coordinator = Coordinator(queues, shared_memory, shutdown_flag, recorder=recorder, clock=clock)
+    process = Process(target=coordinator.run, name="Coordinator")
+    process.start()
+
+    counts = {"arrivals": 0, "light_changes": 0, "emergencies": 0}
+    wall_start = time.time()
+    start = clock.time()
+    origin = None
+    priority_until = None
+    try:
+        for entry in reader.ordered(ARRIVAL, LIGHTS, EMERGENCY):
+            origin = entry.time if origin is None else origin
+            due = start + (entry.time - origin)
+            while clock.time() < due and not shutdown_flag.is_set():
+                if priority_until is not None and clock.time() >= priority_until:
+                    shared_memory.reset_priority_mode()
+                    priority_until = None
+                time.sleep(min(0.05, max(0.0, clock.wall(due - clock.time()))))
+            if entry.kind == ARRIVAL:
+                vehicle = entry.vehicle()
+                vehicle["timestamp"] = clock.time()
+                enqueue(queues, vehicle, vehicle["source"])
+                recorder.arrival(vehicle)
+                counts["arrivals"] += 1
+            elif entry.kind == LIGHTS:
+                shared_memory.set_lights(entry.lights())
+                recorder.lights(entry.lights())
+                counts["light_changes"] += 1
+            else:
+                shared_memory.set_priority_mode(entry.direction())
+                recorder.emergency(entry.direction())
+                priority_until = clock.time() + EMERGENCY_DURATION
+                counts["emergencies"] += 1
+        # Let the vehicles still queued cross under the last recorded lights.
+        deadline = clock.time() + DRAIN_TIMEOUT
+        while clock.time() < deadline and any(queues[d].qsize() for d in queues):
+            time.sleep(0.05)
+    finally:
+        shutdown_flag.set()
+        process.join()
+        shared_memory.close()
+        manager.shutdown()
+    counts["wall_time"] = time.time() - wall_start
+    return counts
+
+
+def replay_fast(reader: TraceReader) -> dict:
+    """Replays the trace on the discrete-event engine's virtual clock and returns its statistics."""
+    from simulation import EventScheduler, SimulatedIntersection
+
+    scheduler = EventScheduler()
+    intersection = SimulatedIntersection(scheduler)  # Not started: the lights come from the trace.
+    origin = None
+    end = 0.0
+
+    def arrive(vehicle: dict) -> None:
+        vehicle["timestamp"] = scheduler.now
+        intersection.arrive(vehicle)
+
+    def emergency() -> None:
+        intersection.stats.preemptions += 1
+
+    for entry in reader.ordered(ARRIVAL, LIGHTS, EMERGENCY):
+        origin = entry.time if origin is None else origin
+        at = entry.time - origin
+        end = max(end, at)
+        if entry.kind == ARRIVAL:
+            scheduler.schedule_at(at, arrive, entry.vehicle())
+        elif entry.kind == LIGHTS:
+            scheduler.schedule_at(at, intersection.set_lights, entry.lights())
+        else:
+            scheduler.schedule_at(at, emergency)
+    scheduler.run_until(end + DRAIN_TIMEOUT)
+    summary = intersection.stats.summary(end)
+    summary["events_processed"] = scheduler.events_processed
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace", help="trace file written by main.py --record")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor (live replay)")
+    parser.add_argument("--fast", action="store_true", help="replay on a virtual clock, as fast as possible")
+    parser.add_argument("--native-shm", action="store_true")
+    parser.add_argument("--record", metavar="PATH", help="record the live replay to a new trace")
+    args = parser.parse_args()
+
+    reader = TraceReader(args.trace)
+    try:
+        logger.info(f"Original run: {reader.summary()}")
+        if args.fast:
+            start = time.perf_counter()
+            summary = replay_fast(reader)
+            logger.info(f"Replayed on a virtual clock in {time.perf_counter() - start:.2f} s: {summary}")
+        else:
+            counts = replay_live(reader, args.speed, args.native_shm, args.record)
+            logger.info(f"Replayed at {args.speed}x: {counts}")
+            if args.record:
+                replayed = TraceReader(args.record)
+                logger.info(f"Replayed run: {replayed.summary()}")
+                replayed.close()
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Headless network simulation split across worker processes.
+
+The intersections are partitioned into contiguous shards (row bands for
+grid_config grids), one worker process per shard, each running its own
+SimulatedNetwork on its own virtual clock. The shards advance in lockstep
+ticks as long as the shortest link crossing two shards: a vehicle leaving a
+shard during a tick cannot reach its neighbor before the tick ends, so the
+vehicles crossing shard boundaries are exchanged in one batch per tick and
+no shard ever receives an event from its past.
+
+    python sharded_network.py --rows 8 --cols 8 --hours 2 --workers 4
+    python sharded_network.py --rows 8 --cols 8 --hours 2 --scaling      # 1..cpu_count workers
+"""
+import argparse
+import logging
+import os
+import time
+from multiprocessing import Pipe, Process
+from typing import Dict, List, Optional
+
+from network import NetworkConfig, NetworkStats, SimulatedNetwork, grid_config
+
+logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
+logger = logging.getLogger("sharded_network")
+
+
+def partition(config: NetworkConfig, shards: int) -> List[List[str]]:
+    """Splits the intersections, in configuration order, into `shards` contiguous groups."""
+    names = list(config.intersections)
+    shards = max(1, min(shards, len(names)))
+    size, extra = divmod(len(names), shards)
+    groups, start = [], 0
+    for i in range(shards):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(names[start:end])
+        start = end
+    return groups
+
+
+def lookahead(config: NetworkConfig, shard_of: Dict[str, int], duration: float) -> float:
+    """Shortest travel time of a link between two shards (the tick length)."""
+    crossing = [link.travel_time for link in config.links.values() if shard_of[link.source] != shard_of[link.target]]
+    if not crossing:
+        return duration
+    if min(crossing) <= 0:
+        raise ValueError("Links between shards need a positive travel time")
+    return min(crossing)
+
+
+def _shard_worker(conn, config: NetworkConfig, names: List[str], seed: Optional[int]) -> None:
+    """
+    Runs one shard. Receives (until, incoming vehicles) per tick and answers
+    with the vehicles that left for other shards; None ends the run and the
+    shard's statistics are sent back.
+    """
+    from simulation import EventScheduler
+
+    scheduler = EventScheduler()
+    network = SimulatedNetwork(config, scheduler, names, seed)
+    network.start()
+    busy = 0.0
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        until, incoming = message
+        start = time.perf_counter()
+        network.deliver(incoming)
+        scheduler.run_until(until)
+        busy += time.perf_counter() - start
+        conn.send(network.outbox)
+        network.outbox = []
+    conn.send({
+        "intersections": network.summary(scheduler.now),
+        "stats": network.stats,
+        "events_processed": scheduler.events_processed,
+        "busy": busy,
+    })
+    conn.close()
+
+
+def simulate_sharded(config: NetworkConfig, duration: float, workers: int, seed: Optional[int] = None) -> dict:
+    """
+    Simulates `duration` virtual seconds with one process per shard.
+    Every intersection draws from its own seeded streams, so runs with the same
+    seed simulate the same traffic whatever the number of workers.
+    """
+    groups = partition(config, workers)
+    shard_of = {name: i for i, names in enumerate(groups) for name in names}
+    tick = lookahead(config, shard_of, duration)
+
+    connections, processes = [], []
+    for i, names in enumerate(groups):
+        parent_conn, child_conn = Pipe()
+        p = Process(target=_shard_worker, args=(child_conn, config, names, seed), name=f"Shard-{i}")
+        p.start()
+        child_conn.close()
+        connections.append(parent_conn)
+        processes.append(p)
+
+    start = time.perf_counter()
+    inboxes = [[] for _ in groups]
+    exchanged = ticks = 0
+    now = 0.0
+    try:
+        while now < duration:
+            now = min(now + tick, duration)
+            for conn, inbox in zip(connections, inboxes):
+                conn.send((now, inbox))
+            inboxes = [[] for _ in groups]
+            for conn in connections:
+                for arrival in conn.recv():
+                    inboxes[shard_of[arrival[1]]].append(arrival)
+                    exchanged += 1
+            ticks += 1
+        for conn in connections:
+            conn.send(None)
+        results = [conn.recv() for conn in connections]
+    finally:
+        for p in processes:
+            p.join()
+    elapsed = time.perf_counter() - start
+
+    stats = NetworkStats()
+    intersections = {}
+    for result in results:
+        stats.merge(result["stats"])
+        intersections.update(result["intersections"])
+    return {
+        "intersections": intersections,
+        "network": stats.summary(),
+        "events_processed": sum(result["events_processed"] for result in results),
+        "shards": len(groups),
+        "ticks": ticks,
+        "tick": tick,
+        "exchanged": exchanged,
+        "wall_time": elapsed,
+        "shard_busy": [result["busy"] for result in results],
+    }
+
+
+def scaling_report(config: NetworkConfig, duration: float, max_workers: int, seed: Optional[int] = None) -> list:
+    """Wall time, speedup and parallel efficiency for 1..max_workers shards of the same network."""
+    rows = []
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        result = simulate_sharded(config, duration, workers, seed)
+        baseline = baseline or result["wall_time"]
+        speedup = baseline / result["wall_time"]
+        rows.append({
+            "workers": result["shards"],
+            "wall_time": result["wall_time"],
+            "speedup": speedup,
+            "efficiency": speedup / result["shards"],
+            "events_per_sec": result["events_processed"] / result["wall_time"],
+            "exchanged": result["exchanged"],
+            "ticks": result["ticks"],
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("config", nargs="?", help="network topology (JSON); default is a --rows x --cols grid")
+    parser.add_argument("--rows", type=int, default=8)
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--travel-time", type=float, default=15, help="link travel time of the generated grid")
+    parser.add_argument("--hours", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--scaling", action="store_true", help="run with 1..--workers shards and compare")
+    args = parser.parse_args()
+
+    config = NetworkConfig.load(args.config) if args.config else grid_config(args.rows, args.cols, args.travel_time)
+    duration = args.hours * 3600
+    if args.scaling:
+        rows = scaling_report(config, duration, args.workers, args.seed)
+        print(f"{len(config.intersections)} intersections, {args.hours} h simulated")
+        print(f"{'workers':>7} {'wall s':>8} {'speedup':>8} {'efficiency':>10} {'events/s':>10} {'exchanged':>10}")
+        for row in rows:
+            print(f"{row['workers']:>7} {row['wall_time']:>8.2f} {row['speedup']:>8.2f} "
+                  f"{row['efficiency']:>10.0%} {row['events_per_sec']:>10.0f} {row['exchanged']:>10}")
+        return
+
+    result = simulate_sharded(config, duration, args.workers, args.seed)
+    network = result["network"]
+    logger.info(f"{result['shards']} shards, {result['ticks']} ticks of {result['tick']:.1f} s, "
+                f"{result['exchanged']} vehicles exchanged between shards")
+    logger.info(f"Network: {network['exited']} vehicles exited, average travel time "
+                f"{network['average_travel_time']:.1f} s, {network['average_hops']:.2f} links per vehicle")
+    logger.info(f"Simulated {args.hours} h of {len(config.intersections)} intersections in "
+                f"{result['wall_time']:.2f} s ({result['events_processed'] / result['wall_time']:.0f} events/s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Headless discrete-event simulation of the crossroads.
+
+Everything runs in one process on a virtual clock: every sleep of the
+real-time system becomes an event on a heap keyed by virtual time. The
+decision logic is shared with the multi-process simulation
+(coordinator.classify_vehicle, the phase helpers in lights and the vehicle
+factories), so a day of traffic is simulated in seconds.
+
+    python simulation.py --hours 24 --seed 1
+"""
+import argparse
+import heapq
+import itertools
+import logging
+import random
+import time
+from typing import Callable, Dict, Optional
+
+from coordinator import CROSSING_TIME, EMERGENCY_YIELD, WAIT, PendingVehicles, classify_vehicle
+from intersection import Occupancy, movement_of
+from lights import (ACTUATED_STEP, EMERGENCY_DURATION, GAP_OUT, MAX_GREEN, MIN_GREEN, PHASE_DURATION,
+                    PRIORITY_POLL, SIGNAL_MODES, EmergencyQueue, actuated_should_switch, emergency_lights, next_phase,
+                    phase_lights)
+from normal_traffic import create_vehicle
+from priority_traffic import create_emergency_vehicle
+
+logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
+logger = logging.getLogger("simulation")
+
+DIRECTIONS = ["N", "S", "E", "W"]
+
+
+class EventScheduler:
+    """
+    Event heap keyed on virtual time; ties are resolved in scheduling order
+    (or by the order given to schedule_ordered()).
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.events_processed = 0
+        self._heap = []
+        self._counter = itertools.count()
+
+    def schedule(self, delay: float, callback: Callable, *args) -> None:
+        self.schedule_at(self.now + delay, callback, *args)
+
+    def schedule_at(self, at: float, callback: Callable, *args) -> None:
+        heapq.heappush(self._heap, (at, (-1, next(self._counter)), callback, args))
+
+    def schedule_ordered(self, at: float, order: tuple, callback: Callable, *args) -> None:
+        """Schedules an event whose ties are resolved by `order`, a (rank, sequence) pair (see LocalScheduler)."""
+        heapq.heappush(self._heap, (at, order, callback, args))
+
+    def next_time(self) -> Optional[float]:
+        return self._heap[0][0] if self._heap else None
+
+    def run_until(self, end_time: float) -> None:
+        heap = self._heap
+        while heap and heap[0][0] <= end_time:
+            at, _, callback, args = heapq.heappop(heap)
+            self.now = at
+            callback(*args)
+            self.events_processed += 1
+        self.now = max(self.now, end_time)
+
+
+class LocalScheduler:
+    """
+    View of an EventScheduler for one of several intersections sharing it.
+    Events at the same virtual time are ordered by the intersection's rank, then
+    by its own scheduling order, so the order does not depend on which other
+    intersections run on the same scheduler (see sharded_network.py).
+    """
+
+    def __init__(self, scheduler: EventScheduler, rank: int):
+        self.scheduler = scheduler
+        self.rank = rank
+        self._counter = itertools.count()
+
+    @property
+    def now(self) -> float:
+        return self.scheduler.now
+
+    def next_order(self) -> tuple:
+        """Tie-break key of the next event this intersection schedules."""
+        return self.rank, next(self._counter)
+
+    def schedule(self, delay: float, callback: Callable, *args) -> None:
+        self.schedule_at(self.scheduler.now + delay, callback, *args)
+
+    def schedule_at(self, at: float, callback: Callable, *args) -> None:
+        self.scheduler.schedule_ordered(at, self.next_order(), callback, *args)
+
+
+class SimulationStats:
+    def __init__(self):
+        self.arrived = 0
+        self.departed = 0
+        self.emergency_departed = 0
+        self.red_waits = 0
+        self.yields = 0
+        self.preemptions = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.max_queue = {d: 0 for d in DIRECTIONS}
+
+    def record_departure(self, vehicle: dict, wait: float) -> None:
+        self.departed += 1
+        if vehicle.get("priority", False):
+            self.emergency_departed += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def summary(self, duration: float) -> dict:
+        return {
+            "simulated_seconds": duration,
+            "arrived": self.arrived,
+            "departed": self.departed,
+            "emergency_departed": self.emergency_departed,
+            "throughput_per_hour": self.departed * 3600.0 / duration if duration else 0.0,
+            "average_wait": self.total_wait / self.departed if self.departed else 0.0,
+            "max_wait": self.max_wait,
+            "red_waits": self.red_waits,
+            "yields": self.yields,
+            "preemptions": self.preemptions,
+            "max_queue": dict(self.max_queue),
+        }
+
+
+class SimulatedIntersection:
+    """
+    One crossroads driven by an EventScheduler.
+    Mirrors TrafficLights (fixed phases, emergency override) and the per-direction
+    loop of Coordinator.process_queue_for_direction. Vehicles are kept in the
+    coordinator's PendingVehicles, so each approach serves its emergency vehicles
+    first and vehicles give way (up to EMERGENCY_YIELD) to emergency vehicles queued
+    on other approaches. Vehicles share the intersection when their movements do not
+    conflict, as with the coordinator's AdmissionController.
+    """
+
+    def __init__(self, scheduler: EventScheduler, phase_duration: float = PHASE_DURATION,
+                 emergency_duration: float = EMERGENCY_DURATION,
+                 on_departure: Optional[Callable[[dict], None]] = None,
+                 signal_mode: str = "fixed", min_green: float = MIN_GREEN,
+                 max_green: float = MAX_GREEN, gap_out: float = GAP_OUT):
+        if signal_mode not in SIGNAL_MODES:
+            raise ValueError(f"Invalid signal mode '{signal_mode}' (must be one of {', '.join(SIGNAL_MODES)})")
+        self.scheduler = scheduler
+        self.phase_duration = phase_duration
+        self.signal_mode = signal_mode
+        self.min_green = min_green
+        self.max_green = max_green
+        self.gap_out = gap_out
+        self.emergency_duration = emergency_duration
+        self.emergencies = EmergencyQueue(emergency_duration)
+        self.on_departure = on_departure
+        self.stats = SimulationStats()
+
+        self.phase = "NS"
+        self.lights = phase_lights(self.phase)
+        self.priority_mode = False
+
+        self.pending = PendingVehicles()
+        self._direction_busy = {d: False for d in DIRECTIONS}
+        self._waiting_for_green: Dict[str, Optional[dict]] = {d: None for d in DIRECTIONS}
+        self._yielding: Dict[str, Optional[dict]] = {d: None for d in DIRECTIONS}
+        self.occupancy = Occupancy()
+
+    def start(self) -> None:
+        self._phase_start()
+
+    # --- lights ---
+
+    def _phase_start(self) -> None:
+        if self.priority_mode:
+            self.scheduler.schedule(PRIORITY_POLL, self._phase_start)
+            return
+        self._set_lights(phase_lights(self.phase))
+        if self.signal_mode == "actuated":
+            self._phase_started = self._last_demand = self.scheduler.now
+            self.scheduler.schedule(ACTUATED_STEP, self._actuated_check)
+        else:
+            self.scheduler.schedule(self.phase_duration, self._phase_end)
+
+    def _phase_end(self) -> None:
+        self.phase = next_phase(self.phase)
+        self._phase_start()
+
+    def queue_lengths(self) -> Dict[str, int]:
+        """Vehicles per approach, counting the one being served (like DirectionQueue.qsize with ack=False)."""
+        counts = self.pending.counts()
+        return {d: sum(counts[d]) + self._direction_busy[d] for d in DIRECTIONS}
+
+    def _actuated_check(self) -> None:
+        """Equivalent of one iteration of TrafficLights._wait_actuated."""
+        now = self.scheduler.now
+        queue_lengths = self.queue_lengths()
+        if any(queue_lengths[d] for d in self.phase):
+            self._last_demand = now
+        if actuated_should_switch(self.phase, now - self._phase_started, now - self._last_demand,
+                                  queue_lengths, self.min_green, self.max_green, self.gap_out):
+            self._phase_end()
+        else:
+            self.scheduler.schedule(ACTUATED_STEP, self._actuated_check)
+
+    def trigger_emergency(self, direction: str) -> None:
+        """Equivalent of TrafficLights.request_emergency for one priority signal."""
+        self.stats.preemptions += 1
+        now = self.scheduler.now
+        if not self.emergencies.request(direction, now, now) and self.emergencies.active is None:
+            self._grant_emergency()
+
+    def _grant_emergency(self) -> None:
+        direction, _ = self.emergencies.grant(self.scheduler.now)
+        self.priority_mode = True
+        self._set_lights(emergency_lights(direction))
+        self.scheduler.schedule_at(self.emergencies.green_until, self._end_emergency)
+
+    def _end_emergency(self) -> None:
+        if self.scheduler.now < self.emergencies.green_until:
+            # Extended by a later request for the same approach.
+            self.scheduler.schedule_at(self.emergencies.green_until, self._end_emergency)
+            return
+        self.emergencies.release()
+        if self.emergencies.pending:
+            self._grant_emergency()
+        else:
+            self.priority_mode = False
+
+    def set_lights(self, lights: Dict[str, str]) -> None:
+        """External light control, for intersections not started with start() (trace replay)."""
+        self._set_lights(lights)
+
+    def _set_lights(self, lights: Dict[str, str]) -> None:
+        """Like SharedMemory.set_lights(): vehicles stopped at a light that turns GREEN go immediately."""
+        self.lights = lights
+        for direction, vehicle in self._waiting_for_green.items():
+            if vehicle is not None and lights.get(direction) == "GREEN":
+                self._waiting_for_green[direction] = None
+                self._proceed(direction, vehicle)
+
+    # --- vehicles ---
+
+    def arrive(self, vehicle: dict) -> None:
+        direction = vehicle["source"]
+        self.pending.extend(direction, [vehicle])
+        self.stats.arrived += 1
+        self.stats.max_queue[direction] = max(self.stats.max_queue[direction], sum(self.pending.counts()[direction]))
+        if not self._direction_busy[direction]:
+            self._serve_next(direction)
+
+    def _serve_next(self, direction: str) -> None:
+        vehicle = self.pending.pop(direction, 0)
+        if vehicle is None:
+            self._direction_busy[direction] = False
+            return
+        self._direction_busy[direction] = True
+        if classify_vehicle(vehicle, self.lights, direction) == WAIT:
+            self.stats.red_waits += 1
+            self._waiting_for_green[direction] = vehicle
+        else:
+            self._proceed(direction, vehicle)
+        if vehicle.get("priority", False):
+            self._release_yielding()
+
+    def _proceed(self, direction: str, vehicle: dict) -> None:
+        """Like Coordinator.process_vehicle: give way to emergencies queued elsewhere, then ask to cross."""
+        if self.pending.must_yield(vehicle, direction):
+            self.stats.yields += 1
+            self._yielding[direction] = vehicle
+            self.scheduler.schedule(EMERGENCY_YIELD, self._end_yield, direction, vehicle)
+        else:
+            self._request_crossing(direction, vehicle)
+
+    def _release_yielding(self) -> None:
+        """An emergency vehicle left its queue: vehicles no longer held back go (PendingVehicles notifies them)."""
+        for direction, vehicle in self._yielding.items():
+            if vehicle is not None and not self.pending.must_yield(vehicle, direction):
+                self._yielding[direction] = None
+                self._request_crossing(direction, vehicle)
+
+    def _end_yield(self, direction: str, vehicle: dict) -> None:
+        if self._yielding[direction] is vehicle:
+            self._yielding[direction] = None
+            self._request_crossing(direction, vehicle)
+
+    def _request_crossing(self, direction: str, vehicle: dict) -> None:
+        self.occupancy.request(vehicle["id"], movement_of(vehicle), vehicle)
+        self._admit_ready()
+
+    def _admit_ready(self) -> None:
+        for ticket in self.occupancy.admit_ready():
+            self._start_crossing(ticket.vehicle["source"], ticket.vehicle)
+
+    def _start_crossing(self, direction: str, vehicle: dict) -> None:
+        self.stats.record_departure(vehicle, self.scheduler.now - vehicle["timestamp"])
+        self.scheduler.schedule(CROSSING_TIME, self._finish_crossing, direction, vehicle)
+
+    def _finish_crossing(self, direction: str, vehicle: dict) -> None:
+        self.occupancy.release(vehicle["id"])
+        self._admit_ready()
+        if self.on_departure:
+            self.on_departure(vehicle)
+        # The next vehicle of the approach, its emergency vehicles first.
+        self._serve_next(direction)
+
+
+class TrafficSource:
+    """Periodic arrivals, like normal_traffic_gen and priority_traffic_gen."""
+
+    def __init__(self, scheduler: EventScheduler, intersection: SimulatedIntersection,
+                 normal_interval: float = 10, priority_interval: float = 20):
+        self.scheduler = scheduler
+        self.intersection = intersection
+        self.normal_interval = normal_interval
+        self.priority_interval = priority_interval
+
+    def start(self) -> None:
+        if self.normal_interval:
+            self.scheduler.schedule(0, self._normal_arrival)
+        if self.priority_interval:
+            self.scheduler.schedule(0, self._priority_arrival)
+
+    def _normal_arrival(self) -> None:
+        vehicle = create_vehicle()
+        vehicle["timestamp"] = self.scheduler.now
+        self.intersection.arrive(vehicle)
+        self.scheduler.schedule(self.normal_interval, self._normal_arrival)
+
+    def _priority_arrival(self) -> None:
+        vehicle = create_emergency_vehicle()
+        vehicle["timestamp"] = self.scheduler.now
+        self.intersection.arrive(vehicle)
+        self.intersection.trigger_emergency(vehicle["source"])
+        self.scheduler.schedule(self.priority_interval, self._priority_arrival)
+
+
+def run_simulation(duration: float, seed: Optional[int] = None, normal_interval: float = 10,
+                   priority_interval: float = 20, phase_duration: float = PHASE_DURATION,
+                   signal_mode: str = "fixed") -> dict:
+    """Simulate `duration` virtual seconds and return summary statistics."""
+    if seed is not None:
+        random.seed(seed)
+    scheduler = EventScheduler()
+    intersection = SimulatedIntersection(scheduler, phase_duration=phase_duration, signal_mode=signal_mode)
+    source = TrafficSource(scheduler, intersection, normal_interval, priority_interval)
+    intersection.start()
+    source.start()
+    scheduler.run_until(duration)
+    summary = intersection.stats.summary(duration)
+    summary["events_processed"] = scheduler.events_processed
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--normal-interval", type=float, default=10)
+    parser.add_argument("--priority-interval", type=float, default=20)
+    parser.add_argument("--phase-duration", type=float, default=PHASE_DURATION)
+    parser.add_argument("--signal-mode", choices=SIGNAL_MODES, default="fixed")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    summary = run_simulation(args.hours * 3600, args.seed, args.normal_interval,
+                             args.priority_interval, args.phase_duration, args.signal_mode)
+    elapsed = time.perf_counter() - start
+    for key, value in summary.items():
+        logger.info(f"{key}: {value}")
+    logger.info(f"Simulated {args.hours} h in {elapsed:.2f} s of wall time.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+import logging
+import numpy as np
+from batch_traffic import TURNS, feed_arrivals, generate_arrivals, to_vehicle
+from normal_traffic import DIRECTIONS, turn_for
+from utils.message_queues import create_queues, drain
+
+logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
+logger = logging.getLogger("test_batch_traffic")
+
+COUNT = 200_000
+RATES = {"N": 0.04, "S": 0.02, "E": 0.01, "W": 0.0}
+
+def test_arrival_distribution():
+    """Timestamps are ordered, sources follow the rates, a zero-rate direction gets nothing."""
+    arrivals = generate_arrivals(COUNT, RATES, start=100.0, rng=np.random.default_rng(1))
+    ordered = bool(np.all(np.diff(arrivals["timestamp"]) >= 0)) and arrivals["timestamp"][0] >= 100.0
+    total = sum(RATES.values())
+    counts = np.bincount(arrivals["source"], minlength=len(DIRECTIONS))
+    shares = {d: round(float(counts[i]) / COUNT, 3) for i, d in enumerate(DIRECTIONS)}
+    within = all(abs(shares[d] - RATES[d] / total) < 0.01 for d in DIRECTIONS)
+    # Mean inter-arrival time of the merged process is 1 / total rate.
+    mean_gap = (arrivals["timestamp"][-1] - 100.0) / COUNT
+    if ordered and within and counts[DIRECTIONS.index("W")] == 0 and abs(mean_gap * total - 1) < 0.02:
+        logger.info(f"Test passed: {COUNT} arrivals ordered, shares {shares}.")
+    else:
+        logger.error(f"Test failed: ordered {ordered}, shares {shares}, mean gap {mean_gap:.2f} s")
+
+def test_movements():
+    """Destinations differ from sources and turns match normal_traffic.turn_for."""
+    arrivals = generate_arrivals(10_000, rng=np.random.default_rng(2))
+    wrong = [r for r in arrivals
+             if r["source"] == r["destination"]
+             or TURNS[r["turn"]] != turn_for(DIRECTIONS[r["source"]], DIRECTIONS[r["destination"]])]
+    vehicle = to_vehicle(arrivals[0])
+    if not wrong and vehicle["turn"] == turn_for(vehicle["source"], vehicle["destination"]):
+        logger.info("Test passed: every movement has the turn of normal_traffic.turn_for.")
+    else:
+        logger.error(f"Test failed: {len(wrong)} inconsistent movements, e.g. {wrong[:3]}")
+
+def test_invalid_rates():
+    """Negative or all-zero rates are rejected."""
+    rejected = []
+    for rates in ([-0.1, 0.2, 0.1, 0.1], [0, 0, 0, 0], {"N": 0.0}, [0.1, 0.1]):
+        try:
+            generate_arrivals(10, rates)
+        except ValueError:
+            rejected.append(rates)
+    if len(rejected) == 4:
+        logger.info("Test passed: invalid rates raise ValueError.")
+    else:
+        logger.error(f"Test failed: only {rejected} were rejected")
+
+def test_feed_arrivals():
+    """feed_arrivals(realtime=False) enqueues every vehicle into the queue of its source."""
+    arrivals = generate_arrivals(5000, RATES, rng=np.random.default_rng(3))
+    queues = create_queues()
+    fed = feed_arrivals(queues, arrivals, realtime=False)
+    expected = {d: int((arrivals["source"] == i).sum()) for i, d in enumerate(DIRECTIONS)}
+    queued, misplaced = {}, 0
+    for d in DIRECTIONS:
+        vehicles = []
+        while batch := drain(queues, d, 1000, timeout=0.5):
+            vehicles.extend(batch)
+        queued[d] = len(vehicles)
+        misplaced += sum(1 for v in vehicles if v["source"] != d)
+    if fed == len(arrivals) and queued == expected and not misplaced:
+        logger.info(f"Test passed: {fed} vehicles fed, per direction {queued}.")
+    else:
+        logger.error(f"Test failed: fed {fed}, queued {queued}, expected {expected}, misplaced {misplaced}")
+
+if __name__ == "__main__":
+    test_arrival_distribution()
+    test_movements()
+    test_invalid_rates()
+    test_feed_arrivals()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+import time
+import pickle
+import logging
+import threading
+from multiprocessing import Manager, Process
+from multiprocessing.managers import SyncManager
+from utils.clock import SimClock
+from utils.message_queues import create_queues
+from utils.shared_memory import SharedMemory
+from coordinator import Coordinator
+from lights import PHASE_DURATION, TrafficLights
+from normal_traffic import normal_traffic_gen
+from priority_traffic import priority_traffic_gen
+from utils.signals import PreemptionChannel
+
+logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
+logger = logging.getLogger("test_clock")
+
+SPEED = 20
+NORMAL_INTERVAL = 10
+PRIORITY_INTERVAL = 40
+
+def test_sim_clock():
+    """Simulated time runs `speed` times faster and is the same in every process."""
+    clock = SimClock(10)
+    copy = pickle.loads(pickle.dumps(clock))
+    start, wall_start = clock.time(), time.time()
+    clock.sleep(2)
+    elapsed, wall_elapsed = clock.time() - start, time.time() - wall_start
+    event = threading.Event()
+    waited = time.time()
+    set_early = clock.wait(event, 1)
+    waited = time.time() - waited
+    if (1.9 <= elapsed <= 2.5 and 0.19 <= wall_elapsed <= 0.25 and abs(copy.time() - clock.time()) < 0.05
+            and not set_early and 0.09 <= waited <= 0.15 and clock.poll_interval(0.01) == 0.01):
+        logger.info(f"Test passed: 2 simulated seconds in {wall_elapsed:.3f} s of wall time.")
+    else:
+        logger.error(f"Test failed: {elapsed:.3f} simulated s in {wall_elapsed:.3f} wall s, waited {waited:.3f} s")
+
+def test_accelerated_run():
+    """The full topology (lights, coordinator, generators) at SPEED x: phases and traffic keep their simulated timing."""
+    manager: SyncManager = Manager()
+    shutdown_flag = manager.Event()
+    queues = create_queues()
+    shared_mem = SharedMemory(manager)
+    clock = SimClock(SPEED)
+    preemption = PreemptionChannel()
+    departed = manager.list()
+    lights = TrafficLights(shared_mem, shutdown_flag, preemption=preemption, clock=clock)
+    coordinator = Coordinator(queues, shared_mem, shutdown_flag, on_departure=departed.append, clock=clock)
+    processes = [
+        Process(target=lights.run, name="TrafficLights"),
+        Process(target=coordinator.run, name="Coordinator"),
+        Process(target=normal_traffic_gen, args=(queues, NORMAL_INTERVAL, shutdown_flag), name="NormalTraffic",
+                kwargs={"seed": 1, "clock": clock}),
+        Process(target=priority_traffic_gen, args=(queues, PRIORITY_INTERVAL, shutdown_flag, preemption),
+                kwargs={"seed": 1, "clock": clock}, name="PriorityTraffic"),
+    ]
+    for p in processes:
+        p.start()
+
+    simulated = 4 * PHASE_DURATION
+    start = clock.time()
+    phases, last = 0, None
+    while clock.time() - start < simulated:
+        ns_green = shared_mem.get_light_state().get("N") == "GREEN"
+        if not shared_mem.in_priority_mode() and ns_green != last:
+            phases, last = phases + 1, ns_green
+        time.sleep(0.02)
+    shutdown_flag.set()
+    for p in processes:
+        p.join(timeout=10)
+        if p.is_alive():
+            p.terminate()
+    count = len(departed)
+    manager.shutdown()
+
+    generated = simulated / NORMAL_INTERVAL + simulated / PRIORITY_INTERVAL
+    wall = simulated / SPEED
+    if phases >= 4 and count >= generated / 2:
+        logger.info(f"Test passed: {simulated} simulated seconds in {wall:.0f} s: {phases} phases, {count} departures.")
+    else:
+        logger.error(f"Test failed: {phases} phases and {count} departures in {simulated} simulated seconds.")
+
+if __name__ == "__main__":
+    test_sim_clock()
+    test_accelerated_run()
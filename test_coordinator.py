@@ -6,7 +6,7 @@ from multiprocessing.managers import SyncManager
 import logging
 from utils.message_queues import create_queues, enqueue
 from utils.shared_memory import SharedMemory
-from coordinator import Coordinator
+from coordinator import Coordinator, PendingVehicles
 
 # Set up logging with DEBUG level for more granular output.
 logging.basicConfig(level=logging.DEBUG, format="%(name)s - %(message)s")
@@ -94,5 +94,64 @@ def test_E_light_change():
     manager.shutdown()
     logger.info("Test for E light change completed.")
 
+def make_vehicle(vid: str, source: str, priority: bool, timestamp: float) -> dict:
+    return {"id": vid, "type": "emergency" if priority else "normal", "source": source,
+            "destination": "N" if source != "N" else "S", "timestamp": timestamp,
+            "priority": priority, "turn": "emergency" if priority else "straight"}
+
+def test_pending_vehicles():
+    """Emergencies jump their approach's FIFO; the oldest one across approaches is tracked."""
+    pending = PendingVehicles()
+    shutdown_flag = threading.Event()
+    pending.extend("E", [make_vehicle("e1", "E", False, 1.0), make_vehicle("e2", "E", False, 2.0),
+                         make_vehicle("amb-E", "E", True, 3.0)])
+    pending.extend("N", [make_vehicle("amb-N", "N", True, 2.5), make_vehicle("n1", "N", False, 4.0)])
+    oldest = pending.oldest_emergency()
+    # A normal vehicle on S gives way while emergencies wait elsewhere; amb-E gives way to amb-N.
+    normal_waits = pending.yield_to_emergencies(make_vehicle("s1", "S", False, 5.0), "S", shutdown_flag, timeout=0.2)
+    e_order = [pending.pop("E", 0)["id"] for _ in range(3)]
+    emergency_waits = pending.yield_to_emergencies(make_vehicle("amb-E", "E", True, 3.0), "E", shutdown_flag, timeout=0.2)
+    n_order = [pending.pop("N", 0)["id"] for _ in range(2)]
+    after = pending.oldest_emergency()
+    if (oldest[2] == "N" and e_order == ["amb-E", "e1", "e2"] and n_order == ["amb-N", "n1"]
+            and normal_waits >= 0.2 and emergency_waits >= 0.2 and after is None and pending.pop("E", 0) is None):
+        logger.info("Test passed: emergencies served first, FIFO kept, oldest emergency tracked.")
+    else:
+        logger.error(f"Test failed: oldest {oldest}, E {e_order}, N {n_order}, waits {normal_waits:.2f}/"
+                     f"{emergency_waits:.2f}, after {after}")
+
+def test_emergency_behind_queue():
+    """An emergency vehicle queued behind normal traffic on a red approach crosses first."""
+    manager: SyncManager = Manager()
+    shutdown_flag = manager.Event()
+    queues = create_queues()
+    shared_mem = SharedMemory(manager)
+    for direction, color in {"N": "RED", "S": "RED", "E": "RED", "W": "RED"}.items():
+        shared_mem.set_light(direction, color)
+    now = time.time()
+    for i in range(3):
+        enqueue(queues, make_vehicle(f"w{i}", "W", False, now + i * 0.01), "W")
+    enqueue(queues, make_vehicle("ambW", "W", True, now + 0.1), "W")
+
+    departed = manager.list()
+    coordinator = Coordinator(queues, shared_mem, shutdown_flag, on_departure=departed.append, crossing_time=0.5)
+    coordinator_process = Process(target=coordinator.run, name="Coordinator")
+    coordinator_process.start()
+    time.sleep(2)
+    shared_mem.set_light("W", "GREEN")
+    deadline = time.time() + 10
+    while len(departed) < 4 and time.time() < deadline:
+        time.sleep(0.1)
+    shutdown_flag.set()
+    coordinator_process.join(timeout=5)
+    order = [v["id"] for v in departed]
+    manager.shutdown()
+    if order and order[0] == "ambW" and order[1:] == ["w0", "w1", "w2"]:
+        logger.info(f"Test passed: emergency crossed ahead of the queue: {order}")
+    else:
+        logger.error(f"Test failed: departure order {order}")
+
 if __name__ == "__main__":
+    test_pending_vehicles()
+    test_emergency_behind_queue()
     test_E_light_change()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import time
+import socket
+import logging
+import selectors
+import threading
+from multiprocessing import Manager, Event
+from coordinator import DisplayServer
+from utils.display_protocol import FrameReader, StateDecoder, hello_line
+from utils.message_queues import create_queues
+from utils.shared_memory import create_shared_memory
+
+logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
+logger = logging.getLogger("test_display_broadcast")
+logging.getLogger("coordinator").setLevel(logging.INFO)
+
+PORT = 65434
+FAST_CLIENTS = 300
+SLOW_CLIENTS = 3
+DURATION = 4.0
+
+def connect(slow: bool, binary: bool = False) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if slow:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.connect(("127.0.0.1", PORT))
+    if binary:
+        sock.sendall(hello_line(["binary"]))
+    return sock
+
+def read_all(clients: dict, duration: float) -> None:
+    """Reads every fast client until `duration` elapses, applying messages to its decoder."""
+    selector = selectors.DefaultSelector()
+    for sock, entry in clients.items():
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ, entry)
+    end = time.time() + duration
+    while time.time() < end:
+        for key, _ in selector.select(0.1):
+            entry = key.data
+            data = key.fileobj.recv(65536)
+            if not data:
+                selector.unregister(key.fileobj)
+                continue
+            for message in entry["reader"].feed(data):
+                entry["decoder"].apply(message)
+    selector.close()
+
+def main():
+    manager = Manager()
+    shared_memory = create_shared_memory(manager, native=True)
+    shutdown_flag = Event()
+    server = DisplayServer(create_queues(), shared_memory, shutdown_flag, port=PORT)
+    server.TICK_INTERVAL = 0.1
+    server.SEND_BUFFER = 4096
+    server.MAX_BACKLOG = 16 * 1024
+    server.STALL_TIMEOUT = 1.0
+    encodes = []
+    encode = server.encode
+    server.encode = lambda message, wire_format: encodes.append(message["type"]) or encode(message, wire_format)
+    threading.Thread(target=server.run, daemon=True).start()
+    time.sleep(0.5)
+
+    stop = threading.Event()
+    def produce():
+        i = 0
+        while not stop.is_set():
+            shared_memory.append_event_log(f"Vehicle {i:08d} passed through on GREEN light. " + "x" * 150)
+            shared_memory.set_light("E", "GREEN" if i % 2 else "RED")
+            i += 1
+            time.sleep(0.02)
+
+    try:
+        # Half of the readers negotiate binary frames, the other half are JSON-only clients.
+        fast = {connect(False, binary=i % 2 == 0): {"reader": FrameReader(), "decoder": StateDecoder()}
+                for i in range(FAST_CLIENTS)}
+        slow = [connect(True) for _ in range(SLOW_CLIENTS)]
+        logger.info(f"Connected {FAST_CLIENTS} fast (binary and JSON) and {SLOW_CLIENTS} slow (never reading) clients.")
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        read_all(fast, DURATION)
+        stop.set()
+        producer.join()
+        read_all(fast, 1.0)
+
+        # Test 1: Every fast client reached the server's final version with the same state.
+        final = server._encoder.version
+        versions = {entry["decoder"].version for entry in fast.values()}
+        states_match = all(entry["decoder"].state["event_logs"] == list(server._encoder.event_logs)
+                           for entry in fast.values())
+        if versions == {final} and states_match:
+            logger.info(f"Test passed: all {FAST_CLIENTS} fast clients are at version {final}.")
+        else:
+            logger.error(f"Test failed: client versions {sorted(v for v in versions if v is not None)[:5]}..., "
+                         f"server version {final}, states match: {states_match}")
+
+        # Test 2: Each tick was encoded once per wire format, not once per client.
+        deltas = encodes.count("delta")
+        logger.info(f"{deltas} deltas and {encodes.count('snapshot')} snapshots encoded for "
+                    f"{FAST_CLIENTS + SLOW_CLIENTS} clients.")
+        if deltas <= 2 * final:
+            logger.info("Test passed: one encode per tick and format.")
+        else:
+            logger.error("Test failed: deltas were encoded more than once per tick.")
+
+        # Test 3: Clients that stopped reading were dropped without stalling the others.
+        logger.info(f"Resyncs: {server.resyncs}, dropped: {server.dropped}, viewers left: {len(server.viewers)}")
+        if server.dropped >= SLOW_CLIENTS and len(server.viewers) == FAST_CLIENTS:
+            logger.info("Test passed: stalled clients were dropped.")
+        else:
+            logger.error("Test failed: stalled clients were not dropped.")
+
+        for sock in list(fast) + slow:
+            sock.close()
+    finally:
+        shutdown_flag.set()
+        time.sleep(0.3)
+        shared_memory.close()
+        manager.shutdown()
+
+if __name__ == "__main__":
+    main()
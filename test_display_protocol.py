@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+import json
+import time
+import socket
+import logging
+import threading
+from multiprocessing import Manager, Event
+from coordinator import DisplayServer
+from normal_traffic import create_vehicle
+from utils.display_protocol import (FrameReader, ProtocolError, StateDecoder, StateEncoder,
+                                    encode, encode_binary, encode_json)
+from utils.message_queues import create_queues
+from utils.shared_memory import create_shared_memory
+
+logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
+logger = logging.getLogger("test_display_protocol")
+
+PORT = 65433
+
+def read_messages(sock: socket.socket, duration: float) -> list:
+    """Collects every JSON line received during `duration` seconds."""
+    sock.settimeout(0.1)
+    buffer, messages, end = b"", [], time.time() + duration
+    while time.time() < end:
+        try:
+            buffer += sock.recv(65536)
+        except socket.timeout:
+            continue
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            messages.append(json.loads(line))
+    return messages
+
+def check_idle_and_delta(native: bool, port: int):
+    """The server sends a snapshot, then nothing while idle, then a small delta."""
+    backend = "native" if native else "manager"
+    manager = Manager()
+    shared_memory = create_shared_memory(manager, native=native)
+    shutdown_flag = Event()
+    server = DisplayServer(create_queues(), shared_memory, shutdown_flag, port=port)
+    server_thread = threading.Thread(target=server.run, daemon=True)
+    server_thread.start()
+    time.sleep(0.5)
+    try:
+        for i in range(20):
+            shared_memory.append_event_log(f"old event {i}")
+        with socket.create_connection(("127.0.0.1", port)) as sock:
+            decoder = StateDecoder()
+            first = read_messages(sock, 1.0)
+            idle = read_messages(sock, 1.0)
+            shared_memory.set_light("E", "GREEN")
+            shared_memory.append_event_log("new event")
+            second = read_messages(sock, 0.6)
+            size = len(json.dumps(second[-1])) if second else 0
+            for message in first + second:
+                state = decoder.apply(message)
+        logger.info(f"{backend}: messages {[m['type'] for m in first]} then {len(idle)} while idle, "
+                    f"then {[m['type'] for m in second]} ({size} bytes)")
+        if (first[0]["type"] == "snapshot" and not idle and len(second) == 1
+                and state["lights"]["E"] == "GREEN" and state["event_logs"][-1]["msg"] == "new event"):
+            logger.info(f"Test passed ({backend}): idle ticks were skipped and the delta was applied.")
+        else:
+            logger.error(f"Test failed ({backend}): {first + second}")
+    finally:
+        shutdown_flag.set()
+        server_thread.join(timeout=2)
+        shared_memory.close()
+        manager.shutdown()
+
+def check_concurrent_events(native: bool, appends: int = 300):
+    """Reads deltas while another thread appends: every event is sent at most once, in sequence order."""
+    backend = "native" if native else "manager"
+    manager = Manager()
+    shared_memory = create_shared_memory(manager, native=native)
+    server = DisplayServer(create_queues(), shared_memory, Event())
+    encoder = StateEncoder(shared_memory.event_logs.capacity)
+    sent = []
+    try:
+        writer = threading.Thread(target=lambda: [shared_memory.append_event_log(f"event {i}")
+                                                  for i in range(appends)])
+        writer.start()
+        while writer.is_alive():
+            delta = server.read_update(encoder)
+            if delta is not None:
+                sent.append([entry["seq"] for entry in delta["event_logs"]])
+        writer.join()
+        delta = server.read_update(encoder)
+        if delta is not None:
+            sent.append([entry["seq"] for entry in delta["event_logs"]])
+    finally:
+        shared_memory.close()
+        manager.shutdown()
+    seqs = [seq for batch in sent for seq in batch]
+    if seqs == sorted(set(seqs)) and seqs and seqs[-1] == appends - 1 and encoder.last_seq == appends - 1:
+        logger.info(f"Test passed ({backend}): {len(seqs)} events in {len(sent)} deltas, in order, none repeated.")
+    else:
+        logger.error(f"Test failed ({backend}): deltas carried {sent}")
+
+def main():
+    # Test 1: Encoder/decoder round trip; unchanged state produces no message.
+    encoder, decoder = StateEncoder(event_log_capacity=3), StateDecoder()
+    status = {"lights": {"N": "GREEN", "E": "RED"}, "queues": {"N": 1, "E": 0},
+              "current_vehicle": None, "vehicles_in_box": [], "vehicles": []}
+    encoder.update(status, [{"seq": 0, "time": 0.0, "msg": "first"}])
+    decoder.apply(encoder.snapshot_message())
+    unchanged = encoder.update(status, [])
+    status = dict(status, lights={"N": "RED", "E": "GREEN"})
+    delta = encoder.update(status, [{"seq": s, "time": 0.0, "msg": f"event {s}"} for s in range(1, 5)])
+    state = decoder.apply(delta)
+    if (unchanged is None and delta["changes"] == {"lights": {"N": "RED", "E": "GREEN"}}
+            and state["lights"] == status["lights"] and [e["seq"] for e in state["event_logs"]] == [2, 3, 4]):
+        logger.info("Test passed: deltas carry only changed fields and new events.")
+    else:
+        logger.error(f"Test failed: unchanged={unchanged}, delta={delta}, state={state}")
+
+    # Test 2: A delta that skips a version is rejected.
+    try:
+        decoder.apply(dict(delta, version=delta["version"] + 5))
+        logger.error("Test failed: out-of-order delta accepted.")
+    except ProtocolError:
+        logger.info("Test passed: out-of-order delta rejected.")
+
+    # Test 3: Binary frames decode to the same messages as JSON, and both can be interleaved.
+    vehicle = create_vehicle()
+    status = dict(status, current_vehicle=vehicle, vehicles_in_box=[vehicle])
+    delta = encoder.update(status, [{"seq": 5, "time": 1.5, "msg": "binary event"}])
+    snapshot = encoder.snapshot_message()
+    frames = encode_binary(snapshot) + encode_json(delta) + encode_binary(delta)
+    reader = FrameReader()
+    messages = [m for i in range(0, len(frames), 7) for m in reader.feed(frames[i:i + 7])]
+    # Binary vehicle records keep the first 16 hex digits of the ID.
+    short = dict(vehicle, id=vehicle["id"].replace("-", "")[:16])
+    expected = dict(delta, changes=dict(delta["changes"], current_vehicle=short, vehicles_in_box=[short]))
+    same = (len(messages) == 3 and messages[1] == delta and messages[2] == expected
+            and messages[0]["state"]["lights"] == snapshot["state"]["lights"])
+    logger.info(f"Snapshot: {len(encode_binary(snapshot))} bytes binary, {len(encode_json(snapshot))} bytes JSON; "
+                f"delta: {len(encode_binary(delta))} bytes binary, {len(encode_json(delta))} bytes JSON")
+    if same:
+        logger.info("Test passed: binary frames round trip and interleave with JSON lines.")
+    else:
+        logger.error(f"Test failed: {messages}")
+
+    # Test 4: A large JSON line arriving in small chunks is parsed without rescanning it.
+    big = encode_json({"vehicles": [create_vehicle() for _ in range(5000)]})
+    reader = FrameReader()
+    start = time.perf_counter()
+    received = [m for i in range(0, len(big), 1024) for m in reader.feed(big[i:i + 1024])]
+    elapsed = time.perf_counter() - start
+    if len(received) == 1 and len(received[0]["vehicles"]) == 5000 and not reader.buffer:
+        logger.info(f"Test passed: {len(big)} bytes in 1 KiB chunks parsed in {elapsed * 1000:.1f} ms.")
+    else:
+        logger.error(f"Test failed: {len(received)} messages, {len(reader.buffer)} bytes left")
+
+    # Test 4b: Counts too large for the binary fields fall back to JSON instead of raising.
+    large = StateEncoder(event_log_capacity=70000)
+    large.update(status, [{"seq": s, "time": 0.0, "msg": ""} for s in range(70000)])
+    snapshot = large.snapshot_message()
+    try:
+        encode_binary(snapshot)
+        rejected = False
+    except ValueError:
+        rejected = True
+    fallback = FrameReader().feed(encode(snapshot, "binary"))
+    if rejected and len(fallback) == 1 and len(fallback[0]["state"]["event_logs"]) == 70000:
+        logger.info("Test passed: an event log capacity over 65535 is sent as JSON.")
+    else:
+        logger.error(f"Test failed: rejected={rejected}, {len(fallback)} messages")
+
+    # Test 5: The server sends a snapshot, then nothing while idle, then a small delta.
+    # Test 6: Deltas carry each event once, in order, while events are being appended.
+    for native, port in ((True, PORT), (False, PORT + 1)):
+        check_idle_and_delta(native, port)
+        check_concurrent_events(native)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+import time
+import logging
+import threading
+from intersection import AdmissionController, CONFLICTS, movements_conflict
+
+logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
+logger = logging.getLogger("test_intersection")
+
+def vehicle(vid, source, destination, turn, priority=False):
+    return {"id": vid, "source": source, "destination": destination, "turn": turn, "priority": priority}
+
+def main():
+    # Test 1: The conflict matrix is symmetric and matches the textbook cases.
+    symmetric = all((a in CONFLICTS[b]) == (b in CONFLICTS[a]) for a in CONFLICTS for b in CONFLICTS)
+    cases = [
+        ((("N", "straight"), ("S", "straight")), False),
+        ((("N", "left"), ("S", "left")), False),
+        ((("N", "straight"), ("S", "left")), True),
+        ((("N", "straight"), ("E", "straight")), True),
+        ((("N", "right"), ("E", "right")), False),
+        ((("N", "straight"), ("E", "emergency")), True),
+    ]
+    expected = all(movements_conflict(a, b) == conflict for (a, b), conflict in cases)
+    if symmetric and expected:
+        logger.info("Test passed: conflict matrix is symmetric and correct.")
+    else:
+        logger.error(f"Test failed: symmetric={symmetric}, expected cases={expected}")
+
+    # Test 2: Opposing through movements share the box, a crossing one waits.
+    admission = AdmissionController()
+    north = vehicle("n1", "N", "S", "straight")
+    south = vehicle("s1", "S", "N", "straight")
+    east = vehicle("e1", "E", "W", "straight")
+    admission.admit(north)
+    admission.admit(south)
+    entered = threading.Event()
+    worker = threading.Thread(target=lambda: admission.admit(east) and entered.set())
+    worker.start()
+    time.sleep(0.2)
+    blocked = not entered.is_set() and len(admission.vehicles_in_box()) == 2
+    admission.release(north)
+    admission.release(south)
+    worker.join(timeout=2)
+    if blocked and entered.is_set():
+        logger.info("Test passed: compatible movements shared the intersection, conflicting one waited.")
+    else:
+        logger.error(f"Test failed: blocked={blocked}, entered={entered.is_set()}")
+
+    # Test 3: A waiting vehicle is cancelled on shutdown.
+    shutdown = threading.Event()
+    result = []
+    emergency = vehicle("w1", "W", "E", "emergency", priority=True)
+    worker = threading.Thread(target=lambda: result.append(admission.admit(emergency, shutdown, poll=0.05)))
+    worker.start()
+    time.sleep(0.1)
+    shutdown.set()
+    worker.join(timeout=2)
+    admission.release(east)
+    if result == [False] and admission.vehicles_in_box() == []:
+        logger.info("Test passed: shutdown cancelled the pending admission.")
+    else:
+        logger.error(f"Test failed: result={result}, box={admission.vehicles_in_box()}")
+
+if __name__ == "__main__":
+    main()
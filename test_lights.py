@@ -1,12 +1,11 @@
 #!/usr/bin/env python3
 import time
-import os
-import signal
 import logging
 from multiprocessing import Manager, Process
 from multiprocessing.managers import SyncManager
 from utils.shared_memory import SharedMemory
-from lights import TrafficLights
+from utils.signals import PreemptionChannel
+from lights import EMERGENCY_DURATION, EmergencyQueue, TrafficLights
 
 logging.basicConfig(level=logging.INFO, format="%(name)s - %(process)d - %(message)s")
 logger = logging.getLogger("test_lights")
@@ -21,15 +20,13 @@ def poll_shared_memory(shared_mem: SharedMemory, duration: int = 20):
         logger.info(f"Polled lights state: {lights}")
         time.sleep(3)  # Poll every 3 seconds
 
-def simulate_emergency():
+def simulate_emergency(preemption: PreemptionChannel, direction: str = "E"):
     """
-    Reads the lights.pid file and sends a SIGUSR1 signal to simulate an emergency.
+    Requests an emergency green for `direction` on the preemption channel.
     """
     try:
-        with open("lights.pid", "r") as f:
-            pid = int(f.read().strip())
-        os.kill(pid, signal.SIGUSR1)
-        logger.info("Simulated emergency signal (SIGUSR1) sent to TrafficLights process.")
+        preemption.request(direction)
+        logger.info(f"Simulated emergency request for {direction} sent to TrafficLights process.")
     except Exception as e:
         logger.error(f"Failed to simulate emergency: {e}")
 
@@ -42,8 +39,9 @@ def test_lights():
     # Create shared memory.
     shared_mem = SharedMemory(manager)
     
-    # Instantiate the TrafficLights process.
-    lights_instance = TrafficLights(shared_mem, shutdown_flag)
+    # Instantiate the TrafficLights process with its preemption channel.
+    preemption = PreemptionChannel()
+    lights_instance = TrafficLights(shared_mem, shutdown_flag, preemption=preemption)
     lights_process = Process(target=lights_instance.run, name="TrafficLights")
     
     # Start the lights process.
@@ -55,7 +53,13 @@ def test_lights():
     poll_shared_memory(shared_mem, duration=15)
     
     # Simulate an emergency after 15 seconds.
-    simulate_emergency()
+    simulate_emergency(preemption, "E")
+    time.sleep(0.2)
+    lights = shared_mem.get_light_state()
+    if lights == {"N": "RED", "S": "RED", "E": "GREEN", "W": "RED"}:
+        logger.info("Test passed: emergency request turned E green within 200 ms.")
+    else:
+        logger.error(f"Test failed: lights after emergency request: {lights}")
     
     # Poll the shared memory for additional 15 seconds to observe emergency mode.
     logger.info("Polling shared memory during emergency mode...")
@@ -75,8 +79,60 @@ def test_lights():
     manager.shutdown()
     logger.info("Test for TrafficLights completed.")
 
+def test_emergency_queue():
+    """Arbitration rules: coalescing, service order and bounded extensions."""
+    queue = EmergencyQueue(duration=5, max_green=20)
+    queue.request("E", 0.0, 0.0)
+    queue.request("N", 0.5, 0.5)
+    queue.request("E", 1.0, 1.0)  # Coalesced into E's waiting entry
+    first = queue.grant(1.0)
+    second_waiting = list(queue.pending)
+    extended = queue.request("E", 4.0, 4.0)  # E is green: served at once, green pushed to 9 s
+    capped = queue.request("E", 17.0, 17.0)  # Would run past 20 s while N waits: queued instead
+    if (first == ("E", [0.0, 1.0]) and second_waiting == ["N"] and extended and queue.green_until == 9.0
+            and not capped and list(queue.pending) == ["N", "E"] and queue.coalesced == 2):
+        logger.info("Test passed: emergency requests coalesced, ordered and extended.")
+    else:
+        logger.error(f"Test failed: grant {first}, pending {queue.pending}, until {queue.green_until}")
+
+def test_emergency_burst():
+    """A burst of requests: one green per approach, E never cut short, N served right after."""
+    manager: SyncManager = Manager()
+    shutdown_flag = manager.Event()
+    shared_mem = SharedMemory(manager)
+    preemption = PreemptionChannel()
+    lights_instance = TrafficLights(shared_mem, shutdown_flag, preemption=preemption)
+    lights_process = Process(target=lights_instance.run, name="TrafficLights")
+    lights_process.start()
+    time.sleep(1)
+
+    start = time.time()
+    for direction in ("E", "E", "N"):
+        preemption.request(direction)
+    time.sleep(EMERGENCY_DURATION - 1)
+    preemption.request("E")  # Extends E's green by a full EMERGENCY_DURATION
+    seen = []
+    while time.time() - start < 3 * EMERGENCY_DURATION:
+        lights = shared_mem.get_light_state()
+        green = [d for d, color in lights.items() if color == "GREEN"]
+        if shared_mem.in_priority_mode() and len(green) == 1 and (not seen or seen[-1][0] != green[0]):
+            seen.append((green[0], time.time() - start))
+        time.sleep(0.05)
+    shutdown_flag.set()
+    lights_process.join(timeout=5)
+    manager.shutdown()
+
+    order = [d for d, _ in seen]
+    n_at = seen[1][1] if len(seen) > 1 else 0
+    if order == ["E", "N"] and n_at >= 2 * EMERGENCY_DURATION - 1.5:
+        logger.info(f"Test passed: burst served as {order}, N green after {n_at:.1f} s.")
+    else:
+        logger.error(f"Test failed: emergency greens {seen}")
+
 if __name__ == "__main__":
     try:
+        test_emergency_queue()
+        test_emergency_burst()
         test_lights()
     except KeyboardInterrupt:
         logger.info("KeyboardInterrupt received, exiting test.")
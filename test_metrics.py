@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+import time
+import logging
+import threading
+import urllib.request
+from multiprocessing import Event, Manager, Process
+from coordinator import Coordinator
+from normal_traffic import create_vehicle
+from utils.message_queues import create_queues, enqueue
+from utils.metrics import MAX_WRITERS, MetricsRegistry, MetricsServer
+from utils.shared_memory import create_shared_memory
+
+logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
+logger = logging.getLogger("test_metrics")
+logging.getLogger("coordinator").setLevel(logging.WARNING)
+
+PORT = 65435
+INCREMENTS = 2000
+
+def count_from_threads(registry: MetricsRegistry) -> None:
+    def work():
+        for _ in range(INCREMENTS):
+            registry.inc("crossroads_vehicles_processed_total", "E")
+    threads = [threading.Thread(target=work) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+def sample(text: str, line_prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.split()[-1])
+    return -1.0
+
+def main():
+    registry = MetricsRegistry()
+    manager = Manager()
+    shared_memory = create_shared_memory(manager, native=True)
+    try:
+        # Test 1: Increments from several processes and threads are all counted.
+        processes = [Process(target=count_from_threads, args=(registry,)) for _ in range(3)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+        total = registry.collect()[("crossroads_vehicles_processed_total", ("E",))][0]
+        if total == 3 * 2 * INCREMENTS:
+            logger.info(f"Test passed: {int(total)} increments aggregated across processes.")
+        else:
+            logger.error(f"Test failed: expected {3 * 2 * INCREMENTS} increments, got {total}")
+
+        # Test 2: Histogram buckets are cumulative in the exposition format.
+        for wait in (0.2, 3, 3, 500):
+            registry.observe("crossroads_queue_wait_seconds", wait, "W")
+        text = registry.render()
+        buckets = [sample(text, f'crossroads_queue_wait_seconds_bucket{{direction="W",le="{le}"}}')
+                   for le in ("0.5", "5", "300", "+Inf")]
+        count = sample(text, 'crossroads_queue_wait_seconds_count{direction="W"}')
+        if buckets == [1, 3, 3, 4] and count == 4:
+            logger.info("Test passed: histogram rendered with cumulative buckets.")
+        else:
+            logger.error(f"Test failed: buckets {buckets}, count {count}")
+
+        # Test 3: A running coordinator's crossings and the sampled gauges show up on the endpoint.
+        queues = create_queues()
+        shutdown_flag = Event()
+        shared_memory.set_lights({"N": "GREEN", "S": "GREEN", "E": "RED", "W": "RED"})
+        for source, destination in (("N", "S"), ("S", "N")):  # Compatible, so they cross together
+            vehicle = create_vehicle(sources=[source])
+            vehicle["destination"] = destination
+            vehicle["turn"] = "straight"
+            enqueue(queues, vehicle, source)
+        server = MetricsServer(registry, queues, shared_memory, shutdown_flag, port=PORT)
+        coordinator = Coordinator(queues, shared_memory, shutdown_flag, metrics=registry)
+        processes = [Process(target=coordinator.run), Process(target=server.run)]
+        for p in processes:
+            p.start()
+        time.sleep(6)
+        with urllib.request.urlopen(f"http://127.0.0.1:{PORT}/metrics", timeout=5) as response:
+            content_type = response.headers["Content-Type"]
+            text = response.read().decode()
+        shutdown_flag.set()
+        for p in processes:
+            p.join()
+        processed = sum(sample(text, f'crossroads_vehicles_processed_total{{direction="{d}"}}') for d in "NS")
+        crossings = sample(text, "crossroads_crossing_seconds_count")
+        phase = sample(text, "crossroads_phase")
+        if content_type.startswith("text/plain") and processed == 2 and crossings == 2 and phase == 0:
+            logger.info("Test passed: scrape shows the coordinator's crossings and the NS phase.")
+        else:
+            logger.error(f"Test failed: processed={processed} crossings={crossings} phase={phase}")
+    finally:
+        shared_memory.close()
+        registry.close()
+        manager.shutdown()
+
+def test_row_reuse():
+    """Short-lived threads reuse released rows; too many concurrent writers raise instead of sharing a row."""
+    registry = MetricsRegistry()
+    try:
+        # One thread per emergency, as a per-signal handler would start them.
+        for _ in range(3 * MAX_WRITERS):
+            t = threading.Thread(target=registry.inc, args=("crossroads_emergency_preemptions_total", "N"))
+            t.start()
+            t.join()
+        total = registry.collect()[("crossroads_emergency_preemptions_total", ("N",))][0]
+        claimed = int(registry._cells[0])
+        if total == 3 * MAX_WRITERS and claimed <= 2:
+            logger.info(f"Test passed: {int(total)} short-lived threads recorded with {claimed} row(s).")
+        else:
+            logger.error(f"Test failed: {total} increments recorded, {claimed} rows claimed")
+    finally:
+        registry.close()
+
+    registry = MetricsRegistry(max_writers=2)
+    release = threading.Event()
+    errors = []
+    def hold_row():
+        try:
+            registry.inc("crossroads_vehicles_processed_total", "W")
+        except RuntimeError as e:
+            errors.append(e)
+        release.wait()
+    threads = [threading.Thread(target=hold_row) for _ in range(3)]
+    try:
+        for t in threads:
+            t.start()
+        time.sleep(0.2)
+        release.set()
+        for t in threads:
+            t.join()
+        total = registry.collect()[("crossroads_vehicles_processed_total", ("W",))][0]
+        if len(errors) == 1 and total == 2:
+            logger.info(f"Test passed: third concurrent writer rejected: {errors[0]}")
+        else:
+            logger.error(f"Test failed: errors {errors}, total {total}")
+    finally:
+        registry.close()
+
+if __name__ == "__main__":
+    main()
+    test_row_reuse()
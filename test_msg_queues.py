@@ -1,5 +1,5 @@
 import time
-from utils.message_queues import create_queues, enqueue
+from utils.message_queues import create_queues, enqueue, enqueue_many, drain
 import logging
 
 # Set up logging to see output on the console.
@@ -39,5 +39,16 @@ def main():
     else:
         logger.error("Test failed: No vehicle found in the 'N' queue.")
 
+    # Batched path: one message per direction, drained in FIFO order.
+    batch = [dict(sample_vehicle, id=f"veh{i:03d}", source="S" if i % 2 else "N") for i in range(10)]
+    enqueue_many(queues, batch)
+    logger.info(f"Queue sizes after enqueue_many: N={queues['N'].qsize()} S={queues['S'].qsize()}")
+    drained = drain(queues, "N", max_items=3, timeout=1) + drain(queues, "N", max_items=10, timeout=1)
+    expected = [v["id"] for v in batch if v["source"] == "N"]
+    if [v["id"] for v in drained] == expected and queues["N"].qsize() == 0:
+        logger.info("Test passed: drain() returned the batch in order.")
+    else:
+        logger.error(f"Test failed: drained {[v['id'] for v in drained]}, expected {expected}.")
+
 if __name__ == "__main__":
     main()
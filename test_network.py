@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+import time
+import logging
+import threading
+from multiprocessing import Process
+from network import Link, LinkForwarder, NetworkConfig, simulate_network
+from normal_traffic import create_vehicle
+from priority_traffic import priority_traffic_gen
+from utils.message_queues import create_queues, drain
+
+logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
+logger = logging.getLogger("test_network")
+
+def exit_vehicles(forwarder: LinkForwarder, vehicle: dict, count: int) -> None:
+    for _ in range(count):
+        forwarder(vehicle)
+
+def main():
+    config = NetworkConfig.load("networks/corridor.json")
+
+    # Test 1: New vehicles only enter on arms no link arrives on.
+    arms = {name: config.boundary_arms(name) for name in config.intersections}
+    if arms == {"A": ["N", "S", "W"], "B": ["N", "S"], "C": ["N", "S", "E"]}:
+        logger.info("Test passed: boundary arms derived from the links.")
+    else:
+        logger.error(f"Test failed: unexpected boundary arms {arms}")
+
+    # Test 2: Invalid topologies are rejected.
+    invalid = [
+        [Link("A", "E", "Z", "W", 10)],
+        [Link("A", "X", "B", "W", 10)],
+        [Link("A", "E", "B", "W", 10), Link("A", "E", "B", "N", 10)],
+        [Link("A", "E", "B", "W", 10), Link("A", "N", "B", "W", 10)],
+    ]
+    rejected = 0
+    for links in invalid:
+        try:
+            NetworkConfig({"A": {}, "B": {}}, links)
+        except ValueError:
+            rejected += 1
+    if rejected == len(invalid):
+        logger.info("Test passed: invalid links rejected.")
+    else:
+        logger.error(f"Test failed: only {rejected}/{len(invalid)} invalid topologies rejected.")
+
+    # Test 3: A seeded network run is reproducible and vehicles travel between intersections.
+    first = simulate_network(config, 3600, seed=3)
+    second = simulate_network(config, 3600, seed=3)
+    network = first["network"]
+    logger.info(f"Network summary: {network}")
+    if first == second and network["exited"] > 0 and network["average_hops"] > 0:
+        logger.info("Test passed: seeded network runs are identical and use the links.")
+    else:
+        logger.error("Test failed: network runs differ or no vehicle was forwarded.")
+
+    # Test 4: Every vehicle that arrived from a link was forwarded by a departure.
+    arrived = sum(s["arrived"] for s in first["intersections"].values())
+    departed = sum(s["departed"] for s in first["intersections"].values())
+    if network["exited"] <= departed <= arrived:
+        logger.info("Test passed: vehicle counts are consistent across the network.")
+    else:
+        logger.error(f"Test failed: arrived={arrived} departed={departed} exited={network['exited']}")
+
+    # Test 5: The live forwarder delivers after the travel time and copies without its thread.
+    queues_by_intersection = {"A": create_queues(), "B": create_queues()}
+    forwarder = LinkForwarder("A", NetworkConfig({"A": {}, "B": {}}, [Link("A", "E", "B", "W", 0.3)]),
+                              queues_by_intersection)
+    vehicle = create_vehicle(sources=["W"])
+    vehicle["destination"] = "E"
+    forwarder(vehicle)
+    start = time.time()
+    delivered = queues_by_intersection["B"]["W"].get(timeout=2)
+    waited = time.time() - start
+    state = forwarder.__getstate__()
+    if ("_thread" not in state and delivered["id"] == vehicle["id"] and delivered["source"] == "W"
+            and delivered["hops"] == 1 and waited >= 0.25):
+        logger.info(f"Test passed: vehicle reached B after {waited:.2f} s.")
+    else:
+        logger.error(f"Test failed: delivered {delivered} after {waited:.2f} s.")
+
+    # Test 6: Vehicles leaving the network are counted in the shared exits counter, from threads and processes.
+    leaving = create_vehicle(sources=["E"])
+    leaving["destination"] = "N"
+    workers = [threading.Thread(target=exit_vehicles, args=(forwarder, leaving, 500)) for _ in range(2)]
+    workers += [Process(target=exit_vehicles, args=(forwarder, leaving, 500)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if forwarder.exits.value == 2000:
+        logger.info("Test passed: 2000 network exits counted across threads and processes.")
+    else:
+        logger.error(f"Test failed: {forwarder.exits.value} exits counted instead of 2000.")
+
+    # Test 7: Live emergency traffic only enters on boundary arms, like the simulated network.
+    queues, shutdown_flag = create_queues(), threading.Event()
+    generator = threading.Thread(target=priority_traffic_gen, args=(queues, 0.01, shutdown_flag),
+                                 kwargs={"sources": config.boundary_arms("B")})
+    generator.start()
+    time.sleep(0.5)
+    shutdown_flag.set()
+    generator.join()
+    counts = {d: len(drain(queues, d, 1000, timeout=0.2)) for d in queues}
+    if counts["N"] and counts["S"] and not counts["E"] and not counts["W"]:
+        logger.info(f"Test passed: emergency vehicles entered B on its boundary arms only {counts}.")
+    else:
+        logger.error(f"Test failed: emergency vehicles per arm at B {counts}")
+
+if __name__ == "__main__":
+    main()
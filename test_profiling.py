@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import glob
+import tempfile
+import subprocess
+
+# Profiling is switched on at import time, before the instrumented modules are loaded.
+TRACE_DIR = tempfile.mkdtemp(prefix="crossroads-profile-")
+os.environ["CROSSROADS_PROFILE"] = "1"
+os.environ["CROSSROADS_PROFILE_TRACE"] = os.path.join(TRACE_DIR, "trace")
+
+import logging
+import threading
+from multiprocessing import Event, Manager, Process
+from coordinator import DisplayServer
+from utils.message_queues import create_queues
+from utils.profiling import ProfiledLock
+from utils.shared_memory import create_shared_memory
+
+logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
+logger = logging.getLogger("test_profiling")
+logging.getLogger("shared_memory").setLevel(logging.WARNING)
+
+def contend(shared_memory, server) -> None:
+    """The lights, coordinator and display call sites hammering the shared lock from several threads."""
+    def lights():
+        for i in range(200):
+            shared_memory.set_lights({"N": "GREEN" if i % 2 else "RED"})
+    def coordinator():
+        for i in range(200):
+            shared_memory.append_event_log(f"Vehicle {i} passed.")
+            shared_memory.update_state("current_vehicle", None)
+    def display():
+        for _ in range(200):
+            server.generate_status()
+    threads = [threading.Thread(target=fn) for fn in (lights, coordinator, display)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+def main():
+    manager = Manager()
+    for native in (False, True):
+        label = "native" if native else "manager"
+        shared_memory = create_shared_memory(manager, native=native)
+        server = DisplayServer(create_queues(), shared_memory, Event())
+
+        # Test 1: The shared lock is instrumented when CROSSROADS_PROFILE is set.
+        if isinstance(shared_memory.lock, ProfiledLock):
+            logger.info(f"Test passed ({label}): shared memory lock is instrumented.")
+        else:
+            logger.error(f"Test failed ({label}): lock is {type(shared_memory.lock)}")
+
+        # Test 2: Each process writes a Chrome trace with wait and hold times per call site.
+        p = Process(target=contend, args=(shared_memory, server))
+        p.start()
+        p.join()
+        path = os.path.join(TRACE_DIR, f"trace-{p.pid}.json")
+        with open(path) as f:
+            events = json.load(f)["traceEvents"]
+        sites = {(e["cat"], e["name"].split(" <- ")[0]) for e in events}
+        expected = {(f"shared_memory.lock.{kind}", site) for kind in ("wait", "hold")
+                    for site in ("set_lights", "append_event_log", "update_state", "snapshot")}
+        expected.add(("call", "display.generate_status"))
+        if expected <= sites and all(e["ph"] == "X" and e["dur"] >= 0 for e in events):
+            logger.info(f"Test passed ({label}): {len(events)} trace events covering every call site.")
+        else:
+            logger.error(f"Test failed ({label}): missing {sorted(expected - sites)}")
+        shared_memory.close()
+    manager.shutdown()
+
+    # Test 3: Per-process traces merge into one file and summarize.
+    paths = glob.glob(os.path.join(TRACE_DIR, "trace-*.json"))
+    merged = os.path.join(TRACE_DIR, "merged.json")
+    subprocess.run([sys.executable, "-m", "utils.profiling", "merge", *paths, "-o", merged], check=True,
+                   capture_output=True)
+    summary = subprocess.run([sys.executable, "-m", "utils.profiling", "summary", merged], check=True,
+                             capture_output=True, text=True).stdout
+    with open(merged) as f:
+        merged_events = json.load(f)["traceEvents"]
+    if len({e["pid"] for e in merged_events}) >= 2 and "shared_memory.lock.hold" in summary:
+        logger.info(f"Test passed: merged {len(paths)} traces.\n{summary}")
+    else:
+        logger.error("Test failed: merged trace is incomplete.")
+
+    # Test 4: With the variable unset the lock and functions are left untouched.
+    env = {k: v for k, v in os.environ.items() if not k.startswith("CROSSROADS_PROFILE")}
+    check = ("from multiprocessing import Lock\n"
+             "from utils.profiling import profile_lock, profiled\n"
+             "lock = Lock(); fn = lambda: None\n"
+             "print(profile_lock(lock, 'x') is lock and profiled('x')(fn) is fn)")
+    result = subprocess.run([sys.executable, "-c", check], env=env, capture_output=True, text=True)
+    if result.stdout.strip() == "True":
+        logger.info("Test passed: profiling costs nothing when disabled.")
+    else:
+        logger.error(f"Test failed: disabled profiling still wraps ({result.stdout} {result.stderr})")
+
+if __name__ == "__main__":
+    main()
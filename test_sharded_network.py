@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+import logging
+from network import grid_config, simulate_network
+from sharded_network import partition, simulate_sharded
+
+logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
+logger = logging.getLogger("test_sharded_network")
+
+def main():
+    config = grid_config(4, 4, travel_time=15)
+    duration = 1800
+
+    # Test 1: Shards are contiguous row bands covering every intersection once.
+    groups = partition(config, 2)
+    if groups[0] == [f"r{r}c{c}" for r in range(2) for c in range(4)] and sum(map(len, groups)) == 16:
+        logger.info("Test passed: grid split into row bands.")
+    else:
+        logger.error(f"Test failed: unexpected partition {groups}")
+
+    # Test 2: A single shard reproduces the single-process simulation exactly.
+    single = simulate_network(config, duration, seed=5)
+    sharded = simulate_sharded(config, duration, workers=1, seed=5)
+    if sharded["intersections"] == single["intersections"] and sharded["network"] == single["network"]:
+        logger.info("Test passed: one shard matches simulate_network.")
+    else:
+        logger.error(f"Test failed: one shard differs:\n{sharded['network']}\n{single['network']}")
+
+    # Test 3: With several shards vehicles cross shard boundaries and counts stay consistent.
+    result = simulate_sharded(config, duration, workers=3, seed=5)
+    arrived = sum(s["arrived"] for s in result["intersections"].values())
+    departed = sum(s["departed"] for s in result["intersections"].values())
+    logger.info(f"3 shards: {result['ticks']} ticks, {result['exchanged']} vehicles exchanged, {result['network']}")
+    if (len(result["intersections"]) == 16 and result["exchanged"] > 0
+            and result["network"]["exited"] <= departed <= arrived):
+        logger.info("Test passed: boundary vehicles exchanged between shards.")
+    else:
+        logger.error(f"Test failed: arrived={arrived} departed={departed} exchanged={result['exchanged']}")
+
+    # Test 4: Sharded runs are reproducible for a given seed and worker count.
+    again = simulate_sharded(config, duration, workers=3, seed=5)
+    if again["intersections"] == result["intersections"] and again["network"] == result["network"]:
+        logger.info("Test passed: sharded runs are reproducible.")
+    else:
+        logger.error("Test failed: sharded runs differ.")
+
+    # Test 5: The traffic of each intersection does not depend on the number of workers.
+    runs = {workers: simulate_sharded(config, duration, workers=workers, seed=1) for workers in (1, 2, 4)}
+    arrivals = {workers: {name: s["arrived"] for name, s in run["intersections"].items()}
+                for workers, run in runs.items()}
+    events = {workers: run["events_processed"] for workers, run in runs.items()}
+    if arrivals[1] == arrivals[2] == arrivals[4] and len(set(events.values())) == 1:
+        logger.info(f"Test passed: 1, 2 and 4 shards simulate the same traffic ({events[1]} events).")
+    else:
+        logger.error(f"Test failed: events per worker count {events}, arrivals {arrivals}")
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,19 @@
 import time
 from multiprocessing import Manager
 from multiprocessing.managers import SyncManager
-from utils.shared_memory import SharedMemory
+from multiprocessing import Process
+from utils.shared_memory import SharedMemory, NativeSharedMemory
 
-def main():
+def set_light_in_child(shared_mem, direction: str, color: str):
+    shared_mem.set_light(direction, color)
+
+def main(native: bool = False):
     # Create a single Manager instance.
     manager: SyncManager = Manager()
     
     # Instantiate the SharedMemory object.
-    shared_mem = SharedMemory(manager)
+    shared_mem = NativeSharedMemory(manager) if native else SharedMemory(manager)
+    print(f"=== Backend: {type(shared_mem).__name__} ===")
     
     # Test 1: Verify initial lights state.
     lights_initial = shared_mem.get_light_state()
@@ -48,9 +53,32 @@ def main():
     for event in event_logs:
         print(event)
     
+    # Test 5b: The ring keeps only the newest entries once full.
+    for i in range(30):
+        shared_mem.append_event_log(f"Burst {i+1}")
+    event_logs = shared_mem.get_event_logs()
+    print(f"Event log size after burst (should be 20): {len(event_logs)}")
+    print("Oldest / newest (should be Burst 11 / Burst 30):", event_logs[0]["msg"], "/", event_logs[-1]["msg"])
+
+    # Test 5c: event_logs_since() reads only the newer slots, across the ring's wrap-around.
+    last = event_logs[-1]["seq"]
+    matches = all(shared_mem.event_logs_since(seq) == [e for e in event_logs if e["seq"] > seq]
+                  for seq in range(last - 25, last + 2))
+    print("event_logs_since matches the filtered log (should be True):", matches)
+
     # Test 6: Get a non-existent key.
     non_existent = shared_mem.get_state("non_existent_key")
     print("Non-existent key (should be None):", non_existent)
+
+    # Test 7: A write from another process is visible to this one.
+    p = Process(target=set_light_in_child, args=(shared_mem, "W", "GREEN"))
+    p.start()
+    p.join()
+    print("W light after child write (should be GREEN):", shared_mem.get_light_state()["W"])
+
+    shared_mem.close()
+    manager.shutdown()
     
 if __name__ == "__main__":
     main()
+    main(native=True)
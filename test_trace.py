@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import os
+import logging
+import tempfile
+from multiprocessing import Process
+from normal_traffic import create_vehicle
+from replay import replay_fast, replay_live
+from utils.trace import ARRIVAL, DEPARTURE, EMERGENCY, LIGHTS, TraceReader, TraceRecorder
+from utils.vehicle import id_to_int
+
+logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
+logger = logging.getLogger("test_trace")
+logging.getLogger("coordinator").setLevel(logging.WARNING)
+
+NS_GREEN = {"N": "GREEN", "S": "GREEN", "E": "RED", "W": "RED"}
+EW_GREEN = {"N": "RED", "S": "RED", "E": "GREEN", "W": "GREEN"}
+ARRIVALS_PER_WRITER = 500
+
+class FakeClock:
+    """Recorded time, set by the test instead of read from the wall clock."""
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+def write_arrivals(recorder: TraceRecorder, sources: list) -> None:
+    for _ in range(ARRIVALS_PER_WRITER):
+        recorder.arrival(create_vehicle(sources=sources))
+    recorder.close()
+
+def record_run(path: str) -> list:
+    """Two minutes of alternating 30 s phases with two arrivals each, then an emergency."""
+    clock = FakeClock()
+    recorder = TraceRecorder(path, clock=clock)
+    vehicles = []
+    for cycle in range(4):
+        clock.now = 1000.0 + cycle * 30
+        recorder.lights(NS_GREEN if cycle % 2 == 0 else EW_GREEN)
+        for offset, source in enumerate(("N", "S") if cycle % 2 == 0 else ("E", "W")):
+            clock.now = 1000.0 + cycle * 30 + 2 + offset
+            vehicle = create_vehicle(sources=[source])
+            vehicle["destination"] = {"N": "S", "S": "N", "E": "W", "W": "E"}[source]
+            vehicle["turn"] = "straight"
+            recorder.arrival(vehicle)
+            vehicles.append(vehicle)
+    clock.now = 1120.0
+    recorder.emergency("E")
+    recorder.lights({"N": "RED", "S": "RED", "E": "GREEN", "W": "RED"})
+    recorder.close()
+    return vehicles
+
+def main():
+    directory = tempfile.mkdtemp(prefix="crossroads-trace-")
+
+    # Test 1: Processes appending to one trace never interleave partial records.
+    path = os.path.join(directory, "appends.trace")
+    recorder = TraceRecorder(path)
+    writers = [Process(target=write_arrivals, args=(recorder, [d])) for d in "NSEW"]
+    for p in writers:
+        p.start()
+    for p in writers:
+        p.join()
+    reader = TraceReader(path)
+    by_direction = reader.summary()["arrivals_by_direction"]
+    if len(reader) == 4 * ARRIVALS_PER_WRITER and all(by_direction[d] == ARRIVALS_PER_WRITER for d in "NSEW"):
+        logger.info(f"Test passed: {len(reader)} records appended by 4 processes, all intact.")
+    else:
+        logger.error(f"Test failed: {len(reader)} records, {by_direction}")
+    reader.close()
+
+    # Test 2: Records round-trip, and ordered() repairs small out-of-order appends.
+    path = os.path.join(directory, "run.trace")
+    vehicles = record_run(path)
+    reader = TraceReader(path)
+    arrivals = [record.vehicle() for record in reader.records(ARRIVAL)]
+    same = all(id_to_int(a["id"]) == id_to_int(v["id"]) and a["source"] == v["source"] and a["destination"] == v["destination"]
+               for a, v in zip(arrivals, vehicles))
+    lights = [record.lights() for record in reader.records(LIGHTS)]
+    emergency = [record.direction() for record in reader.records(EMERGENCY)]
+    if same and len(arrivals) == len(vehicles) and lights[:2] == [NS_GREEN, EW_GREEN] and emergency == ["E"]:
+        logger.info(f"Test passed: {len(reader)} records read back unchanged.")
+    else:
+        logger.error(f"Test failed: arrivals match={same}, lights={lights[:2]}, emergency={emergency}")
+    reader.close()
+
+    skewed = os.path.join(directory, "skewed.trace")
+    recorder = TraceRecorder(skewed, clock=iter([0.0, 10.0, 9.5, 11.0, 10.2, 12.0]).__next__)
+    for _ in range(5):
+        recorder.lights(NS_GREEN)
+    recorder.close()
+    reader = TraceReader(skewed)
+    times = [record.time for record in reader.ordered()]
+    if times == sorted(times) and len(times) == 5:
+        logger.info("Test passed: ordered() yields records in time order.")
+    else:
+        logger.error(f"Test failed: ordered() gave {times}")
+    reader.close()
+
+    # Test 3: Fast replay runs the recorded arrivals under the recorded lights on a virtual clock.
+    reader = TraceReader(path)
+    summary = replay_fast(reader)
+    if summary["arrived"] == len(vehicles) and summary["departed"] == len(vehicles) and summary["preemptions"] == 1:
+        logger.info(f"Test passed: fast replay of {summary['arrived']} arrivals, all departed.")
+    else:
+        logger.error(f"Test failed: fast replay summary {summary}")
+
+    # Test 4: Live replay at 20x drives a real coordinator and its replay is recorded with departures,
+    # stamped on the simulated clock (the arrivals span as many seconds as in the original trace).
+    replayed = os.path.join(directory, "replayed.trace")
+    original = [record.time for record in reader.records(ARRIVAL)]
+    counts = replay_live(reader, speed=20, record=replayed)
+    reader.close()
+    reader = TraceReader(replayed)
+    kinds = reader.summary()["counts"]
+    departed = len(list(reader.records(DEPARTURE)))
+    times = [record.time for record in reader.records(ARRIVAL)]
+    same_span = abs((max(times) - min(times)) - (max(original) - min(original))) < 1.0
+    if counts["arrivals"] == len(vehicles) and departed == len(vehicles) and counts["wall_time"] < 20 and same_span:
+        logger.info(f"Test passed: live replay at 20x in {counts['wall_time']:.1f} s, {kinds}.")
+    else:
+        logger.error(f"Test failed: live replay {counts}, recorded {kinds}, same span {same_span}")
+    reader.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+import pickle
+import logging
+from normal_traffic import create_vehicle
+from priority_traffic import create_emergency_vehicle
+from utils.message_queues import create_queues, enqueue
+from utils.vehicle import Vehicle, RECORD_SIZE
+
+logging.basicConfig(level=logging.INFO, format="%(name)s - %(message)s")
+logger = logging.getLogger("test_vehicle")
+
+def main():
+    # Test 1: dict -> Vehicle keeps every field the simulation reads.
+    for original in (create_vehicle(), create_emergency_vehicle()):
+        vehicle = Vehicle.from_dict(original)
+        converted = vehicle.to_dict()
+        same = all(converted[k] == original[k] for k in ("type", "source", "destination", "turn", "priority"))
+        same = same and converted["id"][:8] == original["id"][:8]
+        logger.info(f"{original['type']}: {'Test passed' if same else 'Test failed'}: {converted}")
+
+    # Test 2: Binary and pickle round trips.
+    vehicle = Vehicle.from_dict(create_vehicle())
+    packed = vehicle.pack()
+    logger.info(f"Packed size: {len(packed)} bytes (expected {RECORD_SIZE})")
+    if Vehicle.unpack(packed) == vehicle and pickle.loads(pickle.dumps(vehicle)) == vehicle:
+        logger.info("Test passed: pack/unpack and pickle round trips are lossless.")
+    else:
+        logger.error("Test failed: round trip changed the vehicle.")
+
+    # Test 3: enqueue() accepts compact records.
+    queues = create_queues()
+    enqueue(queues, vehicle, vehicle["source"])
+    retrieved = queues[vehicle["source"]].get(timeout=1)
+    if retrieved == vehicle:
+        logger.info("Test passed: compact vehicle went through the queue.")
+    else:
+        logger.error("Test failed: queue returned a different vehicle.")
+
+    # Test 4: Compact records are hashable, equal records hash alike.
+    copy = Vehicle.unpack(packed)
+    if hash(copy) == hash(vehicle) and len({vehicle, copy}) == 1 and {vehicle: 1}[copy] == 1:
+        logger.info("Test passed: compact vehicles work as dict and set keys.")
+    else:
+        logger.error("Test failed: equal vehicles hash differently.")
+
+if __name__ == "__main__":
+    main()
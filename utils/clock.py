@@ -0,0 +1,67 @@
+"""
+Simulation clock shared by the processes of a run.
+
+Every duration in the simulation (crossing time, phase and emergency greens,
+generator intervals, the display tick) is expressed in simulated seconds and
+goes through a SimClock, which runs `speed` times faster than the wall clock.
+At speed 1 it is the wall clock. At speed 100 a 30 s phase lasts 0.3 s, so the
+full process topology can be soak-tested under accelerated time without
+editing constants.
+
+The clock is created once in the parent and handed to every component like the
+shared memory backend. Simulated time is derived from the wall clock and a
+common origin, so all processes read the same simulated time.
+
+Shutdown polls and socket timeouts are not simulated durations and stay in
+wall-clock seconds.
+"""
+import time
+from typing import Optional
+
+MIN_POLL_INTERVAL = 0.01  # Wall-clock floor for polling loops, so high speeds do not turn them into busy loops
+
+
+class SimClock:
+    """Simulated time running `speed` times faster than the wall clock."""
+
+    def __init__(self, speed: float = 1.0, origin: Optional[float] = None):
+        """
+        :param speed: speed-up factor (10 runs ten simulated seconds per wall-clock second).
+        :param origin: wall-clock time at which simulated and wall time coincide (now by default).
+        """
+        if speed <= 0:
+            raise ValueError(f"Invalid clock speed {speed} (must be positive)")
+        self.speed = float(speed)
+        self.origin = time.time() if origin is None else origin
+
+    def time(self) -> float:
+        """Current simulated time, as an epoch timestamp (time.time() at speed 1)."""
+        now = time.time()
+        if self.speed == 1.0:
+            return now
+        return self.origin + (now - self.origin) * self.speed
+
+    def wall(self, seconds: float) -> float:
+        """Wall-clock length of a simulated duration."""
+        return seconds / self.speed
+
+    def poll_interval(self, seconds: float) -> float:
+        """Wall-clock length of a simulated polling interval, no shorter than MIN_POLL_INTERVAL."""
+        return max(self.wall(seconds), MIN_POLL_INTERVAL)
+
+    def sleep(self, seconds: float) -> None:
+        """Sleeps for a simulated duration."""
+        time.sleep(self.wall(seconds))
+
+    def wait(self, event, seconds: float) -> bool:
+        """
+        Waits on an Event (threading, multiprocessing or manager proxy) for at most
+        a simulated duration. Returns True if the event was set.
+        """
+        return event.wait(self.wall(seconds))
+
+    def __repr__(self) -> str:
+        return f"SimClock(speed={self.speed:g})"
+
+
+REAL_TIME = SimClock()
@@ -0,0 +1,305 @@
+"""
+Display stream protocol (one JSON object per line):
+
+    {"type": "snapshot", "protocol": 1, "version": v, "event_log_capacity": n,
+     "state": {lights, queues, current_vehicle, vehicles_in_box, vehicles, event_logs}}
+    {"type": "delta", "protocol": 1, "version": v,
+     "changes": {field: value, ...}, "event_logs": [new entries]}
+
+The server sends a snapshot on connect, then a delta only when something
+changed; each delta increments the version by one. In a delta, "lights" and
+"queues" carry only the changed directions; other fields are replaced
+whole. Event logs are sent once, by sequence number, and the client keeps
+the last event_log_capacity entries.
+"""
+
+import copy
+import json
+import logging
+import struct
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from utils.ring_buffer import EVENT_LOG_CAPACITY
+from utils.vehicle import RECORD_SIZE, Vehicle
+
+logger = logging.getLogger("display_protocol")
+
+PROTOCOL_VERSION = 1
+MERGED_FIELDS = ("lights", "queues")  # Dicts sent key by key
+REPLACED_FIELDS = ("current_vehicle", "vehicles_in_box", "vehicles")  # Sent whole when they change
+
+
+class ProtocolError(Exception):
+    """The client state cannot be updated from this message (out of sync or unknown format)."""
+
+
+class StateEncoder:
+    """
+    Server side of the stream: turns successive status readings into deltas.
+    One encoder can feed any number of clients that are at the same version.
+    """
+
+    def __init__(self, event_log_capacity: int = EVENT_LOG_CAPACITY):
+        self.version = 0
+        self.event_log_capacity = event_log_capacity
+        self.state: Dict[str, Any] = {}
+        self.event_logs = deque(maxlen=event_log_capacity)
+        self.last_seq = -1
+
+    def update(self, status: Dict[str, Any], new_events: List[Dict[str, Any]] = ()) -> Optional[Dict[str, Any]]:
+        """
+        Records a new status (without event logs) and the event log entries
+        appended since last_seq. Returns the delta message, or None if nothing changed.
+        """
+        changes = {}
+        for field in MERGED_FIELDS:
+            old, new = self.state.get(field, {}), status.get(field) or {}
+            changed = {key: value for key, value in new.items() if old.get(key) != value}
+            if changed:
+                changes[field] = changed
+        for field in REPLACED_FIELDS:
+            if field in status and (field not in self.state or status[field] != self.state[field]):
+                changes[field] = status[field]
+        new_events = [entry for entry in new_events if entry["seq"] > self.last_seq]
+        if not changes and not new_events:
+            return None
+
+        for field, value in changes.items():
+            if field in MERGED_FIELDS:
+                self.state.setdefault(field, {}).update(value)
+            else:
+                self.state[field] = copy.deepcopy(value)
+        if new_events:
+            self.event_logs.extend(new_events)
+            self.last_seq = new_events[-1]["seq"]
+        self.version += 1
+        return {"type": "delta", "protocol": PROTOCOL_VERSION, "version": self.version,
+                "changes": changes, "event_logs": new_events}
+
+    def snapshot_message(self) -> Dict[str, Any]:
+        """Full state at the current version, for clients that just connected or fell behind."""
+        state = copy.deepcopy(self.state)
+        state["event_logs"] = list(self.event_logs)
+        return {"type": "snapshot", "protocol": PROTOCOL_VERSION, "version": self.version,
+                "event_log_capacity": self.event_log_capacity, "state": state}
+
+
+class StateDecoder:
+    """Client side of the stream: rebuilds the full status from a snapshot and deltas."""
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self.state: Dict[str, Any] = {}
+        self.event_log_capacity = EVENT_LOG_CAPACITY
+
+    def apply(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Applies one message and returns the current state (event logs included)."""
+        kind = message.get("type")
+        if kind is None:
+            # Full status from a server that predates the protocol.
+            self.state = message
+            return self.state
+        if message.get("protocol") != PROTOCOL_VERSION:
+            raise ProtocolError(f"Unsupported protocol {message.get('protocol')}")
+        if kind == "snapshot":
+            self.state = message["state"]
+            self.version = message["version"]
+            self.event_log_capacity = message.get("event_log_capacity", EVENT_LOG_CAPACITY)
+            return self.state
+        if kind != "delta":
+            raise ProtocolError(f"Unknown message type {kind}")
+        if self.version is None or message["version"] != self.version + 1:
+            raise ProtocolError(f"Delta {message['version']} does not follow version {self.version}")
+
+        for field, value in message["changes"].items():
+            if field in MERGED_FIELDS:
+                self.state.setdefault(field, {}).update(value)
+            else:
+                self.state[field] = value
+        if message["event_logs"]:
+            logs = self.state.setdefault("event_logs", []) + message["event_logs"]
+            self.state["event_logs"] = logs[-self.event_log_capacity:]
+        self.version = message["version"]
+        return self.state
+
+
+# --- Binary framing ---
+#
+# Clients that send the hello line b'{"hello": 1, "formats": ["binary", "json"]}\n'
+# receive length-prefixed binary frames; clients that send nothing get JSON lines.
+# Frames start with FRAME_MAGIC, which never starts a JSON line, so a reader can
+# accept both (the server falls back to JSON for a message it cannot pack).
+#
+#   frame    <2sBI  magic, kind (0 snapshot, 1 delta), payload length
+#   payload  <IB4B4I  version, section flags, light codes (N S E W), queue counts (N S E W)
+#            [uint16 event_log_capacity]               snapshot only
+#            [uint8 present + Vehicle record]          FLAG_CURRENT_VEHICLE
+#            [uint16 count + Vehicle records]          FLAG_VEHICLES_IN_BOX, FLAG_VEHICLES
+#            uint16 count + events (<QdH seq, time, length + UTF-8 message)
+#
+# Vehicles use the 20-byte utils.vehicle record, so IDs travel as their first 16 hex digits.
+# Light code UNSET and queue count UNSET_COUNT mean "not part of this delta".
+
+WIRE_FORMATS = ("binary", "json")
+FRAME_MAGIC = b"DS"
+_FRAME = struct.Struct("<2sBI")
+_FIXED = struct.Struct("<IB4B4I")
+_EVENT = struct.Struct("<QdH")
+_U16 = struct.Struct("<H")
+_KINDS = ("snapshot", "delta")
+_DIRECTIONS = ("N", "S", "E", "W")
+LIGHT_CODES = ("RED", "GREEN")
+UNSET = 255
+UNSET_COUNT = 0xFFFFFFFF
+FLAG_CURRENT_VEHICLE = 1
+FLAG_VEHICLES_IN_BOX = 2
+FLAG_VEHICLES = 4
+_LIST_FLAGS = (("vehicles_in_box", FLAG_VEHICLES_IN_BOX), ("vehicles", FLAG_VEHICLES))
+
+
+def hello_line(formats=WIRE_FORMATS) -> bytes:
+    """First line a client sends to announce the wire formats it accepts, in order of preference."""
+    return (json.dumps({"hello": PROTOCOL_VERSION, "formats": list(formats)}) + "\n").encode()
+
+
+def choose_format(hello: bytes) -> str:
+    """Server side: the first format from the client's hello that the server supports."""
+    try:
+        formats = json.loads(hello).get("formats", [])
+    except (ValueError, AttributeError):
+        return "json"
+    return next((f for f in formats if f in WIRE_FORMATS), "json")
+
+
+def encode_json(message: Dict[str, Any]) -> bytes:
+    return (json.dumps(message) + "\n").encode()
+
+
+def encode_binary(message: Dict[str, Any]) -> bytes:
+    """Packs a snapshot or delta message. Raises ValueError if a value has no binary encoding."""
+    snapshot = message["type"] == "snapshot"
+    fields = message["state"] if snapshot else message["changes"]
+    lights, queues = fields.get("lights", {}), fields.get("queues", {})
+    flags = 0
+    body = []
+    try:
+        if snapshot:
+            body.append(_U16.pack(message["event_log_capacity"]))
+        if "current_vehicle" in fields:
+            flags |= FLAG_CURRENT_VEHICLE
+            vehicle = fields["current_vehicle"]
+            body.append(b"\x01" + Vehicle.from_dict(vehicle).pack() if vehicle else b"\x00")
+        for field, flag in _LIST_FLAGS:
+            if field in fields:
+                flags |= flag
+                vehicles = fields[field] or []
+                body.append(_U16.pack(len(vehicles)) + Vehicle.pack_many(Vehicle.from_dict(v) for v in vehicles))
+        events = fields.get("event_logs", []) if snapshot else message["event_logs"]
+        body.append(_U16.pack(len(events)))
+        for event in events:
+            data = event["msg"].encode("utf-8")
+            body.append(_EVENT.pack(event["seq"], event["time"], len(data)) + data)
+        fixed = _FIXED.pack(message["version"], flags,
+                            *(LIGHT_CODES.index(lights[d]) if d in lights else UNSET for d in _DIRECTIONS),
+                            *(queues.get(d, UNSET_COUNT) for d in _DIRECTIONS))
+    except struct.error as e:
+        # A count or capacity too large for its field (e.g. more than 65535 events).
+        raise ValueError(e) from e
+    payload = fixed + b"".join(body)
+    return _FRAME.pack(FRAME_MAGIC, _KINDS.index(message["type"]), len(payload)) + payload
+
+
+def decode_binary(kind: int, payload) -> Dict[str, Any]:
+    """Rebuilds the message dict packed by encode_binary()."""
+    version, flags, *codes = _FIXED.unpack_from(payload, 0)
+    light_codes, queue_counts = codes[:4], codes[4:]
+    offset = _FIXED.size
+    fields: Dict[str, Any] = {
+        "lights": {d: LIGHT_CODES[c] for d, c in zip(_DIRECTIONS, light_codes) if c != UNSET},
+        "queues": {d: n for d, n in zip(_DIRECTIONS, queue_counts) if n != UNSET_COUNT},
+    }
+    capacity = None
+    if _KINDS[kind] == "snapshot":
+        capacity = _U16.unpack_from(payload, offset)[0]
+        offset += _U16.size
+    if flags & FLAG_CURRENT_VEHICLE:
+        present = payload[offset]
+        offset += 1
+        fields["current_vehicle"] = Vehicle.unpack(payload, offset).to_dict() if present else None
+        offset += RECORD_SIZE if present else 0
+    for field, flag in _LIST_FLAGS:
+        if flags & flag:
+            count = _U16.unpack_from(payload, offset)[0]
+            offset += _U16.size
+            fields[field] = [Vehicle.unpack(payload, offset + i * RECORD_SIZE).to_dict() for i in range(count)]
+            offset += count * RECORD_SIZE
+    events = []
+    count = _U16.unpack_from(payload, offset)[0]
+    offset += _U16.size
+    for _ in range(count):
+        seq, timestamp, length = _EVENT.unpack_from(payload, offset)
+        offset += _EVENT.size
+        events.append({"seq": seq, "time": timestamp, "msg": bytes(payload[offset:offset + length]).decode("utf-8")})
+        offset += length
+
+    if capacity is not None:
+        fields["event_logs"] = events
+        return {"type": "snapshot", "protocol": PROTOCOL_VERSION, "version": version,
+                "event_log_capacity": capacity, "state": fields}
+    return {"type": "delta", "protocol": PROTOCOL_VERSION, "version": version,
+            "changes": {k: v for k, v in fields.items() if v or k not in MERGED_FIELDS}, "event_logs": events}
+
+
+def encode(message: Dict[str, Any], wire_format: str) -> bytes:
+    """Encodes a message for the given wire format; binary falls back to JSON when it cannot pack it."""
+    if wire_format == "binary":
+        try:
+            return encode_binary(message)
+        except (ValueError, KeyError) as e:
+            logger.warning(f"⚠️ {message['type']} {message['version']} sent as JSON: no binary encoding ({e})")
+    return encode_json(message)
+
+
+class FrameReader:
+    """
+    Splits a byte stream into messages, accepting JSON lines and binary frames
+    interleaved. Bytes are accumulated in a bytearray and consumed in place.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self._scanned = 0  # Bytes at the start of the buffer already searched for a newline
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        buffer = self.buffer
+        buffer += data
+        messages, start = [], 0
+        scanned, self._scanned = self._scanned, 0
+        view = memoryview(buffer)
+        try:
+            while start < len(buffer):
+                if buffer.startswith(FRAME_MAGIC, start):
+                    if len(buffer) - start < _FRAME.size:
+                        break
+                    _, kind, length = _FRAME.unpack_from(buffer, start)
+                    end = start + _FRAME.size + length
+                    if end > len(buffer):
+                        break
+                    messages.append(decode_binary(kind, view[start + _FRAME.size:end]))
+                    start = end
+                else:
+                    end = buffer.find(b"\n", max(start, scanned))
+                    scanned = 0
+                    if end < 0:
+                        # Resume the search here when more bytes arrive, instead of rescanning the line.
+                        self._scanned = len(buffer) - start
+                        break
+                    line = bytes(view[start:end]).strip()
+                    if line:
+                        messages.append(json.loads(line))
+                    start = end + 1
+        finally:
+            view.release()
+            del buffer[:start]
+        return messages
@@ -1,6 +1,12 @@
 import logging
-from multiprocessing import Queue, Manager
-from typing import Dict
+import threading
+import multiprocessing
+from collections import deque
+from multiprocessing import Queue, Manager, queues as mp_queues, util
+from queue import Empty
+from typing import Any, Dict, Iterable, List, Union
+
+from utils.vehicle import Vehicle
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("message_queues")
@@ -14,7 +20,7 @@ def create_queues(manager: SyncManager) -> Dict[str, Queue]:
         "W": manager.Queue()
     })
 
-def enqueue(queues: Dict[str, Queue], vehicle: dict, direction: str) -> None:
+def enqueue(queues: Dict[str, Queue], vehicle: Union[dict, Vehicle], direction: str) -> None:
     try:
         queues[direction].put(vehicle)
         logger.info(f"Enqueued {vehicle['id'][:8]} to {direction}")
@@ -31,24 +37,151 @@ Ensure direction is valid before enqueueing
     - The function should check if the direction is one of ["N", "S", "E", "W"].
 """
 
+DRAIN_BATCH = 64  # Default maximum number of vehicles returned by drain()
+
+
+class VehicleBatch:
+    """
+    Several vehicles shipped as a single queue message.
+    Batches made only of Vehicle records travel as one packed byte string.
+    """
+    __slots__ = ("packed", "items")
+
+    def __init__(self, vehicles: List[Any]):
+        if all(isinstance(v, Vehicle) for v in vehicles):
+            self.packed = Vehicle.pack_many(vehicles)
+            self.items = None
+        else:
+            self.packed = None
+            self.items = list(vehicles)
+
+    def unpack(self) -> List[Any]:
+        return Vehicle.unpack_many(self.packed) if self.packed is not None else self.items
+
+
+class DirectionQueue(mp_queues.Queue):
+    """
+    multiprocessing.Queue that also accepts batches (put_many / get_many).
+    qsize() counts vehicles rather than messages through a shared counter, so it
+    stays correct for batched puts and works on platforms without sem_getvalue().
+    A single Vehicle record is shipped as its packed bytes, which pickle faster
+    than the record itself (or a dict).
+    Vehicles unpacked from a batch but not yet returned are kept in a per-process
+    buffer; use a single consumer thread per process.
+    """
+
+    def __init__(self, maxsize: int = 0):
+        super().__init__(maxsize, ctx=multiprocessing.get_context())
+        self._depth = multiprocessing.Value("i", 0)
+        self._reset_pending()
+        util.register_after_fork(self, DirectionQueue._reset_pending)
+
+    def __getstate__(self):
+        return super().__getstate__() + (self._depth,)
+
+    def __setstate__(self, state):
+        super().__setstate__(state[:-1])
+        self._depth = state[-1]
+        self._reset_pending()
+
+    def _reset_pending(self) -> None:
+        self._pending = deque()
+        self._pending_lock = threading.Lock()
+
+    def _add_depth(self, count: int) -> None:
+        with self._depth.get_lock():
+            self._depth.value += count
+
+    def put(self, obj, block: bool = True, timeout: float = None) -> None:
+        self._add_depth(1)
+        try:
+            super().put(obj.pack() if isinstance(obj, Vehicle) else obj, block, timeout)
+        except Exception:
+            self._add_depth(-1)
+            raise
+
+    def put_many(self, items: List[Any], block: bool = True, timeout: float = None) -> None:
+        """Ships all items as one message (one pickle, one pipe write)."""
+        if len(items) == 1:
+            self.put(items[0], block, timeout)
+            return
+        if not items:
+            return
+        self._add_depth(len(items))
+        try:
+            super().put(VehicleBatch(items), block, timeout)
+        except Exception:
+            self._add_depth(-len(items))
+            raise
+
+    def _receive(self, block: bool, timeout: float) -> List[Any]:
+        message = super().get(block, timeout)
+        if isinstance(message, VehicleBatch):
+            return message.unpack()
+        return [Vehicle.unpack(message) if isinstance(message, bytes) else message]
+
+    def get(self, block: bool = True, timeout: float = None):
+        with self._pending_lock:
+            if self._pending:
+                self._add_depth(-1)
+                return self._pending.popleft()
+        items = self._receive(block, timeout)
+        with self._pending_lock:
+            self._pending.extend(items[1:])
+        self._add_depth(-1)
+        return items[0]
+
+    def get_many(self, max_items: int = DRAIN_BATCH, timeout: float = None, ack: bool = True) -> List[Any]:
+        """
+        Returns up to max_items vehicles, blocking up to `timeout` only when nothing
+        is available. Returns an empty list on timeout.
+        With ack=False the vehicles still count in qsize() until mark_done() is called.
+        """
+        with self._pending_lock:
+            items = [self._pending.popleft() for _ in range(min(max_items, len(self._pending)))]
+        try:
+            while len(items) < max_items:
+                received = self._receive(not items, timeout)
+                room = max_items - len(items)
+                items.extend(received[:room])
+                if len(received) > room:
+                    with self._pending_lock:
+                        self._pending.extend(received[room:])
+        except Empty:
+            pass
+        if ack and items:
+            self._add_depth(-len(items))
+        return items
+
+    def mark_done(self, count: int = 1) -> None:
+        """Removes vehicles taken with get_many(ack=False) from the depth count."""
+        self._add_depth(-count)
+
+    def qsize(self) -> int:
+        return self._depth.value
+
+    def empty(self) -> bool:
+        return self.qsize() <= 0
+
+
 def create_queues() -> Dict[str, Queue]:
     """
     Creates a dictionary of queues for each direction.
-    Returns a dictionary containing multiprocessing.Queue() objects.
+    Returns a dictionary containing DirectionQueue (multiprocessing.Queue) objects.
     """
     return {
-        "N": Queue(),
-        "S": Queue(),
-        "E": Queue(),
-        "W": Queue()
+        "N": DirectionQueue(),
+        "S": DirectionQueue(),
+        "E": DirectionQueue(),
+        "W": DirectionQueue()
     }
 
-def enqueue(queues: Dict[str, Queue], vehicle: dict, direction: str) -> None:
+def enqueue(queues: Dict[str, Queue], vehicle: Union[dict, Vehicle], direction: str) -> None:
     """
     Enqueues a vehicle into the specified direction's queue.
     
     :param queues: Dictionary of queues for each direction.
-    :param vehicle: Dictionary representing the vehicle with an 'id' key.
+    :param vehicle: Dictionary with an 'id' key, or a compact Vehicle record.
     :param direction: Direction ('N', 'S', 'E', 'W') where the vehicle should be enqueued.
     """
     try:
@@ -65,3 +198,63 @@ def enqueue(queues: Dict[str, Queue], vehicle: dict, direction: str) -> None:
         logger.error(f"Enqueue error: {e}")
     except Exception as e:
         logger.error(f"Unexpected queue error: {e}")
+
+def enqueue_many(queues: Dict[str, Queue], vehicles: Iterable[Union[dict, Vehicle]]) -> int:
+    """
+    Groups vehicles by their source direction and ships each group as one message.
+    Invalid vehicles are logged and skipped. Returns the number of vehicles enqueued.
+
+    :param queues: Dictionary of queues for each direction.
+    :param vehicles: Vehicles (dicts or Vehicle records), each with 'id' and 'source'.
+    """
+    groups: Dict[str, List[Any]] = {}
+    for vehicle in vehicles:
+        try:
+            if "id" not in vehicle:
+                raise KeyError("Vehicle dictionary missing 'id' key")
+            direction = vehicle["source"]
+            if direction not in queues:
+                raise ValueError(f"Invalid direction '{direction}' (must be N, S, E, or W)")
+            groups.setdefault(direction, []).append(vehicle)
+        except (KeyError, ValueError) as e:
+            logger.error(f"Enqueue error: {e}")
+
+    count = 0
+    for direction, group in groups.items():
+        try:
+            queue = queues[direction]
+            if hasattr(queue, "put_many"):
+                queue.put_many(group)
+            else:
+                for vehicle in group:
+                    queue.put(vehicle)
+            count += len(group)
+            logger.info(f"🚗 Enqueued {len(group)} vehicles to {direction}")
+        except Exception as e:
+            logger.error(f"Unexpected queue error: {e}")
+    return count
+
+def drain(queues: Dict[str, Queue], direction: str, max_items: int = DRAIN_BATCH,
+          timeout: float = 0.5, ack: bool = True) -> List[Any]:
+    """
+    Takes up to max_items vehicles from a direction's queue in FIFO order.
+    Blocks up to `timeout` seconds only if the queue is empty; returns [] on timeout.
+    Plain queues (e.g. manager.Queue) are drained one get() at a time.
+    """
+    queue = queues[direction]
+    if hasattr(queue, "get_many"):
+        return queue.get_many(max_items, timeout, ack)
+    items = []
+    try:
+        items.append(queue.get(timeout=timeout))
+        while len(items) < max_items:
+            items.append(queue.get_nowait())
+    except Empty:
+        pass
+    return items
+
+def mark_done(queues: Dict[str, Queue], direction: str, count: int = 1) -> None:
+    """Acknowledges vehicles drained with ack=False (no-op for plain queues)."""
+    queue = queues[direction]
+    if hasattr(queue, "mark_done"):
+        queue.mark_done(count)
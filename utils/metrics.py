@@ -0,0 +1,297 @@
+import os
+import time
+import bisect
+import logging
+import threading
+import weakref
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from multiprocessing import Lock
+from multiprocessing import shared_memory as _shm
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("metrics")
+
+DIRECTIONS = ["N", "S", "E", "W"]
+MAX_WRITERS = 32  # Threads (in any process) that can record metrics at the same time
+METRICS_PORT = 9464
+
+# Catalogue of recorded metrics: name -> (type, help, label names, label values, histogram buckets).
+# Gauges are not recorded; MetricsServer samples them from the queues and shared memory on scrape.
+METRICS = {
+    "crossroads_vehicles_generated_total": (
+        "counter", "Vehicles generated per approach and type.",
+        ("direction", "type"), [(d, t) for d in DIRECTIONS for t in ("normal", "emergency")], None),
+    "crossroads_vehicles_processed_total": (
+        "counter", "Vehicles that crossed the intersection, per approach.",
+        ("direction",), [(d,) for d in DIRECTIONS], None),
+    "crossroads_vehicles_stopped_total": (
+        "counter", "Vehicles held at a red light at the head of their queue.",
+        ("direction",), [(d,) for d in DIRECTIONS], None),
+    "crossroads_emergency_preemptions_total": (
+        "counter", "Emergency preemptions of the signal plan, per approach given the green.",
+        ("direction",), [(d,) for d in DIRECTIONS], None),
+    "crossroads_queue_wait_seconds": (
+        "histogram", "Time from arrival to entering the intersection.",
+        ("direction",), [(d,) for d in DIRECTIONS], (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)),
+    "crossroads_crossing_seconds": (
+        "histogram", "Time a vehicle spends inside the intersection.",
+        (), [()], (1, 2, 3, 4, 5, 6, 8, 10, 20)),
+    "crossroads_emergency_response_seconds": (
+        "histogram", "Time from an emergency vehicle's arrival to entering the intersection.",
+        ("direction",), [(d,) for d in DIRECTIONS], (0.1, 0.25, 0.5, 1, 2, 5, 10, 30)),
+    "crossroads_preemption_latency_seconds": (
+        "histogram", "Time from an emergency vehicle's generation to its approach turning green.",
+        ("direction",), [(d,) for d in DIRECTIONS], (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)),
+}
+
+
+def _layout() -> Tuple[Dict[Tuple[str, tuple], int], int]:
+    """Offset (in doubles) of each (metric, labels) series within a writer row, and the row length."""
+    offsets, cells = {}, 0
+    for name, (kind, _, _, label_values, buckets) in METRICS.items():
+        for labels in label_values:
+            offsets[(name, labels)] = cells
+            # Histograms: one count per bucket plus +Inf, then sum and count.
+            cells += len(buckets) + 3 if kind == "histogram" else 1
+    return offsets, cells
+
+
+_OFFSETS, ROW_CELLS = _layout()
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms aggregated across processes in a
+    multiprocessing.shared_memory segment of doubles. Every recording thread
+    holds its own row, so inc()/observe() are a plain memory update with no
+    lock or IPC; collect() sums the rows. A row goes back to its process's pool
+    when its thread ends and is reused by the next thread (its totals stay in
+    it). Created once in the parent and handed to every component like the
+    shared memory backend.
+
+    Segment layout: cell 0 is the number of claimed rows, followed by
+    max_writers rows of ROW_CELLS doubles.
+    """
+
+    def __init__(self, max_writers: int = MAX_WRITERS):
+        self.max_writers = max_writers
+        self._claim_lock = Lock()
+        self._owner = True
+        size = (1 + max_writers * ROW_CELLS) * 8
+        self._shm = _shm.SharedMemory(create=True, size=size)
+        self._shm.buf[:size] = bytes(size)
+        self._attach()
+
+    def _attach(self) -> None:
+        self._cells = self._shm.buf.cast("d")
+        self._local = threading.local()
+        self._free = []  # Rows released by finished threads of this process
+        self._free_pid = os.getpid()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_shm_name"] = self._shm.name
+        for key in ("_shm", "_cells", "_local", "_free", "_free_pid"):
+            del state[key]
+        state["_owner"] = False
+        return state
+
+    def __setstate__(self, state):
+        name = state.pop("_shm_name")
+        self.__dict__.update(state)
+        self._shm = _shm.SharedMemory(name=name)
+        self._attach()
+
+    def _row(self) -> int:
+        """
+        Start of the calling thread's row, taken on first use in each process and
+        thread: a row released by a finished thread of this process, else a new one.
+        Raises RuntimeError when more than max_writers threads record at the same time.
+        """
+        local = self._local
+        pid = os.getpid()
+        if getattr(local, "pid", None) != pid:
+            if self._free_pid != pid:
+                # Forked child: the parent's released rows are still the parent's.
+                self._free, self._free_pid = [], pid
+            try:
+                base = self._free.pop()
+            except IndexError:
+                with self._claim_lock:
+                    claimed = int(self._cells[0])
+                    if claimed >= self.max_writers:
+                        raise RuntimeError(f"Metrics writer rows exhausted: more than {self.max_writers} "
+                                           f"threads recording at once (raise max_writers)")
+                    self._cells[0] = claimed + 1
+                base = 1 + claimed * ROW_CELLS
+            local.base = base
+            local.pid = pid
+            # The thread's local data is dropped when it ends, which returns the row.
+            local.lease = _RowLease()
+            weakref.finalize(local.lease, self._free.append, base)
+        return local.base
+
+    def inc(self, name: str, *labels: str, value: float = 1.0) -> None:
+        self._cells[self._row() + _OFFSETS[(name, labels)]] += value
+
+    def observe(self, name: str, value: float, *labels: str) -> None:
+        base = self._row() + _OFFSETS[(name, labels)]
+        buckets = METRICS[name][4]
+        cells = self._cells
+        cells[base + bisect.bisect_left(buckets, value)] += 1
+        cells[base + len(buckets) + 1] += value
+        cells[base + len(buckets) + 2] += 1
+
+    def collect(self) -> Dict[Tuple[str, tuple], List[float]]:
+        """Totals across all writers: (metric, labels) -> cells (one value for counters)."""
+        cells = self._cells
+        rows = min(int(cells[0]), self.max_writers)
+        totals = [0.0] * ROW_CELLS
+        for row in range(rows):
+            base = 1 + row * ROW_CELLS
+            for i, value in enumerate(cells[base:base + ROW_CELLS]):
+                totals[i] += value
+        collected = {}
+        for (name, labels), offset in _OFFSETS.items():
+            kind, buckets = METRICS[name][0], METRICS[name][4]
+            width = len(buckets) + 3 if kind == "histogram" else 1
+            collected[(name, labels)] = totals[offset:offset + width]
+        return collected
+
+    def render(self, gauges: Optional[List[Tuple[str, str, Dict[str, str], float]]] = None) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4).
+        :param gauges: sampled values as (name, help, labels, value).
+        """
+        lines = []
+        collected = self.collect()
+        for name, (kind, help_text, label_names, label_values, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels in label_values:
+                values = collected[(name, labels)]
+                pairs = [_pair(key, value) for key, value in zip(label_names, labels)]
+                if kind == "counter":
+                    lines.append(f"{name}{_labels(pairs)} {_number(values[0])}")
+                    continue
+                cumulative = 0.0
+                for bound, count in zip(list(buckets) + ["+Inf"], values):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(pairs + [_pair('le', bound)])} {_number(cumulative)}")
+                lines.append(f"{name}_sum{_labels(pairs)} {_number(values[-2])}")
+                lines.append(f"{name}_count{_labels(pairs)} {_number(values[-1])}")
+        seen = set()
+        for name, help_text, labels, value in gauges or []:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{_labels([_pair(k, v) for k, v in labels.items()])} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def close(self) -> None:
+        """Unmaps the segment and unlinks it if this process created it."""
+        self._cells.release()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+class _RowLease:
+    """Stored in a recording thread's local data; its finalizer releases the thread's row."""
+
+
+class NullMetrics:
+    """Stand-in used when metrics are disabled; recording costs one no-op call."""
+
+    def inc(self, name: str, *labels: str, value: float = 1.0) -> None:
+        pass
+
+    def observe(self, name: str, value: float, *labels: str) -> None:
+        pass
+
+
+NO_METRICS = NullMetrics()
+
+
+def _pair(key: str, value) -> str:
+    return f'{key}="{value}"'
+
+
+def _labels(pairs: List[str]) -> str:
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+class MetricsServer:
+    """
+    Serves GET /metrics on a local HTTP port, next to DisplayServer. Gauges
+    (queue depths, lights, phase) are sampled from the queues and shared memory
+    at scrape time, so they cost nothing between scrapes.
+    """
+
+    def __init__(self, registry: MetricsRegistry, queues, shared_memory, shutdown_flag,
+                 host: str = "127.0.0.1", port: int = METRICS_PORT):
+        self.registry = registry
+        self.queues = queues
+        self.shared_memory = shared_memory
+        self.shutdown_flag = shutdown_flag
+        self.host = host
+        self.port = port
+
+    def sample_gauges(self) -> List[Tuple[str, str, Dict[str, str], float]]:
+        gauges = []
+        for d in DIRECTIONS:
+            gauges.append(("crossroads_queue_depth", "Vehicles waiting or crossing, per approach.",
+                           {"direction": d}, self.queues[d].qsize()))
+        lights = self.shared_memory.get_light_state()
+        for d in DIRECTIONS:
+            gauges.append(("crossroads_light_green", "1 while the approach has a green light.",
+                           {"direction": d}, 1 if lights.get(d) == "GREEN" else 0))
+        if self.shared_memory.in_priority_mode():
+            phase = 2
+        elif lights.get("N") == "GREEN" and lights.get("S") == "GREEN":
+            phase = 0
+        elif lights.get("W") == "GREEN" and lights.get("E") == "GREEN":
+            phase = 1
+        else:
+            phase = -1
+        gauges.append(("crossroads_phase", "Signal phase: 0 = NS, 1 = WE, 2 = emergency, -1 = other.",
+                       {}, phase))
+        return gauges
+
+    def render(self) -> str:
+        return self.registry.render(self.sample_gauges())
+
+    def run(self) -> None:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                start = time.perf_counter()
+                body = server.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                logger.debug(f"Scrape served in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+            def log_message(self, format, *args):
+                pass
+
+        httpd = HTTPServer((self.host, self.port), Handler)
+        httpd.timeout = 0.5
+        logger.info(f"📈 Metrics on http://{self.host}:{self.port}/metrics")
+        try:
+            while not self.shutdown_flag.is_set():
+                httpd.handle_request()
+        finally:
+            httpd.server_close()
+            logger.info("Metrics server shutting down.")
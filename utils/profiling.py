@@ -0,0 +1,223 @@
+"""
+Optional lock-contention and hot-path profiling, toggled by environment variables:
+
+    CROSSROADS_PROFILE=1                 log a timing summary when each process exits
+    CROSSROADS_PROFILE_TRACE=prefix      also write <prefix>-<pid>.json in Chrome trace format
+
+When CROSSROADS_PROFILE is unset, profile_lock() returns the lock itself and
+@profiled returns the function itself, so the instrumented code runs exactly
+as before. Per-process trace files are combined with
+
+    python -m utils.profiling merge trace-*.json -o trace.json   # open in chrome://tracing or Perfetto
+    python -m utils.profiling summary trace-*.json
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import functools
+import threading
+from collections import defaultdict
+from multiprocessing import util
+from typing import Dict, List
+
+logger = logging.getLogger("profiling")
+
+ENABLED = os.environ.get("CROSSROADS_PROFILE", "") not in ("", "0")
+TRACE_PREFIX = os.environ.get("CROSSROADS_PROFILE_TRACE", "")
+MAX_TRACE_EVENTS = 200_000  # Per process; the summary keeps counting past this
+
+
+class Profiler:
+    """Per-process collection of timed spans: (category, name) -> durations, plus raw trace events."""
+
+    def __init__(self):
+        self.durations: Dict[tuple, List[float]] = defaultdict(list)
+        self.events = []
+        self.dropped = 0
+        self._pid = os.getpid()
+        self._registered = False
+
+    def _check_fork(self) -> None:
+        # A forked child starts with its parent's samples; keep only its own.
+        if self._pid != os.getpid():
+            self.durations = defaultdict(list)
+            self.events = []
+            self.dropped = 0
+            self._pid = os.getpid()
+            self._registered = False
+        if not self._registered:
+            self._registered = True
+            util.Finalize(None, self.dump, exitpriority=100)
+
+    def record(self, category: str, name: str, start: float, duration: float) -> None:
+        self._check_fork()
+        self.durations[(category, name)].append(duration)
+        if len(self.events) < MAX_TRACE_EVENTS:
+            self.events.append({"name": name, "cat": category, "ph": "X", "ts": start * 1e6,
+                                "dur": duration * 1e6, "pid": self._pid, "tid": threading.get_ident()})
+        else:
+            self.dropped += 1
+
+    def summary(self) -> List[dict]:
+        return summarize(self.durations)
+
+    def dump(self) -> None:
+        """Logs the summary table and writes the Chrome trace file if requested."""
+        if not self.durations or self._pid != os.getpid():
+            return
+        logger.info(f"⏱️ Profile of {_process_name()} (pid {self._pid}):\n{format_table(self.summary())}")
+        if TRACE_PREFIX:
+            path = f"{TRACE_PREFIX}-{self._pid}.json"
+            with open(path, "w") as f:
+                json.dump({"traceEvents": self.events, "otherData": {"process": _process_name(),
+                                                                     "dropped": self.dropped}}, f)
+            logger.info(f"Chrome trace written to {path}")
+
+
+PROFILER = Profiler()
+
+
+def _process_name() -> str:
+    from multiprocessing import current_process
+    return current_process().name
+
+
+class ProfiledLock:
+    """
+    Wraps a lock (manager proxy or multiprocessing lock) and records, per call
+    site, how long acquire() waited and how long the lock was then held. The
+    call site is the public method that took the lock (private helpers such as
+    _write are skipped) and its caller, e.g. "update_state <- _publish_box".
+    """
+
+    def __init__(self, lock, name: str):
+        self.lock = lock
+        self.name = name
+        self._held = threading.local()
+
+    def __getstate__(self):
+        return {"lock": self.lock, "name": self.name}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._held = threading.local()
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        return self._acquire(sys._getframe(1), blocking, timeout)
+
+    def _acquire(self, frame, blocking: bool = True, timeout: float = -1) -> bool:
+        while frame.f_code.co_name.startswith("_") and frame.f_back is not None:
+            frame = frame.f_back
+        site = frame.f_code.co_name
+        if frame.f_back is not None:
+            site = f"{site} <- {frame.f_back.f_code.co_name}"
+        start_wall, start = time.time(), time.perf_counter()
+        acquired = self.lock.acquire(blocking, timeout) if timeout != -1 else self.lock.acquire(blocking)
+        acquired_at = time.perf_counter()
+        if not acquired:
+            PROFILER.record(f"{self.name}.wait", site, start_wall, acquired_at - start)
+            return False
+        stack = getattr(self._held, "stack", None)
+        if stack is None:
+            stack = self._held.stack = []
+        stack.append((site, start_wall, start, acquired_at))
+        return True
+
+    def release(self) -> None:
+        # Both samples are recorded after the release so the bookkeeping is not counted as hold time.
+        site, start_wall, start, acquired_at = self._held.stack.pop()
+        self.lock.release()
+        held = time.perf_counter() - acquired_at
+        PROFILER.record(f"{self.name}.wait", site, start_wall, acquired_at - start)
+        PROFILER.record(f"{self.name}.hold", site, start_wall + (acquired_at - start), held)
+
+    def __enter__(self):
+        return self._acquire(sys._getframe(1))
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+def profile_lock(lock, name: str):
+    """The lock itself, or a ProfiledLock when profiling is enabled."""
+    return ProfiledLock(lock, name) if ENABLED else lock
+
+
+def profiled(name: str):
+    """Decorator timing every call of a hot-path function when profiling is enabled."""
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                PROFILER.record("call", name, time.time() - duration, duration)
+        return wrapper
+    return decorator
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    index = min(len(samples) - 1, max(0, int(round(pct / 100.0 * len(samples))) - 1))
+    return samples[index]
+
+
+def summarize(durations: Dict[tuple, List[float]]) -> List[dict]:
+    """One row per (category, name), sorted by total time."""
+    rows = []
+    for (category, name), samples in durations.items():
+        samples = sorted(samples)
+        rows.append({"category": category, "name": name, "count": len(samples), "total_ms": sum(samples) * 1e3,
+                     "p50_us": _percentile(samples, 50) * 1e6, "p99_us": _percentile(samples, 99) * 1e6,
+                     "max_us": samples[-1] * 1e6})
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return rows
+
+
+def format_table(rows: List[dict]) -> str:
+    lines = [f"{'category':<24} {'site':<44} {'count':>8} {'total ms':>10} {'p50 us':>9} {'p99 us':>9} {'max us':>9}"]
+    for row in rows:
+        lines.append(f"{row['category']:<24} {row['name']:<44} {row['count']:>8} {row['total_ms']:>10.1f} "
+                     f"{row['p50_us']:>9.1f} {row['p99_us']:>9.1f} {row['max_us']:>9.1f}")
+    return "\n".join(lines)
+
+
+def load_events(paths: List[str]) -> List[dict]:
+    events = []
+    for path in paths:
+        with open(path) as f:
+            events.extend(json.load(f)["traceEvents"])
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    merge = sub.add_parser("merge", help="combine per-process trace files into one")
+    merge.add_argument("paths", nargs="+")
+    merge.add_argument("-o", "--output", default="trace.json")
+    summary = sub.add_parser("summary", help="timing table over per-process trace files")
+    summary.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    events = load_events(args.paths)
+    if args.command == "merge":
+        with open(args.output, "w") as f:
+            json.dump({"traceEvents": events}, f)
+        print(f"{len(events)} events from {len(args.paths)} files written to {args.output}")
+    else:
+        durations = defaultdict(list)
+        for event in events:
+            durations[(event["cat"], event["name"])].append(event["dur"] / 1e6)
+        print(format_table(summarize(durations)))
+
+
+if __name__ == "__main__":
+    main()
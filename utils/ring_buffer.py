@@ -0,0 +1,154 @@
+import struct
+from multiprocessing.managers import SyncManager
+from typing import Any, Dict, List
+
+EVENT_LOG_CAPACITY = 20  # Default number of event log entries kept
+MESSAGE_SIZE = 240  # Bytes reserved for a message in the native ring
+
+# Native ring layout (little-endian):
+#   0   uint64  version (odd while a writer is active)
+#   8   uint64  total number of entries ever appended
+#   16  slots   capacity * (uint64 seq, double time, uint16 length, MESSAGE_SIZE bytes)
+_HEADER = struct.Struct("<QQ")
+_SLOT = struct.Struct(f"<QdH{MESSAGE_SIZE}s")
+
+
+def _ordered_seqs(count: int, capacity: int) -> range:
+    """Sequence numbers currently held by a ring that has seen `count` appends."""
+    return range(max(0, count - capacity), count)
+
+
+def _slot_spans(seqs: range, capacity: int) -> List[range]:
+    """Slot indices holding `seqs`, in order: one span, or two when they wrap around the ring."""
+    if not seqs:
+        return []
+    first = seqs.start % capacity
+    end = first + len(seqs)
+    if end <= capacity:
+        return [range(first, end)]
+    return [range(first, capacity), range(0, end - capacity)]
+
+
+class ManagerRingBuffer:
+    """
+    Fixed-capacity event log stored in manager proxies.
+    Each append is one slot assignment plus one counter update, independent of capacity.
+    Callers serialize writers (and readers that need a consistent view) with their own lock.
+    """
+
+    def __init__(self, manager: SyncManager, capacity: int = EVENT_LOG_CAPACITY):
+        self.capacity = capacity
+        self.slots = manager.list([None] * capacity)
+        self.count = manager.Value("Q", 0)
+
+    def append(self, timestamp: float, msg: str) -> int:
+        seq = self.count.value
+        self.slots[seq % self.capacity] = {"seq": seq, "time": timestamp, "msg": msg}
+        self.count.value = seq + 1
+        return seq
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        count = self.count.value
+        slots = list(self.slots)
+        return [slots[seq % self.capacity] for seq in _ordered_seqs(count, self.capacity)]
+
+    def next_seq(self) -> int:
+        """Sequence number the next append will get."""
+        return self.count.value
+
+    def since(self, seq: int) -> List[Dict[str, Any]]:
+        """Entries with a sequence number greater than `seq` that are still in the ring."""
+        count = self.count.value
+        seqs = range(max(seq + 1, count - self.capacity), count)
+        entries = []
+        for span in _slot_spans(seqs, self.capacity):
+            entries.extend(self.slots[span.start:span.stop])
+        return entries
+
+    def clear(self) -> None:
+        self.slots[:] = [None] * self.capacity
+        self.count.value = 0
+
+
+class SharedRingBuffer:
+    """
+    Fixed-capacity event log laid out in a shared memory buffer.
+    Writers must hold the owner's lock; readers take a seqlock-validated copy
+    of the ring (or of the slots they need, in since()), so reads never block appends.
+    """
+
+    def __init__(self, buf: memoryview, capacity: int = EVENT_LOG_CAPACITY):
+        if len(buf) < self.required_size(capacity):
+            raise ValueError("Buffer too small for ring capacity")
+        self.buf = buf
+        self.capacity = capacity
+
+    @staticmethod
+    def required_size(capacity: int) -> int:
+        return _HEADER.size + _SLOT.size * capacity
+
+    @staticmethod
+    def _offset(slot: int) -> int:
+        return _HEADER.size + _SLOT.size * slot
+
+    def append(self, timestamp: float, msg: str) -> int:
+        buf = self.buf
+        version, seq = _HEADER.unpack_from(buf, 0)
+        _HEADER.pack_into(buf, 0, version + 1, seq)
+        data = msg.encode("utf-8")[:MESSAGE_SIZE]
+        offset = self._offset(seq % self.capacity)
+        _SLOT.pack_into(buf, offset, seq, timestamp, len(data), data)
+        _HEADER.pack_into(buf, 0, version + 2, seq + 1)
+        return seq
+
+    def _copy(self) -> bytes:
+        buf = self.buf
+        while True:
+            version = _HEADER.unpack_from(buf, 0)[0]
+            if version & 1:
+                continue
+            data = bytes(buf[:self.required_size(self.capacity)])
+            if _HEADER.unpack_from(buf, 0)[0] == version:
+                return data
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        data = self._copy()
+        count = _HEADER.unpack_from(data, 0)[1]
+        seqs = _ordered_seqs(count, self.capacity)
+        ordered = b"".join(data[self._offset(span.start):self._offset(span.stop)]
+                           for span in _slot_spans(seqs, self.capacity))
+        return self._decode(ordered, seqs)
+
+    @staticmethod
+    def _decode(data: bytes, seqs: range) -> List[Dict[str, Any]]:
+        """Decodes the consecutive slots copied in `data`, holding `seqs` in order."""
+        entries = []
+        for i, seq in enumerate(seqs):
+            _, timestamp, length, raw = _SLOT.unpack_from(data, _SLOT.size * i)
+            entries.append({"seq": seq, "time": timestamp,
+                            "msg": raw[:length].decode("utf-8", errors="ignore")})
+        return entries
+
+    def next_seq(self) -> int:
+        """Sequence number the next append will get."""
+        return _HEADER.unpack_from(self.buf, 0)[1]
+
+    def since(self, seq: int) -> List[Dict[str, Any]]:
+        """Entries with a sequence number greater than `seq` that are still in the ring."""
+        buf = self.buf
+        while True:
+            version, count = _HEADER.unpack_from(buf, 0)
+            if version & 1:
+                continue
+            seqs = range(max(seq + 1, count - self.capacity), count)
+            if not seqs:
+                return []
+            # Copy only the new slots, in sequence order.
+            data = b"".join(bytes(buf[self._offset(span.start):self._offset(span.stop)])
+                            for span in _slot_spans(seqs, self.capacity))
+            if _HEADER.unpack_from(buf, 0)[0] == version:
+                return self._decode(data, seqs)
+
+    def clear(self) -> None:
+        version = _HEADER.unpack_from(self.buf, 0)[0]
+        _HEADER.pack_into(self.buf, 0, version + 2, 0)
@@ -0,0 +1,59 @@
+"""
+Run-level seeding for the traffic generators.
+
+One run seed is split into independent named streams ("normal",
+"normal/N", "priority", ...), each a random.Random seeded from a hash of the
+run seed and the stream name. A stream's sequence depends only on the seed and
+its own draws, not on process start order, fork timing or how often another
+stream was used, so two runs with the same seed generate the same vehicles.
+Vehicle IDs are derived the same way: the n-th ID of a stream is a hash of
+(seed, stream, n) formatted as a UUID.
+
+Without a seed, streams are the global `random` module (reseeded in every
+forked child) and IDs are uuid4(), as before.
+"""
+import uuid
+import random
+import hashlib
+from typing import Dict, Optional
+
+
+def derive_seed(seed: int, name: str) -> int:
+    """64-bit seed of the stream `name` under the run seed."""
+    return int.from_bytes(hashlib.blake2b(f"{seed}/{name}".encode(), digest_size=8).digest(), "little")
+
+
+class RandomStreams:
+    """
+    The named RNG streams and vehicle ID sequences of one process. Each
+    generator process builds its own from the run seed.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        """
+        :param seed: run seed; None keeps the unseeded behaviour (global random, uuid4 IDs).
+        """
+        self.seed = seed
+        self._streams: Dict[str, random.Random] = {}
+        self._ids: Dict[str, int] = {}
+
+    def stream(self, name: str):
+        """The RNG of a stream (anything with the random module's methods)."""
+        if self.seed is None:
+            return random
+        rng = self._streams.get(name)
+        if rng is None:
+            rng = self._streams[name] = random.Random(derive_seed(self.seed, name))
+        return rng
+
+    def vehicle_id(self, name: str) -> str:
+        """Next vehicle ID of a stream: a UUID string, deterministic under a seed."""
+        if self.seed is None:
+            return str(uuid.uuid4())
+        n = self._ids.get(name, 0)
+        self._ids[name] = n + 1
+        digest = hashlib.blake2b(f"{self.seed}/{name}/id/{n}".encode(), digest_size=16).digest()
+        return str(uuid.UUID(bytes=digest, version=4))
+
+
+UNSEEDED = RandomStreams()
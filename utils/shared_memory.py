@@ -1,30 +1,73 @@
+import json
 import logging
+import struct
 import time
+from multiprocessing import Condition, RLock
+from multiprocessing import shared_memory as _shm
 from multiprocessing.managers import SyncManager
-from typing import Any, Dict
+from typing import Any, Dict, List
+
+from utils.profiling import profile_lock
+from utils.ring_buffer import EVENT_LOG_CAPACITY, ManagerRingBuffer, SharedRingBuffer
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("shared_memory")
 
 
 class SharedMemory:
-    def __init__(self, manager: SyncManager):
+    def __init__(self, manager: SyncManager, event_log_capacity: int = EVENT_LOG_CAPACITY):
         self.manager = manager
-        self.lock = manager.Lock()
+        self.lock = profile_lock(manager.Lock(), "shared_memory.lock")
         self.state = self.manager.dict({
             "lights": self.manager.dict({"N": "GREEN", "S": "GREEN", "E": "RED", "W": "RED"}),
             "priority_mode": False,
             "priority_direction": None,
             "current_vehicle": None,
-            "event_logs": manager.list()
+            "vehicles_in_box": [],
+            "green_since": {"N": 0.0, "S": 0.0, "E": 0.0, "W": 0.0}
         })
+        self.event_logs = ManagerRingBuffer(manager, event_log_capacity)
+        # Notified on every light change; see wait_for_light().
+        self.light_changed = manager.Condition()
     
     def set_light(self, direction: str, color: str) -> None:
+        self.set_lights({direction: color})
+
+    def set_lights(self, lights: Dict[str, str]) -> None:
+        """Applies several light changes at once and wakes up waiting vehicles."""
+        if any(direction not in ["N", "S", "E", "W"] for direction in lights):
+            raise ValueError("Invalid direction")
         with self.lock:
-            if direction not in ["N", "S", "E", "W"]:
-                raise ValueError("Invalid direction")
-            self.state["lights"][direction] = color
-            logger.info(f"Light {direction} set to {color}")
+            current = dict(self.state["lights"])
+            turned_green = [d for d, c in lights.items() if c == "GREEN" and current.get(d) != "GREEN"]
+            if turned_green:
+                green_since = dict(self.state["green_since"])
+                now = time.time()
+                for direction in turned_green:
+                    green_since[direction] = now
+                self.state["green_since"] = green_since
+            self.state["lights"].update(lights)
+            for direction, color in lights.items():
+                logger.info(f"Light {direction} set to {color}")
+        self._notify_light_change()
+
+    def _notify_light_change(self) -> None:
+        with self.light_changed:
+            self.light_changed.notify_all()
+
+    def wait_for_light(self, direction: str, color: str = "GREEN", timeout: float = None) -> bool:
+        """
+        Blocks until the light for `direction` shows `color` or the timeout expires.
+        Returns True if the light has that color.
+        """
+        with self.light_changed:
+            return self.light_changed.wait_for(
+                lambda: self.get_light_state().get(direction) == color, timeout)
+
+    def get_green_since(self, direction: str) -> float:
+        """Time at which the light for `direction` last turned GREEN (0.0 if never)."""
+        with self.lock:
+            return self.state["green_since"].get(direction, 0.0)
 
     def set_priority_mode(self, direction: str) -> None:
         with self.lock:
@@ -51,24 +94,46 @@ class SharedMemory:
             self.state[key] = value
     
     def get_state(self, key: str) -> Any:
+        if key == "event_logs":
+            return self.get_event_logs()
         with self.lock:
             return self.state.get(key, None)  # Explicit default value, prevent potential race condition
 
     
+    def snapshot(self, include_event_logs: bool = True) -> Dict[str, Any]:
+        """
+        Consistent copy of the state published to display clients.
+        With include_event_logs=False the event log is left out (read it with event_logs_since()).
+        """
+        with self.lock:
+            snapshot = {
+                "lights": dict(self.state["lights"]),
+                "current_vehicle": self.state["current_vehicle"],
+                "vehicles_in_box": list(self.state.get("vehicles_in_box", [])),
+                "vehicles": list(self.state.get("vehicles", []))
+            }
+            if include_event_logs:
+                snapshot["event_logs"] = self.event_logs.snapshot()
+            return snapshot
+
     def append_event_log(self, event: str) -> None:
+        # O(1): the ring overwrites its oldest slot once full.
         with self.lock:
-            current_time = time.time()
-            # Get a local copy of the current event logs.
-            logs = list(self.state["event_logs"])
-            logs.append({"time": current_time, "msg": event})
-            # Keep only the last 20 events.
-            logs = logs[-20:]
-            # Remove all elements from the Manager list one by one.
-            while len(self.state["event_logs"]) > 0:
-                self.state["event_logs"].pop(0)
-            # Append the trimmed logs back into the Manager list.
-            for log in logs:
-                self.state["event_logs"].append(log)
+            self.event_logs.append(time.time(), event)
+
+    def get_event_logs(self) -> List[Dict[str, Any]]:
+        """Consistent copy of the event log, oldest entry first."""
+        with self.lock:
+            return self.event_logs.snapshot()
+
+    def event_logs_since(self, seq: int) -> List[Dict[str, Any]]:
+        """
+        Event log entries newer than `seq`, oldest first. Taken under the lock: the
+        manager ring reads its counter and slots in separate calls, so an append in
+        between would otherwise return entries out of order.
+        """
+        with self.lock:
+            return self.event_logs.since(seq)
     
     def cleanup(self):
         """
@@ -81,14 +146,261 @@ class SharedMemory:
                 if "lights" in self.state:
                     for direction in ["N", "S", "E", "W"]:
                         self.state["lights"][direction] = "RED"  # or default values, as needed
+                self.state["green_since"] = {d: 0.0 for d in ["N", "S", "E", "W"]}
                 # Clear current vehicle and priority mode.
                 self.state["current_vehicle"] = None
+                self.state["vehicles_in_box"] = []
                 self.state["priority_mode"] = False
                 self.state["priority_direction"] = None
                 # Clear event logs.
-                while len(self.state["event_logs"]) > 0:
-                    self.state["event_logs"].pop(0)
+                self.event_logs.clear()
                 logger.info("Shared memory cleanup completed.")
             except Exception as e:
                 logger.error(f"Error during shared memory cleanup: {e}")
+        self._notify_light_change()
+
+    def close(self) -> None:
+        """Nothing to release; the manager owns all proxies."""
+
+
+# -------------------------------------------------------------------------------
+# Native backend
+# -------------------------------------------------------------------------------
+
+DIRECTIONS = ["N", "S", "E", "W"]
+COLORS = ["RED", "GREEN", "YELLOW"]
+
+# Fixed binary layout of the native segment (little-endian):
+#   0   uint64  sequence counter (odd while a writer is active)
+#   8   4*uint8 light colors for N, S, E, W (index into COLORS)
+#   12  uint8   priority mode flag
+#   13  uint8   priority direction (0 = None, 1..4 = index into DIRECTIONS + 1)
+#   16  4*double time each light last turned GREEN
+#   48  blob    current_vehicle: uint32 length + JSON bytes
+#   1072 blob   vehicles_in_box: uint32 length + JSON bytes
+#   ... ring    event log (see utils.ring_buffer.SharedRingBuffer)
+_SEQ = struct.Struct("<Q")
+_LIGHTS = struct.Struct("<4B")
+_PRIORITY = struct.Struct("<BB")
+_GREEN_SINCE = struct.Struct("<4d")
+_BLOB_LEN = struct.Struct("<I")
+_LIGHTS_OFFSET = 8
+_PRIORITY_OFFSET = 12
+_GREEN_SINCE_OFFSET = 16
+BLOB_SIZE = 1024
+_BLOB_SLOTS = {"current_vehicle": 48, "vehicles_in_box": 48 + BLOB_SIZE}
+LAYOUT_SIZE = 48 + BLOB_SIZE * len(_BLOB_SLOTS)
+
+
+class NativeSharedMemory(SharedMemory):
+    """
+    Drop-in replacement for SharedMemory backed by a multiprocessing.shared_memory
+    segment. Lights, priority flag/direction and current vehicle live in a fixed
+    binary layout guarded by a seqlock, so reads are plain memory loads instead of
+    manager round-trips. Writers serialize on a process-shared RLock (reentrant so
+    the Coordinator can call update_state() while holding it).
+    The event log is a SharedRingBuffer in the same segment; other keys
+    (vehicles, ...) fall back to a manager dict.
+    """
+
+    def __init__(self, manager: SyncManager, event_log_capacity: int = EVENT_LOG_CAPACITY):
+        self.manager = manager
+        self.lock = profile_lock(RLock(), "shared_memory.lock")
+        self.light_changed = Condition()
+        self.state = self.manager.dict()
+        self._owner = True
+        self._capacity = event_log_capacity
+        size = LAYOUT_SIZE + SharedRingBuffer.required_size(event_log_capacity)
+        self._shm = _shm.SharedMemory(create=True, size=size)
+        self._buf = self._shm.buf
+        self._buf[:size] = bytes(size)
+        self._attach_ring()
+        self._write(self._write_lights, {"N": "GREEN", "S": "GREEN", "E": "RED", "W": "RED"})
+
+    def _attach_ring(self) -> None:
+        self.event_logs = SharedRingBuffer(self._buf[LAYOUT_SIZE:], self._capacity)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_shm_name"] = self._shm.name
+        for key in ("_shm", "_buf", "event_logs"):
+            del state[key]
+        state["_owner"] = False
+        return state
+
+    def __setstate__(self, state):
+        name = state.pop("_shm_name")
+        self.__dict__.update(state)
+        self._shm = _shm.SharedMemory(name=name)
+        self._buf = self._shm.buf
+        self._attach_ring()
+
+    # --- seqlock primitives ---
+
+    def _write(self, writer, *args) -> None:
+        with self.lock:
+            buf = self._buf
+            seq = _SEQ.unpack_from(buf, 0)[0]
+            _SEQ.pack_into(buf, 0, seq + 1)
+            try:
+                writer(buf, *args)
+            finally:
+                _SEQ.pack_into(buf, 0, seq + 2)
+
+    def _read(self, reader):
+        buf = self._buf
+        while True:
+            start = _SEQ.unpack_from(buf, 0)[0]
+            if start & 1:
+                continue
+            result = reader(buf)
+            if _SEQ.unpack_from(buf, 0)[0] == start:
+                return result
+
+    @staticmethod
+    def _write_lights(buf, lights: Dict[str, str]) -> None:
+        codes = list(_LIGHTS.unpack_from(buf, _LIGHTS_OFFSET))
+        green_since = list(_GREEN_SINCE.unpack_from(buf, _GREEN_SINCE_OFFSET))
+        now = time.time()
+        for direction, color in lights.items():
+            index = DIRECTIONS.index(direction)
+            code = COLORS.index(color)
+            if color == "GREEN" and codes[index] != code:
+                green_since[index] = now
+            codes[index] = code
+        _LIGHTS.pack_into(buf, _LIGHTS_OFFSET, *codes)
+        _GREEN_SINCE.pack_into(buf, _GREEN_SINCE_OFFSET, *green_since)
+
+    @staticmethod
+    def _read_lights(buf) -> Dict[str, str]:
+        codes = _LIGHTS.unpack_from(buf, _LIGHTS_OFFSET)
+        return {d: COLORS[c] for d, c in zip(DIRECTIONS, codes)}
+
+    @staticmethod
+    def _read_priority(buf):
+        mode, direction = _PRIORITY.unpack_from(buf, _PRIORITY_OFFSET)
+        return bool(mode), (DIRECTIONS[direction - 1] if direction else None)
+
+    @staticmethod
+    def _write_blob(buf, offset: int, data: bytes) -> None:
+        _BLOB_LEN.pack_into(buf, offset, len(data))
+        end = offset + _BLOB_LEN.size + len(data)
+        buf[offset + _BLOB_LEN.size:end] = data
+
+    @staticmethod
+    def _read_blob(offset: int):
+        def reader(buf):
+            length = _BLOB_LEN.unpack_from(buf, offset)[0]
+            start = offset + _BLOB_LEN.size
+            return bytes(buf[start:start + length])
+        return reader
+
+    # --- SharedMemory API ---
+
+    def set_lights(self, lights: Dict[str, str]) -> None:
+        if any(direction not in DIRECTIONS for direction in lights):
+            raise ValueError("Invalid direction")
+        self._write(self._write_lights, lights)
+        for direction, color in lights.items():
+            logger.info(f"Light {direction} set to {color}")
+        self._notify_light_change()
+
+    def get_green_since(self, direction: str) -> float:
+        index = DIRECTIONS.index(direction)
+        return self._read(lambda buf: _GREEN_SINCE.unpack_from(buf, _GREEN_SINCE_OFFSET)[index])
+
+    def set_priority_mode(self, direction: str) -> None:
+        code = DIRECTIONS.index(direction) + 1 if direction in DIRECTIONS else 0
+        self._write(lambda buf: _PRIORITY.pack_into(buf, _PRIORITY_OFFSET, 1, code))
+        logger.info(f"Priority mode activated for {direction}")
+
+    def reset_priority_mode(self) -> None:
+        self._write(lambda buf: _PRIORITY.pack_into(buf, _PRIORITY_OFFSET, 0, 0))
+        logger.info("Priority mode deactivated")
+
+    def get_light_state(self) -> Dict[str, str]:
+        return self._read(self._read_lights)
+
+    def in_priority_mode(self) -> bool:
+        return self._read(self._read_priority)[0]
+
+    def update_state(self, key: str, value: Any) -> None:
+        if key in _BLOB_SLOTS:
+            data = b"" if value is None else json.dumps(value).encode()
+            if len(data) > BLOB_SIZE - _BLOB_LEN.size:
+                raise ValueError(f"Value for '{key}' exceeds {BLOB_SIZE} bytes")
+            self._write(self._write_blob, _BLOB_SLOTS[key], data)
+        else:
+            with self.lock:
+                self.state[key] = value
+
+    def get_state(self, key: str) -> Any:
+        if key in _BLOB_SLOTS:
+            data = self._read(self._read_blob(_BLOB_SLOTS[key]))
+            return json.loads(data) if data else None
+        if key == "lights":
+            return self.get_light_state()
+        if key in ("priority_mode", "priority_direction"):
+            mode, direction = self._read(self._read_priority)
+            return mode if key == "priority_mode" else direction
+        if key == "event_logs":
+            return self.get_event_logs()
+        with self.lock:
+            return self.state.get(key, None)
+
+    def snapshot(self, include_event_logs: bool = True) -> Dict[str, Any]:
+        with self.lock:
+            snapshot = {
+                "lights": self.get_light_state(),
+                "current_vehicle": self.get_state("current_vehicle"),
+                "vehicles_in_box": self.get_state("vehicles_in_box") or [],
+                "vehicles": list(self.state.get("vehicles", [])),
+            }
+            if include_event_logs:
+                snapshot["event_logs"] = self.event_logs.snapshot()
+            return snapshot
+
+    def get_event_logs(self) -> List[Dict[str, Any]]:
+        # Seqlock-validated copy; does not wait for writers.
+        return self.event_logs.snapshot()
+
+    def event_logs_since(self, seq: int) -> List[Dict[str, Any]]:
+        # Seqlock-validated copy; does not wait for writers.
+        return self.event_logs.since(seq)
+
+    def cleanup(self):
+        """
+        Resets the shared memory state to its default values.
+        The segment itself stays mapped; call close() to release it.
+        """
+        try:
+            self._write(self._write_lights, {d: "RED" for d in DIRECTIONS})
+            self._write(lambda buf: _GREEN_SINCE.pack_into(buf, _GREEN_SINCE_OFFSET, 0.0, 0.0, 0.0, 0.0))
+            self._notify_light_change()
+            self.reset_priority_mode()
+            self.update_state("current_vehicle", None)
+            self.update_state("vehicles_in_box", [])
+            with self.lock:
+                self.event_logs.clear()
+            logger.info("Shared memory cleanup completed.")
+        except Exception as e:
+            logger.error(f"Error during shared memory cleanup: {e}")
+
+    def close(self) -> None:
+        """Unmaps the segment and unlinks it if this process created it."""
+        self.event_logs.buf.release()
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
 
+def create_shared_memory(manager: SyncManager, native: bool = False,
+                         event_log_capacity: int = EVENT_LOG_CAPACITY):
+    """
+    Returns the shared state backend used by Coordinator, TrafficLights and DisplayServer.
+    :param native: use the multiprocessing.shared_memory backend instead of manager proxies.
+    :param event_log_capacity: number of event log entries kept in the ring buffer.
+    """
+    backend = NativeSharedMemory if native else SharedMemory
+    return backend(manager, event_log_capacity)
@@ -1,14 +1,91 @@
 import os
 import signal
+import struct
 import logging
-from multiprocessing import Value
+from multiprocessing import Pipe, Value
 from multiprocessing.managers import BaseManager as Manager
 from ctypes import c_bool, c_char_p
+from contextlib import contextmanager
+from typing import Optional, Tuple
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("signals")
 
+DIRECTIONS = ["N", "S", "E", "W"]
+
+
+class PreemptionChannel:
+    """
+    Emergency preemption requests from the priority traffic generators to
+    TrafficLights. Each request is one small message on a pipe carrying the
+    direction to turn green and the vehicle's generation time, so the lights
+    wait on the pipe itself: no PID file to find, no signal to deliver and no
+    separate shared value to read the direction from.
+
+    Created in the parent before the processes start and passed to both sides.
+    A message is written with a single write() well under PIPE_BUF, so several
+    generators can share one channel.
+    """
+    MESSAGE = struct.Struct("<1sd")  # Direction, generation time
+
+    def __init__(self):
+        self._reader, self._writer = Pipe(duplex=False)
+
+    def request(self, direction: str, generated_at: Optional[float] = None) -> None:
+        """
+        Asks for a green light on `direction`.
+        :param generated_at: when the emergency vehicle was generated, on the run's
+                             SimClock, used by the lights to measure generation-to-green
+                             latency (the time of receipt by default).
+        """
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Invalid emergency direction: {direction}")
+        self._writer.send_bytes(self.MESSAGE.pack(direction.encode(), generated_at or 0.0))
+
+    def notify_priority(self, vehicle: dict) -> None:
+        """Requests preemption for an emergency vehicle (same call as SignalHandler.notify_priority)."""
+        self.request(vehicle.get("source", "").upper(), vehicle.get("timestamp"))
+        logger.info(f"🚨 Preemption requested for direction {vehicle['source']}")
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Tuple[str, float]]:
+        """
+        Blocks until a request arrives or `timeout` seconds pass.
+        Returns (direction, generated_at), or None on timeout. generated_at is
+        None when the sender did not give one.
+        """
+        if not self._reader.poll(timeout):
+            return None
+        direction, generated_at = self.MESSAGE.unpack(self._reader.recv_bytes())
+        return direction.decode(), generated_at or None
+
+    def fileno(self) -> int:
+        """The receiving end, for use with selectors."""
+        return self._reader.fileno()
+
+    def close(self) -> None:
+        self._reader.close()
+        self._writer.close()
+
+
+@contextmanager
+def children_ignore_sigint():
+    """
+    Processes started inside the block ignore Ctrl+C: the parent catches the
+    KeyboardInterrupt and stops them through the shutdown flag.
+    """
+    previous = signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+
 class SignalHandler:
+    """
+    SIGUSR1-based priority notification, addressed by PID. Superseded by
+    PreemptionChannel, which TrafficLights listens on.
+    """
+
     def __init__(self, lights_pid: int, manager: Manager): 
         """
         Initializes the SignalHandler with a given lights process ID and a shared memory manager.
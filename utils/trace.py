@@ -0,0 +1,265 @@
+"""
+Compact binary trace of a run: vehicle arrivals and departures, light changes
+and emergency signals, one fixed-size record each.
+
+File layout (little-endian):
+    header  4s magic "CRTR", uint16 version, uint16 record size, double start time
+    records double time, uint8 kind, 4 * uint8 codes, 3 pad bytes, uint64 vehicle id
+
+Codes per kind:
+    ARRIVAL, DEPARTURE  type, source, destination, turn (utils.vehicle code tables)
+    LIGHTS              color of N, S, E, W (index into COLORS)
+    EMERGENCY           direction given the green
+
+Every record is appended with a single os.write() on an O_APPEND descriptor,
+so all processes of a run can record into the same file. TraceReader maps the
+file instead of reading it, so large traces are scanned without loading them.
+
+    python -m utils.trace summary run.trace
+"""
+import os
+import mmap
+import time
+import heapq
+import struct
+import argparse
+from collections import Counter
+from typing import Dict, Iterator, NamedTuple, Optional
+
+from utils.vehicle import DIRECTIONS, TURNS, TYPES, id_to_int
+
+MAGIC = b"CRTR"
+VERSION = 1
+COLORS = ["RED", "GREEN", "YELLOW"]
+_HEADER = struct.Struct("<4sHHd")
+_RECORD = struct.Struct("<dB4B3xQ")
+HEADER_SIZE = _HEADER.size
+RECORD_SIZE = _RECORD.size
+
+CHUNK_RECORDS = 65536  # Records unpacked per slice of the mapping
+REORDER_WINDOW = 1.0  # Seconds of clock skew tolerated between recording processes
+
+ARRIVAL, DEPARTURE, LIGHTS, EMERGENCY = range(4)
+KINDS = ["arrival", "departure", "lights", "emergency"]
+
+
+class TraceRecord(NamedTuple):
+    time: float
+    kind: int
+    codes: tuple
+    vid: int
+
+    def vehicle(self) -> dict:
+        """The vehicle of an ARRIVAL or DEPARTURE record, as the generators create it."""
+        type_code, source, destination, turn = self.codes
+        return {
+            "id": f"{self.vid:016x}",
+            "type": TYPES[type_code],
+            "source": DIRECTIONS[source],
+            "destination": DIRECTIONS[destination],
+            "timestamp": self.time,
+            "priority": type_code != 0,
+            "turn": TURNS[turn],
+        }
+
+    def lights(self) -> Dict[str, str]:
+        return {d: COLORS[c] for d, c in zip(DIRECTIONS, self.codes)}
+
+    def direction(self) -> str:
+        return DIRECTIONS[self.codes[0]]
+
+
+def _vehicle_codes(vehicle) -> tuple:
+    turn = vehicle.get("turn", "unknown")
+    return (TYPES.index(vehicle.get("type", "normal")), DIRECTIONS.index(vehicle["source"]),
+            DIRECTIONS.index(vehicle["destination"]), TURNS.index(turn) if turn in TURNS else TURNS.index("unknown"))
+
+
+class TraceRecorder:
+    """
+    Appends records to a trace file. Created once in the parent (which writes
+    the header) and handed to the components like the metrics registry; each
+    process opens its own O_APPEND descriptor on first use.
+    """
+
+    def __init__(self, path: str, clock=None):
+        """
+        :param clock: time source for the records (time.time by default).
+        """
+        self.path = path
+        self.clock = clock or time.time
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, RECORD_SIZE, self.clock()))
+        self._fd = None
+        self._pid = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_fd"] = None
+        state["_pid"] = None
+        return state
+
+    def _write(self, kind: int, codes: tuple, vid: int = 0) -> None:
+        if self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+            self._pid = os.getpid()
+        os.write(self._fd, _RECORD.pack(self.clock(), kind, *codes, vid))
+
+    def arrival(self, vehicle) -> None:
+        self._write(ARRIVAL, _vehicle_codes(vehicle), id_to_int(vehicle["id"]))
+
+    def departure(self, vehicle) -> None:
+        self._write(DEPARTURE, _vehicle_codes(vehicle), id_to_int(vehicle["id"]))
+
+    def lights(self, lights: Dict[str, str]) -> None:
+        self._write(LIGHTS, tuple(COLORS.index(lights.get(d, "RED")) for d in DIRECTIONS))
+
+    def emergency(self, direction: str) -> None:
+        self._write(EMERGENCY, (DIRECTIONS.index(direction), 0, 0, 0))
+
+    def close(self) -> None:
+        if self._fd is not None and self._pid == os.getpid():
+            os.close(self._fd)
+            self._fd = None
+
+
+class NullRecorder:
+    """Stand-in used when no trace is recorded."""
+
+    def arrival(self, vehicle) -> None:
+        pass
+
+    def departure(self, vehicle) -> None:
+        pass
+
+    def lights(self, lights: Dict[str, str]) -> None:
+        pass
+
+    def emergency(self, direction: str) -> None:
+        pass
+
+
+NO_TRACE = NullRecorder()
+
+
+class TraceReader:
+    """
+    Memory-mapped, read-only view of a trace file. Records are unpacked on
+    access, a chunk at a time, so only the pages being scanned are brought
+    into memory. Records from different processes may be slightly out of time
+    order; ordered() restores it for replay.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER_SIZE:
+            raise ValueError(f"{path} is not a trace file (too short)")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, self.start_time = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            raise ValueError(f"{path} is not a version {VERSION} trace file")
+        # A record still being appended by a live run is ignored.
+        self._count = (size - HEADER_SIZE) // RECORD_SIZE
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> TraceRecord:
+        if not -self._count <= index < self._count:
+            raise IndexError(index)
+        at, kind, a, b, c, d, vid = _RECORD.unpack_from(self._map, HEADER_SIZE + (index % self._count) * RECORD_SIZE)
+        return TraceRecord(at, kind, (a, b, c, d), vid)
+
+    def __iter__(self) -> Iterator[TraceRecord]:
+        end = HEADER_SIZE + self._count * RECORD_SIZE
+        for start in range(HEADER_SIZE, end, CHUNK_RECORDS * RECORD_SIZE):
+            chunk = self._map[start:min(end, start + CHUNK_RECORDS * RECORD_SIZE)]
+            for at, kind, a, b, c, d, vid in _RECORD.iter_unpack(chunk):
+                yield TraceRecord(at, kind, (a, b, c, d), vid)
+
+    def records(self, *kinds: int) -> Iterator[TraceRecord]:
+        for record in self:
+            if not kinds or record.kind in kinds:
+                yield record
+
+    def ordered(self, *kinds: int, window: float = REORDER_WINDOW) -> Iterator[TraceRecord]:
+        """
+        Records of the given kinds in time order, assuming no record was appended
+        more than `window` seconds after a later-stamped one. Memory is bounded by
+        the records inside the window.
+        """
+        heap = []
+        for index, record in enumerate(self.records(*kinds)):
+            heapq.heappush(heap, (record.time, index, record))
+            while heap[0][0] < record.time - window:
+                yield heapq.heappop(heap)[2]
+        while heap:
+            yield heapq.heappop(heap)[2]
+
+    def summary(self) -> dict:
+        """Counts per kind and arrival-to-departure times, in one pass over the mapping."""
+        counts = Counter()
+        arrivals_by_direction = Counter()
+        in_flight: Dict[int, float] = {}
+        total_time = 0.0
+        completed = 0
+        first = last = None
+        for record in self:
+            counts[KINDS[record.kind]] += 1
+            first = record.time if first is None else min(first, record.time)
+            last = record.time if last is None else max(last, record.time)
+            if record.kind == ARRIVAL:
+                arrivals_by_direction[DIRECTIONS[record.codes[1]]] += 1
+                in_flight[record.vid] = record.time
+            elif record.kind == DEPARTURE:
+                arrived = in_flight.pop(record.vid, None)
+                if arrived is not None:
+                    total_time += record.time - arrived
+                    completed += 1
+        return {
+            "records": self._count,
+            "duration": (last - first) if first is not None else 0.0,
+            "counts": dict(counts),
+            "arrivals_by_direction": dict(arrivals_by_direction),
+            "average_time_in_system": total_time / completed if completed else 0.0,
+            "still_in_system": len(in_flight),
+        }
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    summary = sub.add_parser("summary", help="record counts and time in system")
+    summary.add_argument("path")
+    dump = sub.add_parser("dump", help="print records")
+    dump.add_argument("path")
+    dump.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    reader = TraceReader(args.path)
+    try:
+        if args.command == "summary":
+            for key, value in reader.summary().items():
+                print(f"{key}: {value}")
+        else:
+            for i, record in enumerate(reader):
+                if i >= args.limit:
+                    break
+                if record.kind in (ARRIVAL, DEPARTURE):
+                    detail = record.vehicle()
+                elif record.kind == LIGHTS:
+                    detail = record.lights()
+                else:
+                    detail = record.direction()
+                print(f"{record.time - reader.start_time:10.3f} {KINDS[record.kind]:<10} {detail}")
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import hashlib
+import struct
+from typing import Any, Dict, Iterable, List, Union
+
+DIRECTIONS = ["N", "S", "E", "W"]
+TURNS = ["straight", "left", "right", "emergency", "unknown"]
+TYPES = ["normal", "ambulance", "fire_truck", "police"]
+
+# id (uint64), timestamp (double), type, source, destination, turn (uint8 codes)
+_RECORD = struct.Struct("<QdBBBB")
+RECORD_SIZE = _RECORD.size
+
+_FIELDS = ("id", "type", "source", "destination", "timestamp", "priority", "turn")
+
+
+def _restore_vehicle(vid: int, timestamp: float, type_code: int, source_code: int,
+                     destination_code: int, turn_code: int) -> "Vehicle":
+    """Unpickles a Vehicle from its fields, without going through struct."""
+    vehicle = Vehicle.__new__(Vehicle)
+    vehicle.vid = vid
+    vehicle.timestamp = timestamp
+    vehicle.type_code = type_code
+    vehicle.source_code = source_code
+    vehicle.destination_code = destination_code
+    vehicle.turn_code = turn_code
+    return vehicle
+
+
+def id_to_int(vehicle_id: Union[int, str]) -> int:
+    """
+    Maps a vehicle ID to 64 bits. Hex IDs (including UUID strings) keep their
+    leading 16 hex digits, so the first 8 characters shown in logs are unchanged.
+    """
+    if isinstance(vehicle_id, int):
+        return vehicle_id & 0xFFFFFFFFFFFFFFFF
+    digits = vehicle_id.replace("-", "")
+    try:
+        return int(digits[:16].ljust(16, "0"), 16)
+    except ValueError:
+        return int.from_bytes(hashlib.blake2b(vehicle_id.encode(), digest_size=8).digest(), "little")
+
+
+class Vehicle:
+    """
+    Compact vehicle record: a 64-bit ID, a timestamp and enum codes for
+    type/source/destination/turn. Packs to RECORD_SIZE bytes and pickles as
+    its six fields. Supports the read-only dict API used by the rest of the
+    simulation (vehicle["id"], vehicle.get("priority"), ...).
+    """
+
+    __slots__ = ("vid", "timestamp", "type_code", "source_code", "destination_code", "turn_code")
+
+    def __init__(self, vid: int, vehicle_type: str, source: str, destination: str,
+                 timestamp: float, turn: str):
+        self.vid = vid
+        self.timestamp = timestamp
+        self.type_code = TYPES.index(vehicle_type)
+        self.source_code = DIRECTIONS.index(source)
+        self.destination_code = DIRECTIONS.index(destination)
+        self.turn_code = TURNS.index(turn) if turn in TURNS else TURNS.index("unknown")
+
+    @classmethod
+    def from_dict(cls, vehicle: Dict[str, Any]) -> "Vehicle":
+        return cls(id_to_int(vehicle["id"]), vehicle.get("type", "normal"), vehicle["source"],
+                   vehicle["destination"], vehicle.get("timestamp", 0.0), vehicle.get("turn", "unknown"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: self[field] for field in _FIELDS}
+
+    # --- binary format ---
+
+    def pack(self) -> bytes:
+        return _RECORD.pack(self.vid, self.timestamp, self.type_code, self.source_code,
+                            self.destination_code, self.turn_code)
+
+    @classmethod
+    def unpack(cls, data: bytes, offset: int = 0) -> "Vehicle":
+        vehicle = cls.__new__(cls)
+        (vehicle.vid, vehicle.timestamp, vehicle.type_code, vehicle.source_code,
+         vehicle.destination_code, vehicle.turn_code) = _RECORD.unpack_from(data, offset)
+        return vehicle
+
+    @staticmethod
+    def pack_many(vehicles: Iterable["Vehicle"]) -> bytes:
+        return b"".join(vehicle.pack() for vehicle in vehicles)
+
+    @classmethod
+    def unpack_many(cls, data: bytes) -> List["Vehicle"]:
+        return [cls.unpack(data, offset) for offset in range(0, len(data), RECORD_SIZE)]
+
+    def __reduce__(self):
+        return _restore_vehicle, (self.vid, self.timestamp, self.type_code, self.source_code,
+                                  self.destination_code, self.turn_code)
+
+    # --- dict compatibility ---
+
+    @property
+    def priority(self) -> bool:
+        return self.type_code != 0
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "id":
+            return f"{self.vid:016x}"
+        if key == "type":
+            return TYPES[self.type_code]
+        if key == "source":
+            return DIRECTIONS[self.source_code]
+        if key == "destination":
+            return DIRECTIONS[self.destination_code]
+        if key == "timestamp":
+            return self.timestamp
+        if key == "priority":
+            return self.priority
+        if key == "turn":
+            return TURNS[self.turn_code]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return key in _FIELDS
+
+    def keys(self):
+        return _FIELDS
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Vehicle):
+            return self.pack() == other.pack()
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        # Equal records have equal IDs, so records can key dicts and sets by vehicle.
+        return hash(self.vid)
+
+    def __repr__(self) -> str:
+        return f"Vehicle({self.to_dict()})"
+
+
+def as_dict(vehicle: Union[Vehicle, Dict[str, Any], None]) -> Union[Dict[str, Any], None]:
+    """Plain dict for JSON/shared-memory consumers, whatever the vehicle representation."""
+    return vehicle.to_dict() if isinstance(vehicle, Vehicle) else vehicle